@@ -0,0 +1,126 @@
+"""
+강화 매크로 실행기
+
+    python -m enhance money     # 돈 버는용 (목표 레벨까지 강화 후 판매 반복)
+    python -m enhance upgrade   # 무기 강화용 (특별 아이템을 끝까지 강화)
+    python -m enhance stats     # 레벨별 통계, 아이템 목록, 학습된 비용/판매가 출력
+    python -m enhance report    # 최근 시간별 시도 수와 골드 증감 출력
+
+- 모드에 필요한 모듈만 불러옴 (stats/report는 GUI 라이브러리를 불러오지 않고 로그 파일도 만들지 않음)
+- --import-time: 모듈을 불러오는 데 걸린 시간 출력
+"""
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import sys
+
+
+def _imported(args, label):
+    if args.import_time:
+        print(f"⏱️ {label} 불러오기: {(time.perf_counter() - _START) * 1000:.1f}ms")
+
+
+def run_money(args):
+    from enhance_common import setup_logger, WindowNotFound
+    from enhance_macro_money import run_enhance_macro
+    _imported(args, "money")
+    setup_logger("enhance_data")
+    try:
+        run_enhance_macro(
+            target_window_title=args.title,
+            target_level=args.target,
+            delay=args.delay,
+            max_attempts=args.attempts,
+            use_solver=args.solver,
+            resume=not args.no_resume,
+        )
+    except WindowNotFound:
+        sys.exit(1)  # 이유는 이미 출력함
+
+
+def run_upgrade(args):
+    from enhance_common import setup_logger, WindowNotFound
+    from enhance_macro_upgrade import run_enhance_upgrade_macro
+    _imported(args, "upgrade")
+    setup_logger("enhance_upgrade")
+    try:
+        run_enhance_upgrade_macro(
+            target_window_title=args.title,
+            delay=args.delay,
+            max_attempts=args.attempts,
+            resume=not args.no_resume,
+            use_solver=args.solver,
+        )
+    except WindowNotFound:
+        sys.exit(1)  # 이유는 이미 출력함
+
+
+def run_stats(args):
+    import enhance_db
+    _imported(args, "stats")
+    enhance_db.print_all_stats()
+    enhance_db.print_items()
+    enhance_db.print_learned_deltas()
+
+
+def run_report(args):
+    import enhance_db
+    _imported(args, "report")
+    since = time.time() - args.hours * 3600
+    attempts = dict(enhance_db.get_attempts_per_hour(since))
+    gold = dict(enhance_db.get_gold_per_hour(since))
+    hours = sorted(set(attempts) | set(gold))
+
+    print(f"\n📈 최근 {args.hours}시간 기록")
+    print("=" * 50)
+    if not hours:
+        print("기록 없음")
+    for hour in hours:
+        label = time.strftime('%m-%d %H:00', time.localtime(hour))
+        print(f"{label}  시도 {attempts.get(hour, 0):>6,}회  골드 {gold.get(hour, 0):>+14,}G")
+    if hours:
+        print("-" * 50)
+        print(f"합계         시도 {sum(attempts.values()):>6,}회  골드 {sum(gold.values()):>+14,}G")
+    print("=" * 50)
+    enhance_db.print_learned_deltas()
+
+
+def _add_macro_options(parser, target=False):
+    parser.add_argument('--title', default="메크로용", help="카카오톡 창 제목 (기본: 메크로용)")
+    if target:
+        parser.add_argument('--target', type=int, default=10, help="목표 레벨 (기본: 10)")
+    parser.add_argument('--delay', type=float, default=0.1, help="결과 대기 시간(초) (기본: 0.1)")
+    parser.add_argument('--attempts', type=int, default=None, help="최대 시도 횟수 (기본: 제한 없음)")
+    parser.add_argument('--no-resume', action='store_true', help="저장된 진행 상태를 무시하고 처음부터 시작")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m enhance", description="강화 매크로 실행기")
+    parser.add_argument('--import-time', action='store_true', help="모듈 불러오기 시간 출력")
+    modes = parser.add_subparsers(dest='mode', required=True)
+
+    money = modes.add_parser('money', help="돈 버는용 매크로")
+    _add_macro_options(money, target=True)
+    money.add_argument('--solver', action='store_true', help="골드 구간별 목표 대신 최적 정책(enhance_solver)으로 판매 시점 결정")
+    money.set_defaults(run=run_money)
+
+    upgrade = modes.add_parser('upgrade', help="무기 강화용 매크로")
+    _add_macro_options(upgrade)
+    upgrade.add_argument('--solver', action='store_true', help="특별 아이템 판매 시점을 최적 정책(enhance_solver)으로 결정")
+    upgrade.set_defaults(run=run_upgrade)
+
+    stats = modes.add_parser('stats', help="통계 출력")
+    stats.set_defaults(run=run_stats)
+
+    report = modes.add_parser('report', help="시간별 기록 출력")
+    report.add_argument('--hours', type=int, default=24, help="최근 몇 시간 (기본: 24)")
+    report.set_defaults(run=run_report)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
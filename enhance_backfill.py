@@ -0,0 +1,259 @@
+"""
+로그 파일 → 강화 통계 적재 도구
+
+logs/ 의 enhance_log_*, enhance_data_*, enhance_upgrade_* 파일(.txt, 압축된 .txt.gz)을
+한 줄씩 읽어서 "✨ 강화 성공", "💦 강화 유지", "💥 강화 파괴" 결과를 레벨별로 센다.
+
+- 파일별로 읽은 위치(바이트 오프셋)를 ingest_files 테이블에 기록해서 다시 실행하면 새로 쓰인 부분만 읽음
+- 파일은 프로세스 풀로 병렬 분석, DB 기록은 메인 프로세스에서 한 번에
+- 결과는 log_stats 테이블에 누적되고, --apply 를 주면 enhance_stats 를 (초기 데이터 + 로그 통계)로 다시 만듦
+  (로그에 없는 기록은 사라지므로 바뀌는 레벨을 보여주고 확인을 받음)
+
+사용 예:
+    python enhance_backfill.py            # 새 로그만 읽어서 log_stats 갱신
+    python enhance_backfill.py --apply    # 갱신 후 바뀌는 레벨을 보여주고 확인 후 enhance_stats 재구성
+    python enhance_backfill.py --apply --yes  # 확인 없이 재구성
+"""
+import argparse
+import glob
+import gzip
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import enhance_db
+
+
+LOG_PATTERNS = ('enhance_log_*', 'enhance_data_*', 'enhance_upgrade_*')
+
+# 시도 줄: "[사이클 #1] [시도 #2] 현재 레벨: +1 | ..." 또는 "[시도 #2] 현재 레벨: +1 | ..."
+_HEADER = re.compile("\\[시도 #\\d+\\] 현재 레벨: \\+(\\d+)".encode('utf-8'))
+_SUCCESS = re.compile("✨ 강화 성공! → \\+(\\d+)".encode('utf-8'))
+_STAY = re.compile("💦 강화 유지 \\(현재: \\+(\\d+)\\)".encode('utf-8'))
+_BREAK = "💥 강화 파괴!".encode('utf-8')
+# enhance_scheduler 세션 태그: "[창 제목] " ("[사이클 #1]" 같은 시도 번호와 구분하려고 '#' 제외)
+_TAG = re.compile(rb"\[([^\]#]*)\] ")
+
+
+def _log_name(path):
+    """오프셋 기록용 이름 (압축 전후가 같은 이름이 되도록 .gz 제거)"""
+    name = os.path.basename(path)
+    return name[:-3] if name.endswith('.gz') else name
+
+
+def parse_log_file(path, offset=0):
+    """로그 파일의 offset 이후를 읽어서 레벨별 결과를 셈
+
+    시도 줄 이후 결과 줄이 아직 쓰이지 않았으면, 다음 실행 때 그 시도 줄부터 다시 읽도록
+    그 위치를 새 오프셋으로 돌려준다.
+    enhance_scheduler로 여러 창을 돌린 로그는 줄 앞의 "[창 제목] " 별로 따로 추적한다.
+
+    Returns:
+        tuple: (이름, 새 오프셋, {레벨: [성공, 유지, 파괴]})
+    """
+    counts = {}
+    levels = {}     # 세션 태그별 마지막 시도 줄의 레벨
+    pending = {}    # 세션 태그별 결과가 아직 없는 시도 줄 위치
+    pos = offset
+    safe_pos = offset       # 여기까지는 다시 읽을 필요 없음
+
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        if offset:
+            f.seek(offset)
+        for line in f:
+            start = pos
+            pos += len(line)
+            if not line.endswith(b'\n'):
+                pos = start  # 아직 쓰는 중인 줄
+                break
+
+            tag = _TAG.match(line)
+            tag = tag.group(1) if tag else None
+
+            header = _HEADER.search(line)
+            if header:
+                levels[tag] = int(header.group(1))
+                pending[tag] = start
+                continue
+
+            outcome = None
+            match = _SUCCESS.search(line)
+            if match:
+                # 일반 강화 성공은 항상 +1 이므로 결과 레벨에서 강화 전 레벨을 구함
+                # (매크로가 현재 레벨을 잘못 알고 시작한 경우에도 정확함)
+                outcome, before = 0, int(match.group(1)) - 1
+            else:
+                match = _STAY.search(line)
+                if match:
+                    outcome, before = 1, int(match.group(1))
+                elif _BREAK in line and levels.get(tag) is not None:
+                    outcome, before = 2, levels[tag]
+
+            if outcome is not None:
+                if before >= 0:
+                    counts.setdefault(before, [0, 0, 0])[outcome] += 1
+                levels[tag] = None
+                pending.pop(tag, None)
+            if not pending:
+                safe_pos = pos
+
+    new_offset = min(pending.values()) if pending else safe_pos
+    return _log_name(path), new_offset, counts
+
+
+def _parse_job(job):
+    path, offset = job
+    return parse_log_file(path, offset)
+
+
+def find_log_files(log_dir):
+    paths = []
+    for pattern in LOG_PATTERNS:
+        paths += glob.glob(os.path.join(log_dir, pattern + '.txt'))
+        paths += glob.glob(os.path.join(log_dir, pattern + '.txt.gz'))
+    return sorted(paths)
+
+
+def plan_jobs(paths, known):
+    """읽어야 할 (경로, 오프셋) 목록 결정
+
+    Args:
+        known: {이름: (offset, size, mtime)} ingest_files 내용
+    """
+    jobs = []
+    for path in paths:
+        name = _log_name(path)
+        stat = os.stat(path)
+        offset, size, mtime = known.get(name, (0, None, None))
+
+        if path.endswith('.gz'):
+            # 압축된 파일은 더 이상 바뀌지 않으므로 크기/시각이 같으면 건너뜀
+            if size == stat.st_size and mtime == stat.st_mtime:
+                continue
+        elif stat.st_size <= offset:
+            if stat.st_size < offset:
+                print(f"⚠️ 파일이 줄어들어 건너뜀: {name}")
+            continue
+        jobs.append((path, offset))
+    return jobs
+
+
+def backfill(log_dir=None, workers=None):
+    """새 로그를 읽어서 log_stats 와 ingest_files 갱신
+
+    Returns:
+        dict: files(읽은 파일 수), attempts(새로 센 시도 수), elapsed(초)
+    """
+    start = time.perf_counter()
+    if log_dir is None:
+        log_dir = os.path.join(os.path.dirname(__file__), 'logs')
+
+    conn = enhance_db.get_connection()
+    known = {
+        name: (offset, size, mtime)
+        for name, offset, size, mtime in conn.execute('SELECT name, offset, size, mtime FROM ingest_files')
+    }
+    jobs = plan_jobs(find_log_files(log_dir), known)
+
+    if len(jobs) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_parse_job, jobs, chunksize=4))
+    else:
+        results = [_parse_job(job) for job in jobs]
+
+    totals = {}
+    file_rows = []
+    for (path, _), (name, new_offset, counts) in zip(jobs, results):
+        stat = os.stat(path)
+        file_rows.append((name, new_offset, stat.st_size, stat.st_mtime))
+        for level, (success, stay, break_count) in counts.items():
+            total = totals.setdefault(level, [0, 0, 0])
+            total[0] += success
+            total[1] += stay
+            total[2] += break_count
+
+    with enhance_db.transaction() as conn:
+        conn.executemany('''
+            INSERT INTO log_stats (Level, Success, Stay, Break) VALUES (?, ?, ?, ?)
+            ON CONFLICT(Level) DO UPDATE SET
+                Success = Success + excluded.Success,
+                Stay = Stay + excluded.Stay,
+                Break = Break + excluded.Break
+        ''', [(level, *counts) for level, counts in totals.items()])
+        conn.executemany('''
+            INSERT INTO ingest_files (name, offset, size, mtime) VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                offset = excluded.offset, size = excluded.size, mtime = excluded.mtime
+        ''', file_rows)
+
+    return {
+        'files': len(jobs),
+        'attempts': sum(sum(c) for c in totals.values()),
+        'elapsed': time.perf_counter() - start,
+    }
+
+
+def rebuild_enhance_stats(confirm=True):
+    """enhance_stats 를 (초기 데이터 + 로그 통계)로 다시 만듦
+
+    매크로가 직접 기록했지만 로그에는 없는 값 (지워진 로그, 기록 제한으로 빠진 줄 등)은 사라지므로
+    바뀌는 레벨을 먼저 보여주고, confirm이면 확인을 받은 뒤에만 덮어쓴다.
+
+    Returns:
+        bool: enhance_stats 를 덮어썼으면 True
+    """
+    enhance_db.flush_buffer()
+    conn = enhance_db.get_connection()
+    merged = {level: [success, stay, break_count] for level, _, success, stay, break_count in enhance_db.INITIAL_STATS}
+    for level, success, stay, break_count in conn.execute('SELECT Level, Success, Stay, Break FROM log_stats'):
+        row = merged.setdefault(level, [0, 0, 0])
+        row[0] += success
+        row[1] += stay
+        row[2] += break_count
+    current = {
+        level: [success, stay, break_count]
+        for level, success, stay, break_count in conn.execute('SELECT Level, Success, Stay, Break FROM enhance_stats')
+    }
+
+    changed = [(level, current.get(level), counts) for level, counts in sorted(merged.items())
+               if current.get(level) != counts]
+    if not changed:
+        print("✅ enhance_stats 가 이미 (초기 데이터 + 로그 통계)와 같음")
+        return False
+
+    print(f"📋 바뀌는 레벨 ({len(changed)}개, 성공/유지/파괴)")
+    for level, before, after in changed:
+        before = '/'.join(f"{count:,}" for count in before) if before else '없음'
+        after = '/'.join(f"{count:,}" for count in after)
+        print(f"    +{level}: {before} → {after}")
+    if confirm and input("⚠️ 로그에 없는 기록은 사라집니다. 덮어쓸까요? (y/N): ").strip().lower() != 'y':
+        print("⏹️ enhance_stats 재구성 취소")
+        return False
+
+    rows = [(level, sum(counts), *counts) for level, _, counts in changed]
+    with enhance_db.transaction() as conn:
+        conn.executemany('''
+            INSERT INTO enhance_stats (Level, Try, Success, Stay, Break) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(Level) DO UPDATE SET
+                Try = excluded.Try, Success = excluded.Success,
+                Stay = excluded.Stay, Break = excluded.Break
+        ''', rows)
+    enhance_db.invalidate_stats_cache()
+    print(f"♻️ enhance_stats 재구성 완료 ({len(rows)}개 레벨 변경)")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로그 파일에서 강화 통계 적재")
+    parser.add_argument('--log-dir', default=None, help="로그 디렉토리 (기본: logs/)")
+    parser.add_argument('--workers', type=int, default=None, help="병렬 프로세스 수 (기본: CPU 수)")
+    parser.add_argument('--apply', action='store_true', help="적재 후 enhance_stats 재구성")
+    parser.add_argument('--yes', action='store_true', help="--apply 때 확인 없이 덮어쓰기")
+    args = parser.parse_args()
+
+    result = backfill(args.log_dir, args.workers)
+    print(f"📥 로그 {result['files']}개 파일에서 {result['attempts']:,}회 시도 적재 ({result['elapsed']:.2f}초)")
+    if args.apply and rebuild_enhance_stats(confirm=not args.yes):
+        enhance_db.print_all_stats()
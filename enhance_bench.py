@@ -0,0 +1,381 @@
+"""
+강화 매크로 벤치마크
+
+세 부분으로 나뉜다.
+- parse: 응답 파서 (check_enhancement_result, 골드 파서, 판매 대상 판단, parse_reply) 호출당 시간
+- db:    enhance_db.record_* 처리량과 flush_buffer 지연 시간 (임시 DB 사용)
+- loop:  가짜 채팅 창을 GuiTransport로 조작하는 강화 루프 전체의 초당 시도 수
+         (+ 시뮬레이터(SimTransport)로 측정한 순수 파이썬 오버헤드)
+
+파서 입력은 logs/ 에 남은 실제 봇 응답과, 로그에 나온 아이템 이름/골드로 채운 enhance_sim 응답 형식이다.
+결과는 bench_results/ 에 JSON으로 저장하고 바로 전 결과와 비교해서 출력한다.
+
+사용 예:
+    python enhance_bench.py                 # 전체 실행
+    python enhance_bench.py parse db        # 일부만 실행
+    python enhance_bench.py --compare bench_results/20260101_120000_abc1234.json
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import re
+import subprocess
+import tempfile
+import time
+import timeit
+from datetime import datetime
+
+import enhance_common
+import enhance_db
+import enhance_sim
+import enhance_timing
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'bench_results')
+LOG_DIR = os.path.join(os.path.dirname(__file__), 'logs')
+
+
+# ============================================================
+# 파서 입력 (응답 모음)
+# ============================================================
+
+_DEBUG_REPLY = re.compile(r"\[디버그\] 받은 텍스트: (.+?)(?:\.\.\.)?$")
+_ITEM_NAME = re.compile(r"(?:일반 아이템|특별 아이템|광선검 획득!): (.+)$")
+_GOLD = re.compile(r"골드: ([\d,]+)G")
+
+
+def build_corpus(log_dir=LOG_DIR, size=2000, seed=1):
+    """벤치마크용 봇 응답 목록
+
+    로그의 실제 응답(디버그 출력)과, 로그에 나온 아이템 이름/골드로 채운 봇 응답 형식을 섞는다.
+    """
+    import random
+
+    real = []
+    names = set()
+    golds = []
+    for path in sorted(glob.glob(os.path.join(log_dir, 'enhance_*.txt'))):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                match = _DEBUG_REPLY.search(line)
+                if match:
+                    real.append(match.group(1))
+                match = _ITEM_NAME.search(line)
+                if match:
+                    names.add(match.group(1).strip())
+                if len(golds) < 5000:
+                    match = _GOLD.search(line)
+                    if match:
+                        golds.append(int(match.group(1).replace(',', '')))
+
+    names = sorted(names | set(enhance_sim.NORMAL_ITEMS) | set(enhance_sim.SPECIAL_ITEMS))
+    golds = golds or [1000000]
+    rng = random.Random(seed)
+    corpus = list(real)
+    while len(corpus) < size:
+        level = rng.randrange(0, 15)
+        name, new_name = rng.choice(names), rng.choice(names)
+        gold = rng.choice(golds)
+        cost = enhance_sim.DEFAULT_ENHANCE_COSTS[level]
+        kind = rng.random()
+        if kind < 0.45:
+            text = enhance_sim.SUCCESS_REPLY.format(old=level, new=level + 1, name=name, cost=cost, gold=gold)
+            if level + 1 >= enhance_sim.LEGEND_LEVEL:
+                text += "\n" + enhance_sim.LEGEND_REPLY.format(new=level + 1, name=name)
+        elif kind < 0.80:
+            text = enhance_sim.MAINTAIN_REPLY.format(level=level, name=name, cost=cost, gold=gold)
+        elif kind < 0.90:
+            text = enhance_sim.DESTROY_REPLY.format(level=level, name=name, cost=cost, gold=gold, new_name=new_name)
+        elif kind < 0.97:
+            price = enhance_db.COMMON_SALE_PRICES[level]
+            text = enhance_sim.SELL_REPLY.format(level=level, name=name, price=price, gold=gold, new_name=new_name)
+        else:
+            text = enhance_sim.NO_GOLD_REPLY.format(cost=cost)
+        corpus.append(text)
+    return corpus, len(real)
+
+
+# ============================================================
+# 벤치마크
+# ============================================================
+
+def _per_call_ns(func, corpus, repeat=5):
+    """응답 목록 전체를 func로 한 번 훑는 시간의 최솟값 → 호출당 ns"""
+    def run():
+        for text in corpus:
+            func(text)
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return best / len(corpus) * 1e9
+
+
+def bench_parse(corpus):
+    """파서별 호출당 시간 (ns)"""
+    c = enhance_common
+    with contextlib.redirect_stdout(io.StringIO()):
+        funcs = {
+            'check_enhancement_result': c.check_enhancement_result,
+            'parse_gold_from_enhance': c.parse_gold_from_enhance,
+            'parse_gold_from_sell': c.parse_gold_from_sell,
+            'get_current_item_level': c.get_current_item_level,
+            'should_sell_item': c.should_sell_item,
+            'should_sell_destroyed_item': lambda text: c.should_sell_destroyed_item(text, print_log=False),
+            'get_item_type_from_current_text': c.get_item_type_from_current_text,
+            'parse_reply': c.parse_reply,
+        }
+        results = {name: {'ns_per_call': _per_call_ns(func, corpus)} for name, func in funcs.items()}
+
+    # 예전 방식: 응답 하나에 위 함수들을 각각 호출
+    def legacy(text):
+        c.check_enhancement_result(text)
+        c.parse_gold_from_enhance(text)
+        c.parse_gold_from_sell(text)
+        c.should_sell_item(text)
+        c.get_item_type_from_current_text(text)
+    results['legacy_all_parsers'] = {'ns_per_call': _per_call_ns(legacy, corpus)}
+    return results
+
+
+def bench_db(count=20000):
+    """record_* 처리량, 모두 기록될 때까지의 처리량, flush_buffer 지연 시간 (임시 DB)"""
+    old_path = enhance_db.DB_PATH
+    old_enabled = enhance_timing.ENABLED
+    with tempfile.TemporaryDirectory() as tmp:
+        enhance_db.DB_PATH = os.path.join(tmp, 'bench.db')
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                enhance_db.init_db()
+                enhance_db.start_writer()
+                enhance_timing.enable()
+                enhance_timing.reset()
+
+                record = (enhance_db.record_success, enhance_db.record_stay, enhance_db.record_break)
+                start = time.perf_counter()
+                for i in range(count):
+                    record[i % 3](i % 15, gold=1000000 - i, item_name='낡은 검')
+                enqueued = time.perf_counter() - start
+
+                while enhance_db.get_buffer_count():
+                    time.sleep(0.001)
+                persisted = time.perf_counter() - start
+                enhance_db.stop_writer()
+
+            flush = enhance_timing.get_summary().get('db.flush', {})
+        finally:
+            enhance_timing.enable(old_enabled)
+            enhance_timing.reset()
+            enhance_db.close_connection()
+            enhance_db.DB_PATH = old_path
+
+    return {
+        'records': count,
+        'record_ns_per_call': enqueued / count * 1e9,
+        'persisted_per_sec': count / persisted,
+        'flushes': flush.get('count', 0),
+        'flush_p50_ms': flush.get('p50_ms'),
+        'flush_p95_ms': flush.get('p95_ms'),
+        'flush_p99_ms': flush.get('p99_ms'),
+        'flush_max_ms': flush.get('max_ms'),
+    }
+
+
+class _FakeChatWindow:
+    """pyautogui / pyperclip / pygetwindow 흉내 (창 하나, SimulatedBot이 즉시 응답)
+
+    입력창에 붙여넣고 엔터를 누르면 채팅 기록에 사용자 입력과 봇 응답이 붙고,
+    채팅창에서 Ctrl+A, Ctrl+C 하면 채팅 기록 전체가 클립보드에 들어간다.
+    """
+
+    def __init__(self, title, bot):
+        self.title = title
+        self.bot = bot
+        self.left, self.top, self.width, self.height = 0, 0, 400, 800
+        self.bottom = self.top + self.height
+        self.isMinimized = False
+        self.isActive = False
+        self.chat = []
+        self.input = ''
+        self.clipboard = ''
+        self.area = None
+
+    # pygetwindow
+    def getWindowsWithTitle(self, title):
+        return [self] if title == self.title else []
+
+    def activate(self):
+        self.isActive = True
+
+    def restore(self):
+        self.isMinimized = False
+
+    # pyautogui
+    def click(self, x, y):
+        self.area = 'input' if y >= self.bottom - 100 else 'chat'
+
+    def hotkey(self, *keys):
+        if keys == ('ctrl', 'c') and self.area == 'chat':
+            self.clipboard = '\n'.join(self.chat)
+        elif keys == ('ctrl', 'v') and self.area == 'input':
+            self.input += self.clipboard
+
+    def press(self, key):
+        if self.area != 'input':
+            return
+        if key == 'space':
+            self.input += ' '
+        elif key == 'backspace':
+            self.input = ''
+        elif key == 'enter':
+            command, self.input = self.input, ''
+            self.chat.append(f"{enhance_sim.USER_NAME}\n{command}")
+            self.chat.extend(self.bot.handle(command))
+
+    # pyperclip
+    def copy(self, text):
+        self.clipboard = text
+
+    def paste(self):
+        return self.clipboard
+
+
+def bench_loop(attempts=50, sim_attempts=20000, seed=1):
+    """가짜 채팅 창을 조작하는 강화 루프의 초당 시도 수
+
+    판매 없이 강화만 반복하는 upgrade 매크로로 측정한다 (시작 대기 1초 포함).
+    GuiTransport의 창 활성화/입력 대기(time.sleep 0.1초) 는 그대로 포함된다.
+    """
+    odds = enhance_sim.load_odds()
+    old_path = enhance_db.DB_PATH
+    old_gui = (enhance_common.pyautogui, enhance_common.pyperclip, enhance_common.gw)
+    old_transport = enhance_common._transport
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        enhance_db.DB_PATH = os.path.join(tmp, 'bench.db')
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                enhance_db.init_db()
+                from enhance_macro_upgrade import run_enhance_upgrade_macro
+
+                window = _FakeChatWindow('벤치마크', enhance_sim.SimulatedBot(odds=odds, seed=seed))
+                window.chat.append(enhance_sim.ITEM_REPLY.format(level=0, name=window.bot.item_name))
+                enhance_common.pyautogui = enhance_common.pyperclip = enhance_common.gw = window
+                enhance_common.set_transport(enhance_common.GuiTransport())
+                start = time.perf_counter()
+                try:
+                    result = run_enhance_upgrade_macro(window.title, delay=0.0, max_attempts=attempts)
+                except SystemExit:
+                    result = {'attempts': attempts}
+                elapsed = time.perf_counter() - start
+                enhance_db.flush_buffer()
+            results['gui_fake_window'] = {
+                'attempts': result['attempts'],
+                'seconds': elapsed,
+                'attempts_per_sec': result['attempts'] / elapsed,
+            }
+        finally:
+            enhance_common.pyautogui, enhance_common.pyperclip, enhance_common.gw = old_gui
+            enhance_common.set_transport(old_transport)
+            enhance_db.close_connection()
+            enhance_db.DB_PATH = old_path
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            sim = enhance_sim.run_simulation('money', sim_attempts, seed=seed, db_path=os.path.join(tmp, 'sim.db'))
+    results['sim_overhead'] = {
+        'attempts': sim['attempts'],
+        'seconds': sim['elapsed'],
+        'attempts_per_sec': sim['attempts'] / sim['elapsed'],
+    }
+    return results
+
+
+# ============================================================
+# 결과 저장 / 비교
+# ============================================================
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__) or '.',
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save_results(results, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    revision = results['revision'] or 'local'
+    path = os.path.join(results_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{revision}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def latest_results(results_dir=RESULTS_DIR, exclude=None):
+    paths = sorted(p for p in glob.glob(os.path.join(results_dir, '*.json')) if p != exclude)
+    return paths[-1] if paths else None
+
+
+def _flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def print_results(results, previous=None):
+    """결과 출력 (previous가 있으면 변화율 함께 표시)"""
+    current = _flatten({k: results[k] for k in ('parse', 'db', 'loop') if k in results})
+    before = _flatten({k: previous[k] for k in ('parse', 'db', 'loop') if k in previous}) if previous else {}
+    print(f"\n========== 벤치마크 결과 ({results['revision'] or 'local'}) ==========")
+    for name, value in current.items():
+        line = f"{name:<52} {value:>14,.2f}"
+        old = before.get(name)
+        if old:
+            line += f"   ({(value - old) / old * 100:+.1f}%)"
+        print(line)
+    print("=" * 70)
+
+
+def run(parts=('parse', 'db', 'loop')):
+    results = {
+        'revision': _git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }
+    if 'parse' in parts:
+        corpus, real_count = build_corpus()
+        results['corpus'] = {'size': len(corpus), 'from_logs': real_count}
+        results['parse'] = bench_parse(corpus)
+    if 'db' in parts:
+        results['db'] = bench_db()
+    if 'loop' in parts:
+        results['loop'] = bench_loop()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="파서 / DB 기록 / 강화 루프 벤치마크")
+    parser.add_argument('parts', nargs='*', metavar='{parse,db,loop}', help="실행할 부분 (기본: 전체)")
+    parser.add_argument('--compare', default=None, help="비교할 이전 결과 JSON (기본: bench_results/의 마지막 결과)")
+    parser.add_argument('--no-save', action='store_true', help="결과를 저장하지 않음")
+    args = parser.parse_args()
+    unknown = set(args.parts) - {'parse', 'db', 'loop'}
+    if unknown:
+        parser.error(f"알 수 없는 부분: {', '.join(sorted(unknown))}")
+
+    results = run(args.parts or ('parse', 'db', 'loop'))
+    saved = None if args.no_save else save_results(results)
+
+    compare = args.compare or latest_results(exclude=saved)
+    previous = None
+    if compare:
+        with open(compare, encoding='utf-8') as f:
+            previous = json.load(f)
+    print_results(results, previous)
+    if saved:
+        print(f"💾 결과 저장: {saved}")
+    if compare:
+        print(f"📎 비교 대상: {compare}")
@@ -3,16 +3,22 @@
 
 Logger, 창 제어, 파싱, 명령 전송 등 공통 기능 제공
 """
-import pyautogui
-import pyperclip
-import pygetwindow as gw
 import time
 import re
 import sys
 import os
 import atexit
+import json
+import gzip
+import queue
+import shutil
+import threading
+from collections import deque
 from datetime import datetime
 
+import enhance_db
+import enhance_timing
+
 
 # ============================================================
 # 로그 설정
@@ -27,36 +33,206 @@ def get_log_dir():
     return log_dir
 
 
+# 로그 설정값
+LOG_MAX_BYTES = 5 * 1024 * 1024   # 로그 파일이 이 크기를 넘으면 새 파일로 교체
+LOG_ROTATE_SECONDS = 24 * 3600    # 또는 이 시간이 지나면 새 파일로 교체
+LOG_FILE_FLUSH_SECONDS = 0.5      # 파일 버퍼를 디스크로 내보내는 간격
+CONSOLE_MAX_LINES_PER_SEC = 50    # 콘솔 출력 제한 (None이면 무제한)
+FILE_MAX_LINES_PER_SEC = None     # 파일 기록 제한 (None이면 무제한, 로그 분석에 쓰이므로 기본 무제한)
+
+
+class _LineRateLimiter:
+    """초당 줄 수 제한 (토큰 버킷)"""
+
+    def __init__(self, lines_per_sec):
+        self.rate = lines_per_sec
+        self.tokens = lines_per_sec or 0
+        self.updated = time.monotonic()
+        self.suppressed = 0
+
+    def allow(self):
+        if self.rate is None:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.suppressed += 1
+        return False
+
+    def take_suppressed(self):
+        count, self.suppressed = self.suppressed, 0
+        return count
+
+
 class Logger:
-    """print 출력을 콘솔과 파일에 동시에 기록 (100줄마다 파일 저장)"""
-    def __init__(self, filename):
+    """print 출력을 콘솔과 파일에 동시에 기록
+    
+    write()는 대기열에 넣기만 하고, 콘솔/파일 기록은 백그라운드 스레드가 한다.
+    - 파일이 LOG_MAX_BYTES를 넘거나 LOG_ROTATE_SECONDS가 지나면 새 파일로 바꾸고 이전 파일은 gzip 압축
+    - 콘솔과 파일은 각각 초당 줄 수를 따로 제한 (넘친 줄은 생략하고 생략 개수만 표시)
+    """
+    def __init__(self, filename, log_prefix=None,
+                 max_bytes=LOG_MAX_BYTES, rotate_seconds=LOG_ROTATE_SECONDS,
+                 console_rate=CONSOLE_MAX_LINES_PER_SEC, file_rate=FILE_MAX_LINES_PER_SEC):
         self.terminal = sys.stdout
         self.filename = filename
-        self.buffer = []
-        self.line_count = 0
-        self.FLUSH_INTERVAL = 100
+        self.log_prefix = log_prefix
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self._console_limit = _LineRateLimiter(console_rate)
+        self._file_limit = _LineRateLimiter(file_rate)
+        self._queue = queue.SimpleQueue()
+        self._partial = ''
+        self._file = None
+        self._opened_at = 0.0
+        self._closed = False
+        self._open_file(filename)
+        self._thread = threading.Thread(target=self._run, name='logger', daemon=True)
+        self._thread.start()
         
     def write(self, message):
-        self.terminal.write(message)
-        self.buffer.append(message)
-        
-        # 줄바꿈 카운트
-        self.line_count += message.count('\n')
-        
-        # 100줄마다 파일에 저장
-        if self.line_count >= self.FLUSH_INTERVAL:
-            self._flush_to_file()
-        
-    def _flush_to_file(self):
-        if self.buffer:
-            with open(self.filename, 'a', encoding='utf-8') as f:
-                f.write(''.join(self.buffer))
-            self.buffer = []
-            self.line_count = 0
-        
+        if self._closed:
+            self.terminal.write(message)
+            return
+        self._queue.put(message)
+
     def flush(self):
-        self.terminal.flush()
-        self._flush_to_file()
+        """지금까지 쓴 내용이 콘솔/파일에 기록될 때까지 대기"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(2.0)
+
+    def close(self):
+        """남은 내용을 기록하고 백그라운드 스레드 종료"""
+        if self._closed:
+            return
+        self._queue.put(None)
+        self._thread.join(5.0)
+        self._closed = True
+
+    # --- 백그라운드 스레드 ---
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=LOG_FILE_FLUSH_SECONDS)
+            except queue.Empty:
+                item = ''
+            
+            # 한 번에 쌓인 것을 모아서 처리
+            chunks = []
+            events = []
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    chunks.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            
+            if chunks:
+                self._emit(''.join(chunks))
+            
+            now = time.monotonic()
+            if events or stop or now - last_flush >= LOG_FILE_FLUSH_SECONDS:
+                self._flush_sinks(final=stop)
+                last_flush = now
+            for event in events:
+                event.set()
+            if stop:
+                self._close_file(compress=False)
+                return
+
+    def _emit(self, text):
+        text = self._partial + text
+        lines = text.split('\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._write_line(line + '\n')
+
+    def _write_line(self, line):
+        if self._console_limit.allow():
+            skipped = self._console_limit.take_suppressed()
+            if skipped:
+                self.terminal.write(f"    … 콘솔 출력 {skipped}줄 생략\n")
+            self.terminal.write(line)
+        if self._file_limit.allow():
+            skipped = self._file_limit.take_suppressed()
+            if skipped:
+                self._file.write(f"    … 파일 기록 {skipped}줄 생략\n")
+            self._file.write(line)
+            self._maybe_rotate()
+
+    def _flush_sinks(self, final=False):
+        if final and self._partial:
+            self._write_line(self._partial)
+            self._partial = ''
+        if final:
+            skipped = self._console_limit.take_suppressed()
+            if skipped:
+                self.terminal.write(f"    … 콘솔 출력 {skipped}줄 생략\n")
+        try:
+            self.terminal.flush()
+        except (OSError, ValueError):
+            pass
+        if self._file is not None:
+            self._file.flush()
+
+    # --- 파일 교체 ---
+
+    def _open_file(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'a', encoding='utf-8')
+        self._opened_at = time.monotonic()
+
+    def _close_file(self, compress):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if compress:
+            _compress_log(self.filename)
+
+    def _maybe_rotate(self):
+        if self.log_prefix is None:
+            return
+        if self._file.tell() < self.max_bytes and time.monotonic() - self._opened_at < self.rotate_seconds:
+            return
+        self._close_file(compress=True)
+        self._open_file(_new_log_path(self.log_prefix))
+
+
+def _new_log_path(log_prefix):
+    """새 로그 파일 경로 (같은 초에 이미 있으면 번호를 붙임)"""
+    log_dir = get_log_dir()
+    base = f"{log_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    path = os.path.join(log_dir, f"{base}.txt")
+    n = 1
+    while os.path.exists(path) or os.path.exists(path + '.gz'):
+        path = os.path.join(log_dir, f"{base}_{n}.txt")
+        n += 1
+    return path
+
+
+def _compress_log(path):
+    """닫힌 로그 파일을 gzip으로 압축 (path.gz 생성 후 원본 삭제)"""
+    try:
+        with open(path, 'rb') as src, gzip.open(path + '.gz', 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+    except OSError as e:
+        sys.__stderr__.write(f"로그 압축 실패: {path} ({e})\n")
 
 
 def setup_logger(log_prefix):
@@ -66,17 +242,31 @@ def setup_logger(log_prefix):
         log_prefix: 로그 파일 접두사 (예: "enhance_data", "enhance_upgrade")
     
     Returns:
-        str: 로그 파일 경로
+        str: 로그 파일 경로 (크기/시간에 따라 같은 접두사의 새 파일로 이어서 기록됨)
     """
-    log_dir = get_log_dir()
-    log_file = os.path.join(log_dir, f"{log_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+    log_file = _new_log_path(log_prefix)
+    
+    sys.stdout = Logger(log_file, log_prefix)
+    
+    # 구간별 시간 측정이 켜져 있으면 주기적으로 DB에 내보냄
+    if enhance_timing.ENABLED:
+        enhance_timing.start_periodic_export()
+    
+    # 엑셀 자동 갱신이 켜져 있으면 DB에 기록한 뒤 Data.xlsx 등을 다시 만듦
+    # (enhance_workbook은 enhance_sim을 거쳐 이 모듈을 import하므로 여기서 import)
+    import enhance_workbook
+    if enhance_workbook.ENABLED:
+        enhance_workbook.start_auto_export()
     
-    sys.stdout = Logger(log_file)
+    # 상태 엔드포인트 포트가 지정되어 있으면 HTTP 서버 시작
+    import enhance_metrics
+    if enhance_metrics.PORT:
+        enhance_metrics.start_server()
     
-    # 프로그램 종료 시 남은 버퍼 저장
+    # 프로그램 종료 시 남은 내용 저장
     def _save_remaining_log():
         if isinstance(sys.stdout, Logger):
-            sys.stdout.flush()
+            sys.stdout.close()
     atexit.register(_save_remaining_log)
     
     print(f"📝 로그 파일: {log_file}")
@@ -87,6 +277,14 @@ def setup_logger(log_prefix):
 # 강화 결과 분석 함수
 # ============================================================
 
+# 함수마다 쓰는 패턴 (호출할 때마다 re 캐시를 찾지 않도록 미리 컴파일)
+_SUCCESS_PATTERN = re.compile(r"〖✨강화 성공✨ \+(\d+) → \+(\d+)〗")
+_LEGEND_PATTERN = re.compile(r"전설의 『\[\+(\d+)\] .+』 강화에 성공")
+_GOLD_PATTERN = re.compile(r"남은 골드: ([\d,]+)G")
+_SELL_GOLD_PATTERN = re.compile(r"현재 보유 골드: ([\d,]+)G")
+_LEVEL_PATTERN = re.compile(r"\[\+(\d+)\]")
+
+
 def check_enhancement_result(text):
     """강화 결과 분석
     
@@ -98,23 +296,21 @@ def check_enhancement_result(text):
             - (None, None): 알 수 없음
     """
     # 1. 성공 패턴 (예: +1 → +2)
-    success_match = re.search(r"〖✨강화 성공✨ \+(\d+) → \+(\d+)〗", text)
+    success_match = _SUCCESS_PATTERN.search(text)
     if success_match:
         return "success", int(success_match.group(2))
 
     # 1-2. 전설 강화 성공 패턴 10강 이상부터 적용됨
-    legend_success_match = re.search(r"전설의 『\[\+(\d+)\] .+』 강화에 성공", text)
+    legend_success_match = _LEGEND_PATTERN.search(text)
     if legend_success_match:
         return "success", int(legend_success_match.group(1))
 
     # 2. 유지 패턴
-    maintain_match = re.search(r"〖💦강화 유지💦〗", text)
-    if maintain_match:
+    if "〖💦강화 유지💦〗" in text:
         return "maintain", None
 
     # 3. 파괴 패턴
-    destroy_match = re.search(r"〖💥강화 파괴💥〗", text)
-    if destroy_match:
+    if "〖💥강화 파괴💥〗" in text:
         return "destroy", 0
 
     return None, None
@@ -122,7 +318,7 @@ def check_enhancement_result(text):
 
 def parse_gold_from_enhance(text):
     """강화 결과에서 골드 파싱 (남은 골드: 77,994G 형식)"""
-    match = re.search(r"남은 골드: ([\d,]+)G", text)
+    match = _GOLD_PATTERN.search(text)
     if match:
         gold_str = match.group(1).replace(',', '')
         return int(gold_str)
@@ -131,7 +327,7 @@ def parse_gold_from_enhance(text):
 
 def parse_gold_from_sell(text):
     """판매 결과에서 골드 파싱 (현재 보유 골드: 78,004G 형식)"""
-    match = re.search(r"현재 보유 골드: ([\d,]+)G", text)
+    match = _SELL_GOLD_PATTERN.search(text)
     if match:
         gold_str = match.group(1).replace(',', '')
         return int(gold_str)
@@ -144,8 +340,7 @@ def get_current_item_level(text):
     예: "『[+2] 그림자 갈망하는 몽둥이』" → 2
         "획득: [+0] 낡은 검" → 0
     """
-    pattern = r"\[\+(\d+)\]"
-    matches = re.findall(pattern, text)
+    matches = _LEVEL_PATTERN.findall(text)
     
     if matches:
         level = int(matches[-1])
@@ -157,35 +352,25 @@ def get_current_item_level(text):
 # 판매 대상 판단 함수
 # ============================================================
 
-# 판매 대상 키워드 (공통)
-SELL_KEYWORDS = ['검', '몽둥이', '망치', '도끼']
+# 아이템 분류는 enhance_db의 아이템 카탈로그에서 조회 (이름 → 분류 캐시, 처음 보는 이름은 접미사 규칙으로 분류)
+ITEM_CLASS_NORMAL = enhance_db.ITEM_CLASS_NORMAL    # 판매 대상 (검/몽둥이/망치/도끼)
+ITEM_CLASS_SPECIAL = enhance_db.ITEM_CLASS_SPECIAL  # 판매 비대상 (광선검 등 특별 아이템)
+
+_NEW_ITEM_PATTERN = re.compile(r"⚔️새로운 검 획득: \[\+\d+\] (.+)")
+_ITEM_PATTERN = re.compile(r"『\[\+\d+\] ([^』]+)』")
 
 
 def should_sell_item(text):
-    """텍스트 끝부분 키워드로 판매 대상 여부 판단
+    """새로 획득한 아이템의 판매 대상 여부 판단
     
     Returns:
         bool: True면 판매 대상 (일반 아이템)
               False면 판매 비대상 (특별 아이템)
     """
-    pattern = r"⚔️새로운 검 획득: \[\+\d+\] .+"
-    match = re.search(pattern, text)
-    if match:
-        text = match.group(0)
-    else:
+    match = _NEW_ITEM_PATTERN.search(text)
+    if not match:
         return True
-
-    text = text.strip()
-    
-    # 광선검은 판매하지 않음
-    if text.endswith('광선검'):
-        return False
-    
-    for keyword in SELL_KEYWORDS:
-        if text.endswith(keyword):
-            return True
-    
-    return False
+    return classify_item(match.group(1).strip()) == ITEM_CLASS_NORMAL
 
 
 def should_sell_destroyed_item(text, print_log=True):
@@ -195,8 +380,7 @@ def should_sell_destroyed_item(text, print_log=True):
         bool: True면 판매 대상 (일반 아이템)
               False면 판매 비대상 (특별 아이템)
     """
-    pattern = r"『\[\+\d+\] ([^』]+)』"
-    matches = re.findall(pattern, text)
+    matches = _ITEM_PATTERN.findall(text)
     
     if len(matches) >= 2:
         item_name = matches[1].strip()
@@ -205,21 +389,10 @@ def should_sell_destroyed_item(text, print_log=True):
     else:
         return True
     
-    # 광선검은 판매하지 않음
-    if item_name.endswith('광선검'):
-        if print_log:
-            print(f"    🌟 광선검 획득!: {item_name}")
-        return False
-    
-    for keyword in SELL_KEYWORDS:
-        if item_name.endswith(keyword):
-            if print_log:
-                print(f"    🗡️ 일반 아이템: {item_name}")
-            return True
-    
+    is_sell_item = classify_item(item_name) == ITEM_CLASS_NORMAL
     if print_log:
-        print(f"    ✨ 특별 아이템: {item_name}")
-    return False
+        _print_item(item_name, is_sell_item)
+    return is_sell_item
 
 
 def get_item_type_from_current_text(text):
@@ -229,110 +402,720 @@ def get_item_type_from_current_text(text):
         bool: True면 판매 대상 (일반 아이템)
               False면 판매 비대상 (특별 아이템)
     """
-    pattern = r"『\[\+\d+\] ([^』]+)』"
-    matches = re.findall(pattern, text)
+    matches = _ITEM_PATTERN.findall(text)
+    if not matches:
+        return True
+    return classify_item(matches[-1].strip()) == ITEM_CLASS_NORMAL
+
+
+def _print_item(item_name, is_sell_item):
+    if item_name.endswith('광선검'):
+        print(f"    🌟 광선검 획득!: {item_name}")
+    elif is_sell_item:
+        print(f"    🗡️ 일반 아이템: {item_name}")
+    else:
+        print(f"    ✨ 특별 아이템: {item_name}")
+
+
+# ============================================================
+# 단일 패스 응답 파서
+# ============================================================
+
+# 응답 한 건에서 필요한 모든 패턴을 하나로 묶어 한 번만 훑는다
+# - 모든 대안이 글자 하나로 시작해야 re가 그 글자들이 나오는 위치만 검사함 (그룹은 첫 글자 뒤에서 시작)
+# - 자주 나오는 대안이 앞, 이름은 『』/줄 끝까지만 (되돌아가며 다시 맞춰 보지 않도록)
+# - 전설 성공 (전설의 『...』)은 시작 위치가 앞이라 같은 『...』가 일반 아이템 표기로 다시 잡히지 않음
+_REPLY_PATTERN = re.compile(
+    r"『\[\+(?P<item_level>\d+)\] (?P<item>[^』\n]+)』"
+    r"|남은 골드: (?P<gold>[\d,]+)G"
+    r"|〖(?:✨강화 성공✨ \+(?P<success_old>\d+) → \+(?P<success_new>\d+)"
+    r"|(?P<maintain>💦강화 유지💦)|(?P<destroy>💥강화 파괴💥)|(?P<sword_sold>검 판매))〗"
+    r"|현재 보유 골드: (?P<sell_gold>[\d,]+)G"
+    r"|획득 골드: \+(?P<sell_price>[\d,]+)G"
+    r"|⚔️새로운 검 획득: \[\+\d+\] (?P<new_item>[^\n]+)"
+    r"|전설의 『\[\+(?P<legend_level>\d+)\] (?P<legend_name>[^』\n]+)』 강화에 성공"
+    r"|골드가 (?P<insufficient_gold>부족해)"
+    r"|0(?P<zero_unsellable>강검은 가치가 없어서 판매할 수 없다네)"
+)
+
+
+def classify_item(item_name):
+    """아이템 이름으로 분류 판단 (메모리의 아이템 카탈로그/접미사 규칙만 봄, DB 접근 없음)
+
+    Returns:
+        str: ITEM_CLASS_NORMAL / ITEM_CLASS_SPECIAL, 이름이 없으면 None
+    """
+    return enhance_db.classify_item(item_name)
+
+
+class ReplyEvent:
+    """봇 응답 한 건의 파싱 결과
+
+    result_type: "success" / "maintain" / "destroy" / None
+    old_level, new_level: 강화 전/후 레벨 (check_enhancement_result와 같은 규칙)
+    gold: 남은 골드 (강화 결과), sell_gold: 현재 보유 골드 (판매 결과)
+    item_name, item_class: 응답 이후 보유 중인 아이템 (새로 획득한 아이템 우선, 없으면 마지막 표기)
+    new_item_name, new_item_class: "⚔️새로운 검 획득" 으로 받은 아이템
+    sell_price, sold_item_name, sold_level: 판매 결과의 획득 골드와 판매한 아이템
+    insufficient_gold: "골드가 부족해", zero_unsellable: "0강검 판매 불가", sword_sold: "〖검 판매〗"
+    """
+    # 기본값은 클래스 속성 (응답에서 찾은 값만 인스턴스에 기록해서 만들 때 드는 시간을 줄임)
+    FIELDS = (
+        'result_type', 'old_level', 'new_level', 'gold', 'sell_gold',
+        'item_name', 'item_class', 'new_item_name', 'new_item_class',
+        'sell_price', 'sold_item_name', 'sold_level',
+        'insufficient_gold', 'zero_unsellable', 'sword_sold',
+    )
+    result_type = None
+    old_level = None
+    new_level = None
+    gold = None
+    sell_gold = None
+    item_name = None
+    item_class = None
+    new_item_name = None
+    new_item_class = None
+    sell_price = None
+    sold_item_name = None
+    sold_level = None
+    insufficient_gold = False
+    zero_unsellable = False
+    sword_sold = False
+
+    @property
+    def is_sell_item(self):
+        """보유 아이템이 판매 대상인지 (get_item_type_from_current_text와 같은 규칙)"""
+        return self.item_class != ITEM_CLASS_SPECIAL
+
+    @property
+    def is_sell_new_item(self):
+        """새로 획득한 아이템이 판매 대상인지 (should_sell_item과 같은 규칙)"""
+        return self.new_item_class != ITEM_CLASS_SPECIAL
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"ReplyEvent({fields})"
+
+
+def parse_reply(text):
+    """봇 응답을 한 번만 훑어서 ReplyEvent로 반환
+
+    결과 판정 우선순위는 check_enhancement_result와 같다 (성공 > 전설 성공 > 유지 > 파괴).
+    """
+    event = ReplyEvent()
+    if not text:
+        return event
+
+    success = legend = None
+    maintain = destroy = False
+    first_item = last_item = None  # first_item: 첫 『[+레벨] 이름』 표기 (강화/판매 전 아이템)
+    gold = sell_gold = sell_price = new_item = None
+
+    for match in _REPLY_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == 'item':
+            last_item = match['item']
+            if first_item is None:
+                first_item = match
+        elif kind == 'gold':
+            if gold is None:
+                gold = match['gold']
+        elif kind == 'success_new':
+            if success is None:
+                success = match
+        elif kind == 'maintain':
+            maintain = True
+        elif kind == 'destroy':
+            destroy = True
+        elif kind == 'sell_gold':
+            if sell_gold is None:
+                sell_gold = match['sell_gold']
+        elif kind == 'sell_price':
+            if sell_price is None:
+                sell_price = match['sell_price']
+        elif kind == 'new_item':
+            if new_item is None:
+                new_item = match['new_item']
+        elif kind == 'sword_sold':
+            event.sword_sold = True
+        elif kind == 'legend_name':
+            if legend is None:
+                legend = match
+            last_item = match['legend_name']
+        elif kind == 'insufficient_gold':
+            event.insufficient_gold = True
+        elif kind == 'zero_unsellable':
+            event.zero_unsellable = True
+
+    if success is not None:
+        event.result_type = "success"
+        event.old_level = int(success['success_old'])
+        event.new_level = int(success['success_new'])
+    elif legend is not None:
+        event.result_type = "success"
+        event.new_level = int(legend['legend_level'])
+    elif maintain:
+        event.result_type = "maintain"
+        event.old_level = int(first_item['item_level']) if first_item is not None else None
+    elif destroy:
+        event.result_type = "destroy"
+        event.old_level = int(first_item['item_level']) if first_item is not None else None
+        event.new_level = 0
+
+    # 숫자 변환은 값마다 한 번만 (같은 표기가 여러 번 나오면 첫 번째)
+    if gold is not None:
+        event.gold = int(gold.replace(',', ''))
+    if sell_gold is not None:
+        event.sell_gold = int(sell_gold.replace(',', ''))
+    if sell_price is not None:
+        event.sell_price = int(sell_price.replace(',', ''))
+        if first_item is not None:
+            event.sold_item_name = first_item['item'].strip()
+            event.sold_level = int(first_item['item_level'])
+
+    if new_item is not None:
+        event.new_item_name = event.item_name = new_item = new_item.strip()
+        event.new_item_class = event.item_class = enhance_db.classify_item(new_item)
+    elif last_item is not None:
+        event.item_name = last_item = last_item.strip()
+        event.item_class = enhance_db.classify_item(last_item)
+
+    return event
+
+
+def report_new_item(event, print_log=True):
+    """파괴 후 받은 새 아이템 판매 여부 판단 (should_sell_destroyed_item과 같은 출력)
     
-    if matches:
-        item_name = matches[-1].strip()
-        
-        if item_name.endswith('광선검'):
-            return False
-        
-        for keyword in SELL_KEYWORDS:
-            if item_name.endswith(keyword):
-                return True
-        
-        return False
+    Returns:
+        bool: True면 판매 대상 (일반 아이템)
+              False면 판매 비대상 (특별 아이템)
+    """
+    item_name = event.item_name
+    if item_name is None:
+        return True
     
-    return True
+    if print_log:
+        _print_item(item_name, event.item_class == ITEM_CLASS_NORMAL)
+    return event.is_sell_item
 
 
 # ============================================================
 # 창 제어 및 메시지 처리
 # ============================================================
 
-# 창 찾기 실패 카운터
-_window_not_found_count = 0
+# 창 찾기 실패 카운터 (창 제목별 - 한 창을 찾았다고 다른 창의 연속 실패가 초기화되지 않도록)
+_window_not_found_counts = {}  # 창 제목 → 연속 실패 횟수 (창을 찾으면 0으로)
+_window_not_found_totals = {}  # 창 제목 → 전체 실패 횟수 (enhance_metrics)
 MAX_WINDOW_NOT_FOUND = 180
 
 
-def reset_window_counter():
-    """창 찾기 실패 카운터 리셋"""
-    global _window_not_found_count
-    _window_not_found_count = 0
+class WindowNotFound(Exception):
+    """창을 MAX_WINDOW_NOT_FOUND번 연속으로 찾지 못함 (그 창의 매크로만 중단)"""
 
 
-def get_latest_message(target_window_title):
-    """창에서 가장 최근 메시지를 가져오는 함수"""
-    global _window_not_found_count
-    try:
-        windows = gw.getWindowsWithTitle(target_window_title)
+def reset_window_counter(target_window_title=None):
+    """창 찾기 실패 카운터 리셋 (None이면 모든 창)"""
+    if target_window_title is None:
+        _window_not_found_counts.clear()
+    else:
+        _window_not_found_counts.pop(target_window_title, None)
+
+
+class ChatTail:
+    """채팅 기록을 증분으로 읽는 커서
+
+    마지막으로 읽은 위치(offset)와 그 위치 주변 텍스트의 지문(fingerprint)을 기억해서,
+    다음 읽기 때는 그 이후의 새 텍스트만 검사한다.
+    지문이 맞지 않으면 (채팅창이 비워졌거나 앞부분이 잘린 경우) 전체를 다시 검사한다.
+
+    serial은 지금까지 본 메시지 수로, 새 메시지가 올라올 때만 늘어난다
+    (마지막 메시지 뒤에 입력한 명령어가 붙거나 앞부분이 잘려서 위치가 바뀌어도 그대로).
+    """
+    FINGERPRINT_LEN = 64
+
+    def __init__(self, keyword="@사용자"):
+        self.keyword = keyword
+        self.serial = 0         # 지금까지 본 메시지 수 (새 메시지마다 1씩 증가)
+        self.msg_start = -1     # 마지막 메시지 시작 위치 (-1이면 키워드 없음)
+        self.end = 0            # 마지막으로 읽은 텍스트 길이
+        self.fingerprint = None
+        self.latest = None
+
+    def _make_fingerprint(self, text):
+        head = text[self.msg_start:min(self.msg_start + self.FINGERPRINT_LEN, self.end)] if self.msg_start >= 0 else ""
+        tail = text[max(0, self.end - self.FINGERPRINT_LEN):self.end]
+        return hash((head, tail))
+
+    def _is_continuation(self, text):
+        """이전에 읽은 텍스트가 그대로 앞부분에 남아 있는지 확인"""
+        if self.fingerprint is None or len(text) < self.end:
+            return False
+        return self._make_fingerprint(text) == self.fingerprint
+
+    def reset(self):
+        """커서 초기화 (다음 읽기는 전체 검사)"""
+        self.serial = 0
+        self.msg_start = -1
+        self.end = 0
+        self.fingerprint = None
+        self.latest = None
+
+    def feed(self, text):
+        """새로 복사한 채팅 텍스트를 받아 새 메시지 목록 반환
+
+        마지막 메시지는 봇 응답이 이어 붙을 수 있으므로, 내용이 늘어났으면 다시 포함된다.
+
+        Returns:
+            list: 이전 읽기 이후 새로 생기거나 내용이 늘어난 메시지들 (오래된 순)
+        """
+        continuation = self._is_continuation(text)
+        if continuation:
+            # 경계에 걸친 키워드도 찾도록 키워드 길이만큼 앞에서 검색 시작
+            scan_from = max(self.end - len(self.keyword) + 1, self.msg_start + 1, 0)
+            grew = len(text) > self.end
+        else:
+            previous = self.latest
+            self.msg_start = -1
+            scan_from = 0
+            grew = True
+
+        starts = []
+        pos = text.find(self.keyword, scan_from)
+        while pos != -1:
+            starts.append(pos)
+            pos = text.find(self.keyword, pos + len(self.keyword))
+
+        messages = []
+        if starts:
+            if grew and self.msg_start >= 0 and scan_from > 0:
+                messages.append(text[self.msg_start:starts[0]])
+            for i, start in enumerate(starts):
+                stop = starts[i + 1] if i + 1 < len(starts) else len(text)
+                messages.append(text[start:stop])
+            self.msg_start = starts[-1]
+        elif grew:
+            messages.append(text[self.msg_start:] if self.msg_start >= 0 else text)
+
+        self.end = len(text)
+        self.fingerprint = self._make_fingerprint(text)
+        self.latest = text[self.msg_start:] if self.msg_start >= 0 else text
+        if continuation:
+            self.serial += len(starts)
+        elif previous is None or not self.latest.startswith(previous[:self.FINGERPRINT_LEN]):
+            self.serial += 1  # 전체를 다시 읽었으면 마지막 메시지가 바뀐 경우만 새 메시지로 셈
+        return messages
+
+
+# 창 제목별 채팅 커서
+_chat_tails = {}
+
+
+def get_chat_tail(target_window_title):
+    """창 제목에 해당하는 ChatTail 반환 (없으면 생성)"""
+    tail = _chat_tails.get(target_window_title)
+    if tail is None:
+        tail = ChatTail()
+        _chat_tails[target_window_title] = tail
+    return tail
+
+
+# ============================================================
+# 전송 계층 (Transport)
+# ============================================================
+
+# GUI 모듈은 실제 창을 제어할 때만 불러온다 (시뮬레이터는 GUI 없이 실행)
+pyautogui = None
+pyperclip = None
+gw = None
+
+
+def _load_gui():
+    """pyautogui / pyperclip / pygetwindow 지연 로드"""
+    global pyautogui, pyperclip, gw
+    if pyautogui is None:
+        import pyautogui as _pyautogui
+        import pyperclip as _pyperclip
+        import pygetwindow as _gw
+        pyautogui, pyperclip, gw = _pyautogui, _pyperclip, _gw
+
+
+class GuiTransport:
+    """실제 채팅 창을 pyautogui로 제어하는 전송 계층
+
+    전송 계층은 다음 메서드를 제공한다 (enhance_sim.SimTransport도 같은 형태):
+        send_command(title, command): 명령어 입력, 성공 여부 반환
+        stage_command(title, command): 다음 명령어를 엔터 없이 미리 입력, 성공 여부 반환
+        read_latest(title): 가장 최근 메시지 반환 (실패 시 None)
+        latest_position(title): 가장 최근 메시지의 번호 (새 메시지가 올라올 때만 달라짐, 모르면 None)
+        sleep(seconds): 대기
+        now(): 현재 시각 (초, 단조 증가)
+
+    창이 이미 활성화되어 있으면 다시 활성화하지 않고, 마지막으로 클릭한 곳(입력창/채팅창)이
+    같으면 클릭도 건너뛴다.
+    """
+
+    def __init__(self):
+        _load_gui()
+        self._windows = {}   # 창 제목별 마지막으로 찾은 창
+        self._focus = None   # (창 제목, 'input' 또는 'chat') 마지막으로 클릭한 곳
+        self._staged = {}    # 창 제목별 입력창에 미리 입력해 둔 명령어
+
+    def _find_window(self, target_window_title):
+        target_window = self._windows.get(target_window_title)
+        try:
+            if target_window is not None and target_window.isActive:
+                return target_window
+        except Exception:
+            pass  # 닫힌 창이면 다시 찾음
         
+        with enhance_timing.span('window.lookup'):
+            windows = gw.getWindowsWithTitle(target_window_title)
         if not windows:
-            _window_not_found_count += 1
-            print(f"오류: '{target_window_title}' 창을 찾을 수 없습니다. ({_window_not_found_count}/{MAX_WINDOW_NOT_FOUND})")
-            time.sleep(1)
-            if _window_not_found_count >= MAX_WINDOW_NOT_FOUND:
-                print(f"\n❌ 창을 {MAX_WINDOW_NOT_FOUND}번 찾을 수 없어 프로그램을 종료합니다.")
-                sys.exit(1)
+            self._windows.pop(target_window_title, None)
+            self._staged.pop(target_window_title, None)
+            self._focus = None
             return None
         
-        _window_not_found_count = 0
-
         target_window = windows[0]
         
-        if target_window.isMinimized:
-            target_window.restore()
-        target_window.activate()
-        
-        time.sleep(0.1)
+        with enhance_timing.span('window.activate'):
+            if target_window.isMinimized:
+                target_window.restore()
+            target_window.activate()
+            
+            time.sleep(0.1)
+        self._windows[target_window_title] = target_window
+        self._focus = None  # 다른 창이 끼어들었을 수 있으므로 다시 클릭
+        return target_window
 
-        # 창 중앙 클릭
+    def _click(self, target_window_title, target_window, area):
+        """입력창('input') 또는 채팅창('chat') 클릭 (이미 그곳에 있으면 건너뜀)"""
+        if self._focus == (target_window_title, area):
+            return
         center_x = target_window.left + (target_window.width // 10)
-        center_y = target_window.top + (target_window.height // 2)
-        pyautogui.click(center_x, center_y)
-        
-        # 전체 선택 및 복사
-        pyautogui.hotkey('ctrl', 'a')
-        pyautogui.hotkey('ctrl', 'c')
-        
-        text_data = pyperclip.paste()
-        
-        keyword = "@사용자"
-        last_index = text_data.rfind(keyword)
-        
-        if last_index != -1:
-            return text_data[last_index:]
+        if area == 'input':
+            center_y = target_window.bottom - 100
         else:
-            return text_data
+            center_y = target_window.top + (target_window.height // 2)
+        with enhance_timing.span(f'click.{area}'):
+            pyautogui.click(center_x, center_y)
+        self._focus = (target_window_title, area)
+
+    def read_latest(self, target_window_title):
+        """창에서 가장 최근 메시지를 가져오는 함수
+
+        Raises:
+            WindowNotFound: 이 창을 MAX_WINDOW_NOT_FOUND번 연속으로 찾지 못함
+        """
+        try:
+            target_window = self._find_window(target_window_title)
+            
+            if target_window is None:
+                count = _window_not_found_counts.get(target_window_title, 0) + 1
+                _window_not_found_counts[target_window_title] = count
+                _window_not_found_totals[target_window_title] = _window_not_found_totals.get(target_window_title, 0) + 1
+                print(f"오류: '{target_window_title}' 창을 찾을 수 없습니다. ({count}/{MAX_WINDOW_NOT_FOUND})")
+                time.sleep(1)
+                if count >= MAX_WINDOW_NOT_FOUND:
+                    print(f"\n❌ 창을 {MAX_WINDOW_NOT_FOUND}번 찾을 수 없어 매크로를 종료합니다.")
+                    raise WindowNotFound(f"'{target_window_title}' 창을 {MAX_WINDOW_NOT_FOUND}번 찾을 수 없음")
+                return None
+            
+            _window_not_found_counts[target_window_title] = 0
+
+            # 채팅창 클릭
+            self._click(target_window_title, target_window, 'chat')
+            
+            # 전체 선택 및 복사
+            with enhance_timing.span('read.copy'):
+                pyautogui.hotkey('ctrl', 'a')
+                pyautogui.hotkey('ctrl', 'c')
+            
+            with enhance_timing.span('read.paste'):
+                text_data = pyperclip.paste()
+            
+            # 이전에 읽은 위치 이후만 검사
+            with enhance_timing.span('read.tail'):
+                tail = get_chat_tail(target_window_title)
+                tail.feed(text_data)
+            return tail.latest
+
+        except WindowNotFound:
+            raise
+        except Exception as e:
+            self._focus = None
+            print(f"텍스트 추출 중 오류: {e}")
+            return None
+
+    def latest_position(self, target_window_title):
+        """가장 최근 메시지의 번호 (ChatTail.serial, 아직 읽지 않았으면 None)"""
+        tail = _chat_tails.get(target_window_title)
+        return tail.serial if tail is not None else None
+
+    def _type_command(self, command):
+        with enhance_timing.span('send.type'):
+            pyperclip.copy(command)
+            pyautogui.hotkey('ctrl', 'v')
+            time.sleep(0.1)
+            
+            pyautogui.press('space')
+            time.sleep(0.1)
+
+    def stage_command(self, target_window_title, command):
+        """다음 명령어를 입력창에 미리 입력 (엔터는 send_command에서)
+        
+        봇 응답을 기다리는 동안 호출하면 다음 send_command는 엔터만 누르면 된다.
+        """
+        if self._staged.get(target_window_title) == command:
+            return True
+        try:
+            target_window = self._find_window(target_window_title)
+            if target_window is None:
+                return False
+            
+            self._click(target_window_title, target_window, 'input')
+            if self._staged.pop(target_window_title, None) is not None:
+                pyautogui.hotkey('ctrl', 'a')
+                pyautogui.press('backspace')
+            self._type_command(command)
+            self._staged[target_window_title] = command
+            return True
+
+        except Exception as e:
+            self._staged.pop(target_window_title, None)
+            self._focus = None
+            print(f"명령어 미리 입력 중 오류: {e}")
+            return False
+
+    def send_command(self, target_window_title, command, not_found_delay=0):
+        """명령어를 입력하는 함수 (미리 입력해 둔 명령어가 같으면 엔터만 누름)"""
+        try:
+            target_window = self._find_window(target_window_title)
+            
+            if target_window is None:
+                print(f"오류: '{target_window_title}' 창을 찾을 수 없습니다.")
+                if not_found_delay:
+                    time.sleep(not_found_delay)
+                return False
+
+            self._click(target_window_title, target_window, 'input')
+
+            staged = self._staged.pop(target_window_title, None)
+            if staged != command:
+                if staged is not None:
+                    # 다른 명령어가 미리 입력되어 있으면 지우고 다시 입력
+                    pyautogui.hotkey('ctrl', 'a')
+                    pyautogui.press('backspace')
+                self._type_command(command)
+            
+            with enhance_timing.span('send.enter'):
+                pyautogui.press('enter')
+            
+            return True
+
+        except Exception as e:
+            self._staged.pop(target_window_title, None)
+            self._focus = None
+            print(f"명령어 입력 중 오류: {e}")
+            return False
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def now(self):
+        return time.monotonic()
 
-    except Exception as e:
-        print(f"텍스트 추출 중 오류: {e}")
-        return None
+
+_transport = None
+
+
+def get_transport():
+    """현재 전송 계층 반환 (설정 전이면 GuiTransport 생성)"""
+    global _transport
+    if _transport is None:
+        _transport = GuiTransport()
+    return _transport
+
+
+def set_transport(transport):
+    """전송 계층 교체 (예: enhance_sim.SimTransport)"""
+    global _transport
+    _transport = transport
+
+
+def pause(seconds):
+    """전송 계층 기준으로 대기 (시뮬레이터에서는 가상 시간만 흐름)"""
+    get_transport().sleep(seconds)
+
+
+def get_latest_message(target_window_title):
+    """창에서 가장 최근 메시지를 가져오는 함수"""
+    with enhance_timing.span('get_latest_message'):
+        return get_transport().read_latest(target_window_title)
+
+
+# 봇 응답 대기 설정
+FAST_PROBE_INTERVAL = 0.05   # 예상 응답 시간 근처에서의 확인 간격 (초)
+MAX_PROBE_INTERVAL = 0.5     # 응답이 늦어질 때 최대 확인 간격 (초)
+PROBE_BACKOFF = 1.5          # 예상 시간을 넘긴 뒤 확인 간격 증가 배수
+INITIAL_BOT_LATENCY = 0.3    # 측정 전 기본 예상 응답 시간 (초)
+
+
+class BotLatencyTracker:
+    """봇 응답 시간 추적 (지수 이동 평균)
+
+    대기 전략이 실제 응답 시간에 맞춰 첫 확인 시점과 확인 간격을 조정하는 데 사용
+    """
+    SMOOTHING = 0.2
+
+    def __init__(self, initial=INITIAL_BOT_LATENCY):
+        self.average = initial
+        self.last = None
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, elapsed):
+        self.last = elapsed
+        self.count += 1
+        self.total += elapsed
+        self.average += (elapsed - self.average) * self.SMOOTHING
+
+    def first_probe_delay(self, min_delay=0.0):
+        """첫 확인까지 대기 시간 (예상 응답 시간의 절반, 최소 min_delay)"""
+        return max(min_delay, self.average * 0.5)
+
+    def next_interval(self, elapsed, interval):
+        """다음 확인까지 간격 (예상 시간 2배까지는 빠르게, 이후 점점 느리게)"""
+        if elapsed < self.average * 2:
+            return FAST_PROBE_INTERVAL
+        return min(max(interval, FAST_PROBE_INTERVAL) * PROBE_BACKOFF, MAX_PROBE_INTERVAL)
+
+
+# 창 제목별 응답 시간 추적기
+_latency_trackers = {}
+
+
+def get_latency_tracker(target_window_title):
+    """창 제목에 해당하는 BotLatencyTracker 반환 (없으면 생성)"""
+    tracker = _latency_trackers.get(target_window_title)
+    if tracker is None:
+        tracker = BotLatencyTracker()
+        _latency_trackers[target_window_title] = tracker
+    return tracker
+
+
+def get_last_wait_time(target_window_title):
+    """마지막 봇 응답 대기에 걸린 시간 (초, 측정 전이면 None)"""
+    return get_latency_tracker(target_window_title).last
+
+
+# 이미 처리한 응답 판별 설정
+STALE_RESEND_MIN = 0.5   # 이전 응답만 보일 때 명령어를 다시 입력하기까지 최소 대기 시간 (초)
+MAX_RESENDS = 3          # 명령어 다시 입력 최대 횟수
+
+_consumed = {}        # 창 제목별 마지막으로 처리한 응답의 지문
+_pending_command = {}  # 창 제목별 보냈지만 아직 응답을 받지 못한 명령어
+_sent_position = {}    # 창 제목별 명령어를 보낼 때의 가장 최근 메시지 번호 (모르면 None)
+
+
+def reply_fingerprint(target_window_title, text):
+    """응답 지문 (메시지 내용과 채팅 기록 안의 위치의 해시)
+    
+    같은 내용의 응답이라도 새로 올라온 메시지는 위치가 다르므로 지문이 다르다.
+    """
+    return hash((get_transport().latest_position(target_window_title), text))
 
 
-def wait_for_bot_response(target_window_title, max_retries=180):
+def is_waiting_for_bot(text):
+    """마지막 메시지가 아직 명령어로 끝나는지 확인 (명령어가 그 메시지 뒤에 붙어 있음)"""
+    text_stripped = text.strip()
+    return text_stripped.endswith('/판매') or text_stripped.endswith('/강화')
+
+
+def wait_for_bot_response(target_window_title, max_retries=180, min_delay=0.0, stage=None):
     """봇 응답을 기다리는 함수
     
+    고정 간격 대신 측정된 봇 응답 시간에 맞춰 확인한다.
+    예상 응답 시간 전후로는 짧은 간격으로 확인하고, 늦어지면 간격을 점점 늘린다.
+    
+    응답 판단은 메시지 번호 (transport.latest_position)로 한다: 명령어를 보낼 때보다 번호가 늘었으면
+    새 봇 메시지가 올라온 것이므로 바로 반환하고 걸린 시간을 기록한다.
+    번호가 늘었는데 그 메시지가 보낸 명령어로 끝나면 명령어보다 먼저 올라온 메시지이므로 계속 기다린다.
+    번호를 모르면 (첫 읽기 전) 명령어로 끝나지 않고 이미 처리한 응답(지문)이 아닌 메시지를 응답으로 본다.
+    
+    명령어를 보낸 뒤 이전 응답만 계속 보이면 (번호 그대로, 명령어도 안 보임) 입력이 사라진 것이므로
+    명령어를 다시 입력한다.
+    
+    Args:
+        target_window_title: 대상 창 제목
+        max_retries: 최대 확인 횟수
+        min_delay: 첫 확인 전 최소 대기 시간 (초)
+        stage: 첫 확인 전 대기 시간 동안 입력창에 미리 넣어 둘 다음 명령어 (None이면 안 함)
+    
     Returns:
-        str: 봇 응답이 포함된 메시지
+        str: 봇 응답이 포함된 메시지 (시간 초과 시 마지막으로 읽은 메시지, 이전 응답뿐이었으면 None)
     """
+    transport = get_transport()
+    tracker = get_latency_tracker(target_window_title)
+    command = _pending_command.pop(target_window_title, None)
+    baseline = _sent_position.pop(target_window_title, None) if command is not None else None
+    resends = 0
+    start = transport.now()
+    if stage is not None:
+        with enhance_timing.span('stage_command'):
+            transport.stage_command(target_window_title, stage)
+    transport.sleep(max(0.0, tracker.first_probe_delay(min_delay) - (transport.now() - start)))
+    
+    interval = FAST_PROBE_INTERVAL
     result_text = None
     for i in range(max_retries): 
         result_text = get_latest_message(target_window_title)
         
+        # new: 새 봇 메시지, stale: 이전 응답만 보이고 명령어도 안 보임, waiting: 명령어가 보임 (응답 전)
+        waiting = result_text is not None and is_waiting_for_bot(result_text)
         if result_text is None:
-            time.sleep(0.5)
-            continue
+            reply = None
+        elif baseline is not None:
+            position = transport.latest_position(target_window_title)
+            if position == baseline:
+                reply = 'waiting' if waiting else 'stale'
+            elif waiting:
+                baseline = position  # 명령어보다 먼저 올라온 메시지 (명령어가 그 뒤에 붙음)
+                reply = 'waiting'
+            else:
+                reply = 'new'
+        elif waiting:
+            reply = 'waiting'
+        elif command is None or reply_fingerprint(target_window_title, result_text) != _consumed.get(target_window_title):
+            reply = 'new'
+        else:
+            reply = 'stale'
         
-        text_stripped = result_text.strip()
+        if reply == 'new':
+            _consumed[target_window_title] = reply_fingerprint(target_window_title, result_text)
+            elapsed = transport.now() - start
+            tracker.update(elapsed)
+            enhance_timing.record('wait.bot_latency', elapsed * 1000)  # 전송 계층 시계 기준
+            print(f"    ⏱️ 응답 시간: {elapsed * 1000:.0f}ms (평균 {tracker.average * 1000:.0f}ms)")
+            return result_text
         
-        if text_stripped.endswith('/판매') or text_stripped.endswith('/강화'):
+        if reply == 'stale':
+            # 이전 응답만 보임 → 명령어가 입력되지 않음
+            elapsed = transport.now() - start
+            if resends < MAX_RESENDS and elapsed >= max(STALE_RESEND_MIN, tracker.average * 2):
+                resends += 1
+                print(f"    🔁 이전 응답만 보임 (명령어 유실) → {command} 다시 입력 ({resends}/{MAX_RESENDS})")
+                transport.send_command(target_window_title, command)
+                start = transport.now()
+                interval = FAST_PROBE_INTERVAL
+                transport.sleep(tracker.first_probe_delay(min_delay))
+                continue
+            result_text = None
+        elif reply == 'waiting':
             print(f"    ⏳ 봇 응답 대기 중... ({i + 1}/{max_retries})")
-            time.sleep(0.5)
-            continue
         
-        return result_text
+        interval = tracker.next_interval(transport.now() - start, interval)
+        transport.sleep(interval)
     
     print("    ⚠️ 봇 응답 대기 시간 초과. 아마 서버가 터졌을수도")
     return result_text
@@ -342,86 +1125,146 @@ def wait_for_bot_response(target_window_title, max_retries=180):
 # 명령어 전송
 # ============================================================
 
+def _send_command(target_window_title, command, not_found_delay=0):
+    """명령어 입력 후 응답을 기다릴 명령어와 그때의 메시지 번호를 기억 (wait_for_bot_response가 응답 판단/유실 시 다시 입력)"""
+    transport = get_transport()
+    position = transport.latest_position(target_window_title)
+    sent = transport.send_command(target_window_title, command, not_found_delay=not_found_delay)
+    if sent:
+        _pending_command[target_window_title] = command
+        _sent_position[target_window_title] = position
+    return sent
+
+
 def send_sell_command(target_window_title):
     """판매 명령어를 입력하는 함수"""
-    try:
-        windows = gw.getWindowsWithTitle(target_window_title)
-        
-        if not windows:
-            print(f"오류: '{target_window_title}' 창을 찾을 수 없습니다.")
-            return False
+    with enhance_timing.span('send_sell_command'):
+        return _send_command(target_window_title, '/판매')
 
-        target_window = windows[0]
-        
-        if target_window.isMinimized:
-            target_window.restore()
-        target_window.activate()
-        
-        time.sleep(0.1)
-        center_x = target_window.left + (target_window.width // 10)
-        center_y = target_window.bottom - 100
-        pyautogui.click(center_x, center_y)
 
-        pyperclip.copy('/판매')
-        pyautogui.hotkey('ctrl', 'v')
-        time.sleep(0.1)
-        
-        pyautogui.press('space')
-        time.sleep(0.1)
-        
-        pyautogui.press('enter')
-        
-        return True
+def send_enhance_command(target_window_title):
+    """강화 명령어를 입력하는 함수"""
+    with enhance_timing.span('send_enhance_command'):
+        return _send_command(target_window_title, '/강화', not_found_delay=1)
 
-    except Exception as e:
-        print(f"명령어 입력 중 오류: {e}")
-        return False
 
+# ============================================================
+# 시도 속도 측정
+# ============================================================
 
-def send_enhance_command(target_window_title):
-    """강화 명령어를 입력하는 함수"""
-    try:
-        windows = gw.getWindowsWithTitle(target_window_title)
-        
-        if not windows:
-            print(f"오류: '{target_window_title}' 창을 찾을 수 없습니다.")
-            time.sleep(1)
-            return False
+class AttemptRateMeter:
+    """최근 WINDOW초 동안의 분당 강화 시도 수 (전송 계층 시계 기준)"""
+    WINDOW = 60.0
 
-        target_window = windows[0]
-        
-        if target_window.isMinimized:
-            target_window.restore()
-        target_window.activate()
-        
-        time.sleep(0.1)
-        center_x = target_window.left + (target_window.width // 10)
-        center_y = target_window.bottom - 100
-        pyautogui.click(center_x, center_y)
+    def __init__(self):
+        self._times = deque()
 
-        pyperclip.copy('/강화')
-        pyautogui.hotkey('ctrl', 'v')
-        time.sleep(0.1)
-        
-        pyautogui.press('space')
-        time.sleep(0.1)
-        
-        pyautogui.press('enter')
-        
-        return True
+    def tick(self):
+        """시도 1회 기록"""
+        now = get_transport().now()
+        self._times.append(now)
+        while now - self._times[0] > self.WINDOW:
+            self._times.popleft()
 
-    except Exception as e:
-        print(f"명령어 입력 중 오류: {e}")
-        return False
+    def per_minute(self):
+        """분당 시도 수 (기록이 2개 미만이면 None)"""
+        if len(self._times) < 2:
+            return None
+        span = self._times[-1] - self._times[0]
+        if span <= 0:
+            return None
+        return (len(self._times) - 1) * 60.0 / span
+
+    def format(self):
+        """시도 줄에 붙일 속도 표시 (측정 전이면 빈 문자열)"""
+        rate = self.per_minute()
+        return f" | 속도: {rate:.0f}회/분" if rate is not None else ""
+
+
+class GoldRateMeter:
+    """최근 WINDOW초 동안의 시간당 골드 증감과 시간당 강화 시도 수 (전송 계층 시계 기준)
+
+    골드는 판매할 때 크게 오르고 강화할 때마다 조금씩 줄어서, 분당 시도 수보다 긴 구간으로 본다.
+    """
+    WINDOW = 600.0
+    MIN_SPAN = 10.0  # 이보다 짧은 구간은 계산하지 않음
+
+    def __init__(self):
+        self._samples = deque()  # (시각, 골드, 누적 시도 수)
+
+    def observe(self, gold, attempts):
+        """골드 관측값 기록 (gold가 None이면 무시)"""
+        if gold is None:
+            return
+        now = get_transport().now()
+        self._samples.append((now, gold, attempts))
+        # 구간 시작 직전 관측값 하나는 남겨서 구간 전체를 덮음
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self.WINDOW:
+            self._samples.popleft()
+
+    def per_hour(self):
+        """(시간당 골드 증감, 시간당 시도 수) (관측 구간이 MIN_SPAN초 미만이면 None)"""
+        if len(self._samples) < 2:
+            return None
+        (start, start_gold, start_attempts), (end, end_gold, end_attempts) = self._samples[0], self._samples[-1]
+        span = end - start
+        if span < self.MIN_SPAN:
+            return None
+        return (end_gold - start_gold) * 3600.0 / span, (end_attempts - start_attempts) * 3600.0 / span
+
+    def format(self):
+        """수익 표시 (측정 전이면 빈 문자열)"""
+        rates = self.per_hour()
+        if rates is None:
+            return ""
+        gold, attempts = rates
+        return f"📈 수익: {gold:+,.0f}G/시간 | {attempts:,.0f}회/시간 (최근 {self.WINDOW / 60:.0f}분)"
 
 
 # ============================================================
 # 골드 기반 목표 레벨 결정 (enhance_macro_data 전용)
 # ============================================================
 
+TARGET_TABLE_PATH = os.path.join(os.path.dirname(__file__), 'target_levels.json')
+
+# 기본 골드 구간 (target_levels.json이 없을 때 사용): [최소 골드, 목표 레벨]
+DEFAULT_TARGET_TABLE = [
+    [0, 6],
+    [20000, 7],
+    [140000, 9],
+    [340000, 10],
+    [760000, 11],
+    [1600000, 12],
+    [4000000, 13],
+]
+
+_target_table = None
+
+
+def load_target_table(path=TARGET_TABLE_PATH):
+    """골드 → 목표 레벨 표 로드 (enhance_montecarlo.py가 만든 target_levels.json)
+    
+    파일이 없거나 읽을 수 없으면 DEFAULT_TARGET_TABLE 사용
+    """
+    global _target_table
+    table = DEFAULT_TARGET_TABLE
+    if os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                loaded = json.load(f).get('table')
+            if loaded:
+                table = sorted([int(min_gold), int(target)] for min_gold, target in loaded)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️ 목표 레벨 표를 읽을 수 없어 기본값 사용: {e}")
+    _target_table = table
+    return table
+
+
 def get_target_level_by_gold(gold):
     """골드에 따른 목표 레벨 결정
     
+    target_levels.json이 있으면 그 표를, 없으면 기본 구간을 사용
+    
     골드 <= 2만: 6강
     골드 >= 2만: 7강
     골드 >= 14만: 9강
@@ -433,17 +1276,10 @@ def get_target_level_by_gold(gold):
     if gold is None:
         return 7
     
-    if gold >= 4000000:
-        return 13
-    elif gold >= 1600000:
-        return 12
-    elif gold >= 760000:
-        return 11
-    elif gold >= 340000:
-        return 10
-    elif gold >= 140000:
-        return 9
-    elif gold >= 20000:
-        return 7
-    else:
-        return 6
+    table = _target_table if _target_table is not None else load_target_table()
+    target = table[0][1]
+    for min_gold, level in table:
+        if gold < min_gold:
+            break
+        target = level
+    return target
@@ -1,89 +1,378 @@
 import sqlite3
 import os
+import sys
+import time
+import queue
+import signal
 import atexit
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+
+import enhance_timing
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'enhance_data.db')
 
-# 버퍼 설정
+# 버퍼 설정 (기록은 별도 쓰기 스레드가 담당)
 FLUSH_INTERVAL = 100  # 100번마다 DB에 기록
+FLUSH_MS = 1000       # 또는 마지막 기록 후 1초가 지나면 DB에 기록
+SLOW_FLUSH_MS = 200   # DB 기록이 이보다 오래 걸릴 때만 콘솔에 출력 (걸린 시간은 enhance_timing의 db.flush)
 _buffer = {}  # {level: {'success': 0, 'stay': 0, 'break': 0}}
 _buffer_count = 0  # 총 버퍼된 횟수
+_attempt_rows = []  # attempts 테이블에 기록할 시도별 행
+_gold_rows = []     # gold_samples 테이블에 기록할 골드 관측값
+_item_rows = []     # items 테이블에 기록할 아이템 관측 (처음 본 이름, 획득)
+_sale_rows = []     # item_prices 테이블에 기록할 판매 가격
+_delta_counts = {}  # gold_deltas 테이블에 더할 {(종류, 레벨, 골드 차이): 횟수}
+_checkpoints = {}   # checkpoints 테이블에 기록할 창별 마지막 상태 {창 제목: 행}
+
+# 시도 기록 설정
+SESSION_ID = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+ATTEMPT_RETENTION_DAYS = 30  # 이보다 오래된 시도별 기록은 시간별 집계만 남기고 삭제 (None이면 보관)
+COMPACT_INTERVAL = 3600      # 오래된 기록 정리 간격 (초)
+GOLD_RAW_RETENTION_DAYS = 1      # 이보다 오래된 골드 관측값은 분 단위로 줄임
+GOLD_MINUTE_RETENTION_DAYS = 30  # 이보다 오래된 분 단위 골드는 시간 단위로 줄임
+_last_compact = 0.0
+_session_local = threading.local()  # 스레드별 세션 이름 (enhance_scheduler가 창마다 지정)
+
+# 쓰기 스레드
+_queue = queue.SimpleQueue()  # 매크로 스레드 → 쓰기 스레드 (기록만 넣고 바로 반환)
+_lock = threading.RLock()     # 버퍼와 DB 연결 보호
+_writer = None
+_writer_stop = threading.Event()
+_flush_stats = {'flushes': 0, 'last_ms': 0.0, 'total_ms': 0.0, 'max_ms': 0.0}
+_flush_listeners = []  # DB에 기록할 때마다 호출할 함수 (enhance_workbook 자동 갱신 등)
+
+# 통계 캐시 (레벨별 횟수 배열, 인덱스가 레벨)
+# 조회 값 = DB에 기록된 값 + 아직 기록되지 않은 값 (대기열 + 버퍼)
+OUTCOMES = ('success', 'stay', 'break')
+_stats_lock = threading.Lock()
+_stats_path = None                                  # 캐시를 읽어 온 DB 경로 (None이면 다시 읽어야 함)
+_stored = {outcome: array('q') for outcome in OUTCOMES}   # DB에 기록된 횟수
+_pending = {outcome: array('q') for outcome in OUTCOMES}  # 기록 대기 중인 횟수 (_pending_counts[_stats_path])
+_pending_counts = {}                                # DB 경로 → 그 DB에 기록 대기 중인 횟수
+_recorded = {outcome: array('q') for outcome in OUTCOMES} # 이 프로세스가 기록한 횟수 (enhance_metrics)
+_has_row = bytearray()                              # enhance_stats에 행이 있는 레벨
+
+# 아이템 카탈로그 캐시 (items, item_rules 테이블)
+# 분류는 메모리에서만 함 (이름 → 분류 사전, 없으면 접미사 규칙), DB 기록은 엔진이 record_item으로
+ITEM_CLASS_NORMAL = 'normal'    # 판매 대상
+ITEM_CLASS_SPECIAL = 'special'  # 판매 비대상
+_items_path = None    # 캐시를 읽어 온 DB 경로 (None이면 아직 기본 규칙만 씀)
+_item_classes = {}    # 아이템 이름 → 분류 (DB의 items)
+_item_rules = {}      # 이름 접미사 → 분류 (가장 긴 접미사가 우선, INITIAL_ITEM_RULES로 시작)
+_max_suffix = 0       # 가장 긴 접미사 길이
+_rule_classes = {}    # 아이템 이름 → 규칙으로 분류한 결과 (규칙이 바뀌면 비움)
+
+# 골드 차이로 학습하는 레벨별 강화 비용 (판매 가격은 응답에 그대로 나오므로 item_prices를 씀)
+DELTA_ENHANCE_COST = 'enhance_cost'  # 강화 전 골드 - 강화 후 남은 골드
+DELTA_MIN_SAMPLES = 3  # 이보다 적게 관측한 레벨은 학습값으로 쓰지 않음
+
+# 창별 매크로 상태 체크포인트 (checkpoints 테이블 열 순서)
+CHECKPOINT_FIELDS = (
+    'title', 'ts', 'session', 'level', 'item_name', 'item_class', 'gold', 'target_level',
+    'attempts', 'success', 'maintain', 'destroy', 'cycles', 'finished',
+)
+
+
+# 초기 데이터 (이미지에서 가져온 값)
+INITIAL_STATS = [
+    # (Level, Try, Success, Stay, Break)
+    (0, 4604, 4604, 0, 0),
+    (1, 5065, 4549, 516, 0),
+    (2, 5658, 4544, 1114, 0),
+    (3, 6305, 4426, 1766, 113),
+    (4, 6806, 4058, 2385, 363),
+    (5, 6721, 3345, 2666, 710),
+    (6, 6035, 2748, 2696, 591),
+    (7, 5454, 2186, 2718, 550),
+    (8, 4707, 1687, 2539, 481),
+    (9, 4285, 1267, 2611, 407),
+    (10, 3494, 896, 2236, 362),
+    (11, 2893, 637, 1998, 258),
+    (12, 2076, 448, 1442, 186),
+    (13, 1485, 290, 1051, 144),
+    (14, 1142, 181, 853, 108),
+    (15, 723, 102, 547, 74),
+    (16, 470, 48, 367, 55),
+    (17, 266, 22, 218, 26),
+    (18, 125, 6, 103, 16),
+    (19, 46, 1, 40, 5),
+]
+
+# 레벨별 판매가 (Data.xlsx의 CommonSalePrice / HiddenSalePrice, 원래 표처럼 +14 / +13 위는 같은 값)
+COMMON_SALE_PRICES = [  # 일반 아이템
+    0, 10, 30, 90, 230, 600, 1900, 4500, 10500, 29000,
+    75000, 180000, 410000, 900000, 1500000, 1500000, 1500000, 1500000, 1500000, 1500000,
+]
+HIDDEN_SALE_PRICES = [  # 특별 아이템
+    0, 100, 260, 750, 1600, 3700, 10000, 22000, 50000, 125000,
+    260000, 600000, 1250000, 2100000, 2100000, 2100000, 2100000, 2100000, 2100000, 2100000,
+]
+SALE_PRICES = {ITEM_CLASS_NORMAL: COMMON_SALE_PRICES, ITEM_CLASS_SPECIAL: HIDDEN_SALE_PRICES}
+
+# 아이템 분류 규칙 초기값 (이름 접미사, 분류) - 규칙에 없는 이름은 특별 아이템
+INITIAL_ITEM_RULES = [
+    ('검', ITEM_CLASS_NORMAL),
+    ('몽둥이', ITEM_CLASS_NORMAL),
+    ('망치', ITEM_CLASS_NORMAL),
+    ('도끼', ITEM_CLASS_NORMAL),
+    ('광선검', ITEM_CLASS_SPECIAL),  # 광선검은 판매하지 않음
+]
+_item_rules = dict(INITIAL_ITEM_RULES)
+_max_suffix = max(map(len, _item_rules))
+
+
+_conn = None
+_conn_path = None
+_schema_paths = set()  # 테이블을 확인한 DB 경로 (연결을 처음 열 때 init_db 실행)
+_exit_hooks_registered = False
+
+
+def _register_exit_hooks():
+    """프로그램 종료 시 쓰기 스레드 정리 및 버퍼 저장 후 연결 종료 (DB를 처음 쓸 때 한 번 등록, 등록 역순으로 실행)"""
+    global _exit_hooks_registered
+    if not _exit_hooks_registered:
+        _exit_hooks_registered = True
+        atexit.register(close_connection)
+        atexit.register(stop_writer)
 
 
 def get_connection():
-    """DB 연결 반환"""
-    return sqlite3.connect(DB_PATH)
+    """DB 연결 반환 (프로세스당 하나의 연결을 계속 사용)
+    
+    WAL 모드라 매크로가 쓰는 동안에도 다른 프로세스(엑셀 갱신, 통계 조회)가 읽을 수 있다.
+    DB_PATH가 바뀌면 새 경로로 다시 연결한다. 경로마다 처음 연결할 때 테이블을 만든다 (init_db).
+    """
+    global _conn, _conn_path
+    if _conn is None or _conn_path != DB_PATH:
+        close_connection()
+        _register_exit_hooks()
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        _conn.execute('PRAGMA journal_mode=WAL')
+        _conn.execute('PRAGMA synchronous=NORMAL')
+        _conn.execute('PRAGMA temp_store=MEMORY')
+        _conn.execute('PRAGMA cache_size=-8000')
+        _conn_path = DB_PATH
+        if DB_PATH not in _schema_paths:
+            _schema_paths.add(DB_PATH)
+            init_db()
+    return _conn
+
+
+@contextmanager
+def transaction():
+    """쓰기 스레드와 겹치지 않게 DB 트랜잭션 실행 (성공 시 commit, 예외 시 rollback)"""
+    with _lock:
+        conn = get_connection()
+        with conn:
+            yield conn
+
+
+def close_connection():
+    """유지 중인 DB 연결 종료"""
+    global _conn, _conn_path
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+            _conn_path = None
 
 
 def init_db():
     """DB 초기화 - 테이블이 없으면 생성하고 초기값 삽입
     
-    이미 데이터가 있으면 아무것도 하지 않음 (한 번만 실행)
+    이미 데이터가 있으면 테이블만 확인함.
+    DB를 처음 쓸 때 (get_connection) 자동으로 실행되므로 따로 부를 필요는 없다.
     """
     conn = get_connection()
     cursor = conn.cursor()
     
-    # 테이블 생성
-    cursor.execute('''
+    # 테이블 생성 (퍼센트는 저장하지 않고 enhance_stats_view에서 계산)
+    stats_schema = '''
         CREATE TABLE IF NOT EXISTS enhance_stats (
             Level INTEGER PRIMARY KEY,
             Try INTEGER DEFAULT 0,
             Success INTEGER DEFAULT 0,
             Stay INTEGER DEFAULT 0,
-            Break INTEGER DEFAULT 0,
-            SuccessPer REAL DEFAULT 0,
-            StayPer REAL DEFAULT 0,
-            BreakPer REAL DEFAULT 0
+            Break INTEGER DEFAULT 0
+        )
+    '''
+    cursor.execute(stats_schema)
+    cursor.execute('DROP VIEW IF EXISTS enhance_stats_view')
+    if 'SuccessPer' in {row[1] for row in cursor.execute('PRAGMA table_info(enhance_stats)')}:
+        # 예전 DB: 기록할 때 갱신하지 않아 틀린 값이 남는 SuccessPer/StayPer/BreakPer 열 제거
+        cursor.execute('ALTER TABLE enhance_stats RENAME TO enhance_stats_old')
+        cursor.execute(stats_schema)
+        cursor.execute('''
+            INSERT INTO enhance_stats (Level, Try, Success, Stay, Break)
+            SELECT Level, Try, Success, Stay, Break FROM enhance_stats_old
+        ''')
+        cursor.execute('DROP TABLE enhance_stats_old')
+        print("✅ enhance_stats 퍼센트 열 제거 (퍼센트는 enhance_stats_view에서 계산)")
+    
+    # 시도별 기록 (추가만 함)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attempts (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            session TEXT NOT NULL,
+            level INTEGER NOT NULL,
+            outcome TEXT NOT NULL,
+            gold INTEGER,
+            item_name TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_attempts_level_ts ON attempts (level, ts)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_attempts_session_ts ON attempts (session, ts)')
+    
+    # 시간별 레벨 집계 (hour: 해당 시간 시작 시각, 유닉스 초)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attempts_hourly (
+            hour INTEGER NOT NULL,
+            level INTEGER NOT NULL,
+            success INTEGER DEFAULT 0,
+            stay INTEGER DEFAULT 0,
+            break INTEGER DEFAULT 0,
+            PRIMARY KEY (hour, level)
+        )
+    ''')
+    
+    # 골드 시계열: 관측값 그대로 → 분 단위 → 시간 단위로 줄여서 보관 (bucket: 구간 시작 시각)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS gold_samples (
+            ts REAL NOT NULL,
+            session TEXT NOT NULL,
+            gold INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_gold_samples_ts ON gold_samples (ts)')
+    for table in ('gold_minutely', 'gold_hourly'):
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket INTEGER NOT NULL,
+                session TEXT NOT NULL,
+                first_gold INTEGER,
+                last_gold INTEGER,
+                min_gold INTEGER,
+                max_gold INTEGER,
+                samples INTEGER,
+                PRIMARY KEY (bucket, session)
+            )
+        ''')
+    
+    # 아이템 카탈로그 (source: 'rule' 규칙으로 분류, 'manual' 직접 지정 - 규칙이 바뀌어도 유지)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS items (
+            name TEXT PRIMARY KEY,
+            item_class TEXT NOT NULL,
+            source TEXT NOT NULL DEFAULT 'rule',
+            first_seen REAL,
+            last_seen REAL,
+            seen INTEGER DEFAULT 0,
+            sold INTEGER DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS item_rules (
+            suffix TEXT PRIMARY KEY,
+            item_class TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS item_prices (
+            name TEXT NOT NULL,
+            level INTEGER NOT NULL,
+            samples INTEGER DEFAULT 0,
+            total_price INTEGER DEFAULT 0,
+            min_price INTEGER,
+            max_price INTEGER,
+            last_price INTEGER,
+            PRIMARY KEY (name, level)
+        )
+    ''')
+    # 골드 차이 관측값 (같은 값은 횟수만 늘림, 조회 시 가중 중앙값으로 이상값을 걸러냄)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS gold_deltas (
+            kind TEXT NOT NULL,
+            level INTEGER NOT NULL,
+            value INTEGER NOT NULL,
+            samples INTEGER DEFAULT 0,
+            PRIMARY KEY (kind, level, value)
+        )
+    ''')
+    # 창별 매크로 상태 (다시 시작할 때 이어서 진행, finished: 정상 종료 후 저장한 상태)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            title TEXT PRIMARY KEY,
+            ts REAL NOT NULL,
+            session TEXT,
+            level INTEGER,
+            item_name TEXT,
+            item_class TEXT,
+            gold INTEGER,
+            target_level INTEGER,
+            attempts INTEGER DEFAULT 0,
+            success INTEGER DEFAULT 0,
+            maintain INTEGER DEFAULT 0,
+            destroy INTEGER DEFAULT 0,
+            cycles INTEGER DEFAULT 0,
+            finished INTEGER DEFAULT 0
+        )
+    ''')
+    if cursor.execute('SELECT COUNT(*) FROM item_rules').fetchone()[0] == 0:
+        cursor.executemany('INSERT INTO item_rules (suffix, item_class) VALUES (?, ?)', INITIAL_ITEM_RULES)
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value
+        )
+    ''')
+    
+    # 로그 파일에서 읽어들인 통계 (enhance_backfill.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS log_stats (
+            Level INTEGER PRIMARY KEY,
+            Success INTEGER DEFAULT 0,
+            Stay INTEGER DEFAULT 0,
+            Break INTEGER DEFAULT 0
         )
     ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_files (
+            name TEXT PRIMARY KEY,
+            offset INTEGER NOT NULL,
+            size INTEGER,
+            mtime REAL
+        )
+    ''')
+    
+    # 퍼센트는 저장하지 않고 뷰에서 계산
+    cursor.execute('''
+        CREATE VIEW enhance_stats_view AS
+        SELECT Level, Try, Success, Stay, Break,
+            CASE WHEN Try > 0 THEN ROUND(Success * 100.0 / Try, 2) ELSE 0 END AS SuccessPer,
+            CASE WHEN Try > 0 THEN ROUND(Stay * 100.0 / Try, 2) ELSE 0 END AS StayPer,
+            CASE WHEN Try > 0 THEN ROUND(Break * 100.0 / Try, 2) ELSE 0 END AS BreakPer
+        FROM enhance_stats
+    ''')
     
     # 데이터가 이미 있는지 확인
     cursor.execute('SELECT COUNT(*) FROM enhance_stats')
     count = cursor.fetchone()[0]
     
     if count == 0:
-        # 초기 데이터 삽입 (이미지에서 가져온 값)
-        initial_data = [
-            # (Level, Try, Success, Stay, Break)
-            (0, 4604, 4604, 0, 0),
-            (1, 5065, 4549, 516, 0),
-            (2, 5658, 4544, 1114, 0),
-            (3, 6305, 4426, 1766, 113),
-            (4, 6806, 4058, 2385, 363),
-            (5, 6721, 3345, 2666, 710),
-            (6, 6035, 2748, 2696, 591),
-            (7, 5454, 2186, 2718, 550),
-            (8, 4707, 1687, 2539, 481),
-            (9, 4285, 1267, 2611, 407),
-            (10, 3494, 896, 2236, 362),
-            (11, 2893, 637, 1998, 258),
-            (12, 2076, 448, 1442, 186),
-            (13, 1485, 290, 1051, 144),
-            (14, 1142, 181, 853, 108),
-            (15, 723, 102, 547, 74),
-            (16, 470, 48, 367, 55),
-            (17, 266, 22, 218, 26),
-            (18, 125, 6, 103, 16),
-            (19, 46, 1, 40, 5),
-        ]
-        
-        for level, try_count, success, stay, break_count in initial_data:
-            # 퍼센트 계산 (소수점 2자리)
-            success_per = round((success / try_count * 100), 2) if try_count > 0 else 0
-            stay_per = round((stay / try_count * 100), 2) if try_count > 0 else 0
-            break_per = round((break_count / try_count * 100), 2) if try_count > 0 else 0
-            
-            cursor.execute('''
-                INSERT INTO enhance_stats (Level, Try, Success, Stay, Break, SuccessPer, StayPer, BreakPer)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (level, try_count, success, stay, break_count, success_per, stay_per, break_per))
+        # 초기 데이터 삽입
+        cursor.executemany('''
+            INSERT INTO enhance_stats (Level, Try, Success, Stay, Break)
+            VALUES (?, ?, ?, ?, ?)
+        ''', INITIAL_STATS)
         
         print("✅ DB 초기화 완료 - 초기 데이터 삽입됨")
-    else:
-        print("ℹ️ DB에 이미 데이터가 있음 - 초기화 건너뜀")
     
     conn.commit()
-    conn.close()
 
 
 def _get_buffer(level):
@@ -93,170 +382,970 @@ def _get_buffer(level):
     return _buffer[level]
 
 
-def flush_buffer():
-    """버퍼의 모든 데이터를 DB에 기록"""
-    global _buffer, _buffer_count
-    
-    if not _buffer:
+def _get_meta(conn, key, default=None):
+    row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else default
+
+
+def _set_meta(conn, key, value):
+    conn.execute('''
+        INSERT INTO meta (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    ''', (key, value))
+
+
+def _rollup_attempts(conn):
+    """아직 집계하지 않은 시도별 기록을 attempts_hourly에 더함 (트랜잭션 안에서 호출)"""
+    last_id = _get_meta(conn, 'rollup_last_id', 0)
+    max_id = conn.execute('SELECT MAX(id) FROM attempts').fetchone()[0]
+    if max_id is None or max_id <= last_id:
         return
     
-    conn = get_connection()
-    cursor = conn.cursor()
+    conn.execute('''
+        INSERT INTO attempts_hourly (hour, level, success, stay, break)
+        SELECT CAST(ts / 3600 AS INTEGER) * 3600, level,
+            SUM(outcome = 'success'), SUM(outcome = 'stay'), SUM(outcome = 'break')
+        FROM attempts
+        WHERE id > ? AND id <= ?
+        GROUP BY 1, 2
+        ON CONFLICT(hour, level) DO UPDATE SET
+            success = success + excluded.success,
+            stay = stay + excluded.stay,
+            break = break + excluded.break
+    ''', (last_id, max_id))
+    _set_meta(conn, 'rollup_last_id', max_id)
+
+
+def compact_attempts(retention_days=None):
+    """보관 기간이 지난 시도별 기록 삭제 (시간별 집계에 이미 반영된 것만)
+    
+    Args:
+        retention_days: 보관 일수 (None이면 ATTEMPT_RETENTION_DAYS)
+    
+    Returns:
+        int: 삭제한 행 수
+    """
+    if retention_days is None:
+        retention_days = ATTEMPT_RETENTION_DAYS
+    if retention_days is None:
+        return 0
     
-    for level, counts in _buffer.items():
-        success_add = counts['success']
-        stay_add = counts['stay']
-        break_add = counts['break']
-        try_add = success_add + stay_add + break_add
+    cutoff = time.time() - retention_days * 86400
+    with _lock:
+        conn = get_connection()
+        with conn:
+            _rollup_attempts(conn)
+            last_id = _get_meta(conn, 'rollup_last_id', 0)
+            deleted = conn.execute('DELETE FROM attempts WHERE ts < ? AND id <= ?', (cutoff, last_id)).rowcount
+    if deleted:
+        print(f"🧹 오래된 시도 기록 {deleted}건 정리 (시간별 집계로 보관)")
+    return deleted
+
+
+def compact_gold(raw_retention_days=None, minute_retention_days=None):
+    """오래된 골드 관측값을 분 단위로, 오래된 분 단위 값을 시간 단위로 줄임
+    
+    구간마다 첫 값/마지막 값/최솟값/최댓값/관측 수를 남긴다.
+    
+    Returns:
+        tuple: (분 단위로 줄인 관측값 수, 시간 단위로 줄인 분 단위 행 수)
+    """
+    if raw_retention_days is None:
+        raw_retention_days = GOLD_RAW_RETENTION_DAYS
+    if minute_retention_days is None:
+        minute_retention_days = GOLD_MINUTE_RETENTION_DAYS
+    
+    now = time.time()
+    raw_cutoff = int(now - raw_retention_days * 86400) // 60 * 60
+    minute_cutoff = int(now - minute_retention_days * 86400) // 3600 * 3600
+    with _lock:
+        conn = get_connection()
+        with conn:
+            conn.execute('''
+                INSERT INTO gold_minutely (bucket, session, first_gold, last_gold, min_gold, max_gold, samples)
+                SELECT bucket, session, first_gold, last_gold, min_gold, max_gold, samples FROM (
+                    SELECT CAST(ts / 60 AS INTEGER) * 60 AS bucket, session,
+                        FIRST_VALUE(gold) OVER w AS first_gold, LAST_VALUE(gold) OVER w AS last_gold,
+                        MIN(gold) OVER w AS min_gold, MAX(gold) OVER w AS max_gold,
+                        COUNT(*) OVER w AS samples, ROW_NUMBER() OVER w AS n
+                    FROM gold_samples WHERE ts < ?
+                    WINDOW w AS (PARTITION BY CAST(ts / 60 AS INTEGER), session ORDER BY ts
+                                 ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+                ) WHERE n = 1
+                ON CONFLICT(bucket, session) DO UPDATE SET
+                    last_gold = excluded.last_gold,
+                    min_gold = MIN(min_gold, excluded.min_gold),
+                    max_gold = MAX(max_gold, excluded.max_gold),
+                    samples = samples + excluded.samples
+            ''', (raw_cutoff,))
+            raw = conn.execute('DELETE FROM gold_samples WHERE ts < ?', (raw_cutoff,)).rowcount
+            
+            conn.execute('''
+                INSERT INTO gold_hourly (bucket, session, first_gold, last_gold, min_gold, max_gold, samples)
+                SELECT bucket, session, first_gold, last_gold, min_gold, max_gold, samples FROM (
+                    SELECT bucket / 3600 * 3600 AS bucket, session,
+                        FIRST_VALUE(first_gold) OVER w AS first_gold, LAST_VALUE(last_gold) OVER w AS last_gold,
+                        MIN(min_gold) OVER w AS min_gold, MAX(max_gold) OVER w AS max_gold,
+                        SUM(samples) OVER w AS samples, ROW_NUMBER() OVER w AS n
+                    FROM gold_minutely WHERE bucket < ?
+                    WINDOW w AS (PARTITION BY bucket / 3600, session ORDER BY bucket
+                                 ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+                ) WHERE n = 1
+                ON CONFLICT(bucket, session) DO UPDATE SET
+                    last_gold = excluded.last_gold,
+                    min_gold = MIN(min_gold, excluded.min_gold),
+                    max_gold = MAX(max_gold, excluded.max_gold),
+                    samples = samples + excluded.samples
+            ''', (minute_cutoff,))
+            minutes = conn.execute('DELETE FROM gold_minutely WHERE bucket < ?', (minute_cutoff,)).rowcount
+    if raw or minutes:
+        print(f"🧹 골드 기록 정리 (관측값 {raw}건 → 분 단위, 분 단위 {minutes}건 → 시간 단위)")
+    return raw, minutes
+
+
+def _buffer_item(level, outcome, row):
+    """대기열 항목 하나를 버퍼로 옮김 (_lock 안에서 호출)
+    
+    Returns:
+        bool: 기록할 항목이었는지 (쓰기 스레드를 깨우는 빈 항목이면 False)
+    """
+    global _buffer_count
+    if outcome == 'gold':
+        _gold_rows.append(row)
+        return True
+    if outcome == 'item':
+        _item_rows.append(row)
+        return True
+    if outcome == 'sale':
+        _sale_rows.append(row)
+        return True
+    if outcome == 'delta':
+        _delta_counts[row] = _delta_counts.get(row, 0) + 1
+        return True
+    if outcome == 'checkpoint':
+        _checkpoints[row[0]] = row
+        return True
+    if level is None:
+        return False
+    _get_buffer(level)[outcome] += 1
+    _buffer_count += 1
+    _attempt_rows.append(row)
+    return True
+
+
+def _drain_queue():
+    """대기열에 쌓인 기록을 버퍼로 옮김 (_lock 안에서 호출)"""
+    while True:
+        try:
+            _buffer_item(*_queue.get_nowait())
+        except queue.Empty:
+            return
+
+
+def flush_buffer():
+    """버퍼의 모든 데이터를 DB에 기록 (레벨별 upsert 한 번에 실행)
+    
+    쓰기 스레드가 자동으로 호출하며, 다른 스레드에서 직접 호출해도 안전하다.
+    """
+    global _buffer, _buffer_count, _attempt_rows, _gold_rows, _item_rows, _sale_rows, _delta_counts, _checkpoints
+    global _last_compact
+    
+    with _lock:
+        _drain_queue()
+        if not (_buffer or _gold_rows or _item_rows or _sale_rows or _delta_counts or _checkpoints):
+            return
         
-        if try_add == 0:
-            continue
+        start = time.perf_counter()
+        rows = []
+        for level, counts in _buffer.items():
+            success_add = counts['success']
+            stay_add = counts['stay']
+            break_add = counts['break']
+            try_add = success_add + stay_add + break_add
+            if try_add > 0:
+                rows.append((level, try_add, success_add, stay_add, break_add))
         
-        # 해당 레벨이 없으면 생성
-        cursor.execute('SELECT Level FROM enhance_stats WHERE Level = ?', (level,))
-        if cursor.fetchone() is None:
-            cursor.execute('INSERT INTO enhance_stats (Level) VALUES (?)', (level,))
+        conn = get_connection()
+        with conn:
+            conn.executemany('''
+                INSERT INTO enhance_stats (Level, Try, Success, Stay, Break)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(Level) DO UPDATE SET
+                    Try = Try + excluded.Try,
+                    Success = Success + excluded.Success,
+                    Stay = Stay + excluded.Stay,
+                    Break = Break + excluded.Break
+            ''', rows)
+            conn.executemany('''
+                INSERT INTO attempts (ts, session, level, outcome, gold, item_name)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', _attempt_rows)
+            conn.executemany('INSERT INTO gold_samples (ts, session, gold) VALUES (?, ?, ?)', _gold_rows)
+            conn.executemany('''
+                INSERT INTO items (name, item_class, first_seen, last_seen, seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    last_seen = MAX(last_seen, excluded.last_seen),
+                    seen = seen + excluded.seen
+            ''', [(name, item_class, ts, ts, seen) for ts, name, item_class, seen in _item_rows])
+            conn.executemany('''
+                INSERT INTO item_prices (name, level, samples, total_price, min_price, max_price, last_price)
+                VALUES (?, ?, 1, ?, ?, ?, ?)
+                ON CONFLICT(name, level) DO UPDATE SET
+                    samples = samples + 1,
+                    total_price = total_price + excluded.total_price,
+                    min_price = MIN(min_price, excluded.min_price),
+                    max_price = MAX(max_price, excluded.max_price),
+                    last_price = excluded.last_price
+            ''', [(name, level, price, price, price, price) for _, name, level, price in _sale_rows])
+            conn.executemany('UPDATE items SET sold = sold + 1, last_seen = MAX(last_seen, ?) WHERE name = ?',
+                             [(ts, name) for ts, name, _, _ in _sale_rows])
+            conn.executemany('''
+                INSERT INTO gold_deltas (kind, level, value, samples) VALUES (?, ?, ?, ?)
+                ON CONFLICT(kind, level, value) DO UPDATE SET samples = samples + excluded.samples
+            ''', [(*key, count) for key, count in _delta_counts.items()])
+            conn.executemany(f'''
+                INSERT OR REPLACE INTO checkpoints ({', '.join(CHECKPOINT_FIELDS)})
+                VALUES ({', '.join('?' * len(CHECKPOINT_FIELDS))})
+            ''', _checkpoints.values())
+            _rollup_attempts(conn)
+        _apply_flush_to_cache(rows, _conn_path)
         
-        # 값 업데이트
-        cursor.execute('''
-            UPDATE enhance_stats 
-            SET Try = Try + ?, Success = Success + ?, Stay = Stay + ?, Break = Break + ?
-            WHERE Level = ?
-        ''', (try_add, success_add, stay_add, break_add, level))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        enhance_timing.record('db.flush', elapsed_ms)
+        _flush_stats['flushes'] += 1
+        _flush_stats['last_ms'] = elapsed_ms
+        _flush_stats['total_ms'] += elapsed_ms
+        _flush_stats['max_ms'] = max(_flush_stats['max_ms'], elapsed_ms)
         
-        # 퍼센트 재계산
-        cursor.execute('SELECT Try, Success, Stay, Break FROM enhance_stats WHERE Level = ?', (level,))
-        row = cursor.fetchone()
-        if row:
-            try_count, success, stay, break_count = row
-            success_per = round((success / try_count * 100), 2) if try_count > 0 else 0
-            stay_per = round((stay / try_count * 100), 2) if try_count > 0 else 0
-            break_per = round((break_count / try_count * 100), 2) if try_count > 0 else 0
-            
-            cursor.execute('''
-                UPDATE enhance_stats 
-                SET SuccessPer = ?, StayPer = ?, BreakPer = ?
-                WHERE Level = ?
-            ''', (success_per, stay_per, break_per, level))
+        if elapsed_ms >= SLOW_FLUSH_MS:
+            print(f"🐢 DB 기록 지연 ({_buffer_count}회 강화 기록, {elapsed_ms:.1f}ms)")
+        
+        if rows:
+            for listener in _flush_listeners:
+                try:
+                    listener(rows)
+                except Exception as e:
+                    print(f"⚠️ DB 기록 후 처리 실패: {e}")
+        
+        # 버퍼 초기화
+        _buffer = {}
+        _buffer_count = 0
+        _attempt_rows = []
+        _gold_rows = []
+        _item_rows = []
+        _sale_rows = []
+        _delta_counts = {}
+        _checkpoints = {}
+        
+        if time.time() - _last_compact >= COMPACT_INTERVAL:
+            _last_compact = time.time()
+            compact_attempts()
+            compact_gold()
+
+
+def _writer_loop():
+    """쓰기 스레드: FLUSH_INTERVAL개가 쌓이거나 FLUSH_MS가 지나면 DB에 기록"""
+    deadline = None
+    while not _writer_stop.is_set():
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            item = _queue.get(timeout=timeout)
+        except queue.Empty:
+            item = None
+        
+        if item is not None:
+            with _lock:
+                buffered = _buffer_item(*item)
+            if buffered and deadline is None:
+                deadline = time.monotonic() + FLUSH_MS / 1000
+        
+        if deadline is not None and (_buffer_count >= FLUSH_INTERVAL or time.monotonic() >= deadline):
+            try:
+                flush_buffer()
+            except sqlite3.Error as e:
+                print(f"⚠️ DB 기록 실패 (다음에 재시도): {e}")
+            deadline = None
+
+
+def _handle_stop_signal(signum, frame):
+    """종료 신호를 받으면 남은 기록을 저장하고 종료"""
+    stop_writer()
+    sys.exit(128 + signum)
+
+
+def start_writer():
+    """쓰기 스레드 시작 (이미 실행 중이면 무시)"""
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    _register_exit_hooks()
+    _writer_stop.clear()
+    _writer = threading.Thread(target=_writer_loop, name='enhance_db-writer', daemon=True)
+    _writer.start()
     
-    conn.commit()
-    conn.close()
+    # 신호 처리기는 메인 스레드에서만 설치 가능
+    if threading.current_thread() is threading.main_thread():
+        for name in ('SIGTERM', 'SIGBREAK'):
+            signum = getattr(signal, name, None)
+            if signum is not None and signal.getsignal(signum) in (signal.SIG_DFL, None):
+                signal.signal(signum, _handle_stop_signal)
+
+
+def stop_writer(timeout=5.0):
+    """쓰기 스레드를 멈추고 남은 기록을 모두 저장"""
+    global _writer
+    if _writer is not None:
+        _writer_stop.set()
+        _queue.put((None, None, None))  # 대기 중인 get() 깨우기
+        if _writer is not threading.current_thread():
+            _writer.join(timeout)
+        _writer = None
+    flush_buffer()
+
+
+def add_flush_listener(listener):
+    """DB에 기록할 때마다 listener(rows) 호출 (rows: [(Level, Try, Success, Stay, Break), ...])
+    
+    쓰기 잠금 안에서 호출되므로 listener는 표시만 해 두고 바로 반환해야 한다.
+    """
+    if listener not in _flush_listeners:
+        _flush_listeners.append(listener)
+
+
+def remove_flush_listener(listener):
+    """add_flush_listener로 등록한 함수 해제"""
+    if listener in _flush_listeners:
+        _flush_listeners.remove(listener)
+
+
+def get_writer_stats():
+    """쓰기 스레드 상태 (대기열 길이, 버퍼 크기, DB 기록 시간)
     
-    print(f"💾 DB 업데이트 완료 ({_buffer_count}회 강화 기록)")
+    Returns:
+        dict: queue_depth, buffered, flushes, last_ms, avg_ms, max_ms
+    """
+    flushes = _flush_stats['flushes']
+    return {
+        'queue_depth': _queue.qsize(),
+        'buffered': _buffer_count,
+        'flushes': flushes,
+        'last_ms': _flush_stats['last_ms'],
+        'avg_ms': _flush_stats['total_ms'] / flushes if flushes else 0.0,
+        'max_ms': _flush_stats['max_ms'],
+    }
+
+
+def set_thread_session(name):
+    """현재 스레드에서 기록하는 시도의 세션 이름 지정 (None이면 SESSION_ID)
     
-    # 버퍼 초기화
-    _buffer = {}
-    _buffer_count = 0
+    한 프로세스에서 여러 창을 돌릴 때 attempts.session 으로 창별 기록을 구분한다.
+    """
+    _session_local.session = f"{SESSION_ID}_{name}" if name is not None else None
 
 
-def _check_flush():
-    """버퍼가 FLUSH_INTERVAL에 도달하면 DB에 기록"""
-    global _buffer_count
-    if _buffer_count >= FLUSH_INTERVAL:
-        flush_buffer()
+def _record(level, outcome, gold, item_name):
+    """대기열에 한 번의 시도 추가 (DB 기록은 쓰기 스레드가 함)"""
+    if _writer is None:
+        start_writer()
+    session = getattr(_session_local, 'session', None) or SESSION_ID
+    with _stats_lock:
+        if DB_PATH == _stats_path:
+            _grow(level + 1)
+        pending = _pending_for(DB_PATH)
+        _extend(pending, level + 1)
+        _extend(_recorded, level + 1)
+        pending[outcome][level] += 1
+        _recorded[outcome][level] += 1
+    _queue.put((level, outcome, (time.time(), session, level, outcome, gold, item_name)))
+
+
+def record_gold(gold):
+    """골드 관측값 기록 (강화/판매 결과에서 읽은 보유 골드, DB 기록은 쓰기 스레드가 함)"""
+    if _writer is None:
+        start_writer()
+    session = getattr(_session_local, 'session', None) or SESSION_ID
+    _queue.put((None, 'gold', (time.time(), session, gold)))
+
+
+def record_item(item_name):
+    """아이템 획득 기록 (파괴/판매 후 새로 받은 아이템, DB 기록은 쓰기 스레드가 함)"""
+    if not item_name:
+        return
+    if _writer is None:
+        start_writer()
+    item_class = _item_classes.setdefault(item_name, classify_item(item_name))
+    _queue.put((None, 'item', (time.time(), item_name, item_class, 1)))
+
+
+def record_item_sale(item_name, level, price):
+    """아이템 판매 가격 기록 (DB 기록은 쓰기 스레드가 함)"""
+    if not item_name or level is None or price is None:
+        return
+    if _writer is None:
+        start_writer()
+    if item_name not in _item_classes:  # 카탈로그에 없으면 추가
+        _item_classes[item_name] = classify_item(item_name)
+        _queue.put((None, 'item', (time.time(), item_name, _item_classes[item_name], 0)))
+    _queue.put((None, 'sale', (time.time(), item_name, level, price)))
 
 
-def record_success(level):
-    """성공 기록 - 버퍼에 추가 (100번마다 DB 업데이트)
+def _record_delta(kind, level, value):
+    if level is None or value is None or value <= 0:
+        return  # 골드 차이가 0 이하면 중간에 다른 골드 변화가 끼어든 것
+    if _writer is None:
+        start_writer()
+    _queue.put((None, 'delta', (kind, level, value)))
+
+
+def record_enhance_cost(level, cost):
+    """강화 비용 관측값 기록 (직전 골드 - 강화 후 남은 골드, DB 기록은 쓰기 스레드가 함)
+    
+    Args:
+        level: 강화 전 레벨
+        cost: 골드 차이
+    """
+    _record_delta(DELTA_ENHANCE_COST, level, cost)
+
+
+def save_checkpoint(title, level, item_name, item_class, gold, target_level,
+                    attempts, success, maintain, destroy, cycles, finished=False):
+    """창별 매크로 상태 저장 (대기열에 넣기만 함, 쓰기 스레드가 창마다 마지막 상태만 기록)"""
+    if _writer is None:
+        start_writer()
+    session = getattr(_session_local, 'session', None) or SESSION_ID
+    _queue.put((None, 'checkpoint', (title, time.time(), session, level, item_name, item_class, gold, target_level,
+                                     attempts, success, maintain, destroy, cycles, int(finished))))
+
+
+def load_checkpoint(title):
+    """창별 매크로 상태 조회 (기록 대기 중인 상태 포함)
+    
+    Returns:
+        dict: CHECKPOINT_FIELDS 값 (finished는 bool), 없으면 None
+    """
+    with _lock:
+        _drain_queue()
+        row = _checkpoints.get(title)
+        if row is None:
+            row = get_connection().execute(
+                f"SELECT {', '.join(CHECKPOINT_FIELDS)} FROM checkpoints WHERE title = ?", (title,)).fetchone()
+    if row is None:
+        return None
+    checkpoint = dict(zip(CHECKPOINT_FIELDS, row))
+    checkpoint['finished'] = bool(checkpoint['finished'])
+    return checkpoint
+
+
+def record_success(level, gold=None, item_name=None):
+    """성공 기록 - 버퍼에 추가 (쓰기 스레드가 100번 또는 1초마다 DB 업데이트)
     
     Args:
         level: 강화 전 레벨 (0강에서 1강으로 성공하면 level=0)
+        gold: 결과 후 남은 골드 (모르면 None)
+        item_name: 아이템 이름 (모르면 None)
     """
-    global _buffer_count
-    buf = _get_buffer(level)
-    buf['success'] += 1
-    _buffer_count += 1
-    _check_flush()
+    _record(level, 'success', gold, item_name)
 
 
-def record_stay(level):
-    """유지 기록 - 버퍼에 추가 (100번마다 DB 업데이트)
+def record_stay(level, gold=None, item_name=None):
+    """유지 기록 - 버퍼에 추가 (쓰기 스레드가 100번 또는 1초마다 DB 업데이트)
     
     Args:
         level: 현재 레벨 (유지된 레벨)
+        gold: 결과 후 남은 골드 (모르면 None)
+        item_name: 아이템 이름 (모르면 None)
     """
-    global _buffer_count
-    buf = _get_buffer(level)
-    buf['stay'] += 1
-    _buffer_count += 1
-    _check_flush()
+    _record(level, 'stay', gold, item_name)
 
 
-def record_break(level):
-    """파괴 기록 - 버퍼에 추가 (100번마다 DB 업데이트)
+def record_break(level, gold=None, item_name=None):
+    """파괴 기록 - 버퍼에 추가 (쓰기 스레드가 100번 또는 1초마다 DB 업데이트)
     
     Args:
         level: 파괴 전 레벨
+        gold: 결과 후 남은 골드 (모르면 None)
+        item_name: 아이템 이름 (모르면 None)
     """
-    global _buffer_count
-    buf = _get_buffer(level)
-    buf['break'] += 1
-    _buffer_count += 1
-    _check_flush()
+    _record(level, 'break', gold, item_name)
+
+
+def _extend(counts, size):
+    """레벨별 횟수 배열을 size 레벨까지 늘림 (_stats_lock 안에서 호출)"""
+    for outcome in OUTCOMES:
+        missing = size - len(counts[outcome])
+        if missing > 0:
+            counts[outcome].extend([0] * missing)
+
+
+def _grow(size):
+    """캐시 배열(_stored, _pending, _has_row)을 size 레벨까지 늘림 (_stats_lock 안에서 호출)"""
+    missing = size - len(_has_row)
+    if missing > 0:
+        _extend(_stored, size)
+        _extend(_pending, size)
+        _has_row.extend(bytes(missing))
+
+
+def _pending_for(path):
+    """해당 DB 경로에 기록 대기 중인 횟수 배열 (_stats_lock 안에서 호출)"""
+    counts = _pending_counts.get(path)
+    if counts is None:
+        counts = _pending_counts[path] = {outcome: array('q') for outcome in OUTCOMES}
+    return counts
+
+
+def _load_stats_cache():
+    """enhance_stats를 캐시로 읽어 옴 (DB 경로가 바뀌었거나 무효화된 경우에만)
+    
+    배열은 매번 새로 만들고, 이 DB 경로에 기록 대기 중인 횟수만 이어서 쓴다.
+    """
+    global _stats_path, _stored, _pending, _has_row
+    if _stats_path == DB_PATH:
+        return
+    with _lock:
+        rows = get_connection().execute('SELECT Level, Success, Stay, Break FROM enhance_stats').fetchall()
+        with _stats_lock:
+            pending = _pending_for(DB_PATH)
+            size = max(max((row[0] for row in rows), default=-1) + 1, len(pending['success']))
+            _extend(pending, size)
+            stored = {outcome: array('q', bytes(8 * size)) for outcome in OUTCOMES}
+            has_row = bytearray(size)
+            for level, success, stay, break_count in rows:
+                stored['success'][level] = success
+                stored['stay'][level] = stay
+                stored['break'][level] = break_count
+                has_row[level] = 1
+            _stored, _pending, _has_row = stored, pending, has_row
+            _stats_path = DB_PATH
+
+
+def _apply_flush_to_cache(rows, path):
+    """path에 기록한 횟수를 대기 중 → DB 기록됨으로 옮김 (flush_buffer에서 _lock 안에서 호출)
+    
+    캐시를 아직 읽지 않았으면 대기 중 횟수만 줄인다 (DB 값은 나중에 읽을 때 반영됨).
+    """
+    loaded = _stats_path == path
+    with _stats_lock:
+        pending = _pending_for(path)
+        for level, _, success, stay, break_count in rows:
+            _extend(pending, level + 1)
+            for outcome, count in zip(OUTCOMES, (success, stay, break_count)):
+                pending[outcome][level] -= count
+                if loaded:
+                    _stored[outcome][level] += count
+            if loaded:
+                _has_row[level] = 1
+
+
+def invalidate_stats_cache():
+    """다음 조회 때 enhance_stats를 다시 읽도록 캐시 무효화 (다른 곳에서 표를 고쳤을 때)"""
+    global _stats_path
+    _stats_path = None
+
+
+def get_counts(level):
+    """해당 레벨의 (성공, 유지, 파괴) 횟수 (기록 대기 중인 것 포함)"""
+    _load_stats_cache()
+    stored, pending = _stored, _pending
+    if level >= len(stored['break']):
+        return (0, 0, 0)
+    return (
+        stored['success'][level] + pending['success'][level],
+        stored['stay'][level] + pending['stay'][level],
+        stored['break'][level] + pending['break'][level],
+    )
+
+
+def get_odds(level):
+    """해당 레벨의 (성공, 유지, 파괴) 확률 (0~1, 기록 대기 중인 것 포함)
+    
+    기록이 없는 레벨은 아래 레벨의 확률을 그대로 쓴다 (+0 아래는 항상 성공).
+    """
+    while level >= 0:
+        success, stay, break_count = get_counts(level)
+        try_count = success + stay + break_count
+        if try_count > 0:
+            return (success / try_count, stay / try_count, break_count / try_count)
+        level -= 1
+    return (1.0, 0.0, 0.0)
+
+
+def get_recorded_counts():
+    """이 프로세스가 시작된 뒤 기록한 레벨별 횟수
+    
+    Returns:
+        list of tuple: (level, 성공, 유지, 파괴), 기록이 있는 레벨만
+    """
+    with _stats_lock:
+        rows = list(zip(range(len(_recorded['success'])), _recorded['success'], _recorded['stay'], _recorded['break']))
+    return [row for row in rows if row[1] or row[2] or row[3]]
+
+
+def get_max_level():
+    """통계가 있는 가장 높은 레벨 (없으면 -1)"""
+    _load_stats_cache()
+    for level in range(len(_has_row) - 1, -1, -1):
+        if _has_row[level] or any(get_counts(level)):
+            return level
+    return -1
+
+
+def _stats_dict(level):
+    success, stay, break_count = get_counts(level)
+    try_count = success + stay + break_count
+    return {
+        'Try': try_count,
+        'Success': success,
+        'Stay': stay,
+        'Break': break_count,
+        'SuccessPer': round(success * 100.0 / try_count, 2) if try_count else 0,
+        'StayPer': round(stay * 100.0 / try_count, 2) if try_count else 0,
+        'BreakPer': round(break_count * 100.0 / try_count, 2) if try_count else 0,
+    }
 
 
 def get_stats(level):
-    """해당 레벨의 통계 조회
+    """해당 레벨의 통계 조회 (메모리 캐시, 기록 대기 중인 것 포함)
     
     Returns:
         dict: {Try, Success, Stay, Break, SuccessPer, StayPer, BreakPer} 또는 None
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT Try, Success, Stay, Break, SuccessPer, StayPer, BreakPer 
-        FROM enhance_stats WHERE Level = ?
-    ''', (level,))
-    
-    row = cursor.fetchone()
-    conn.close()
-    
-    if row:
-        return {
-            'Try': row[0],
-            'Success': row[1],
-            'Stay': row[2],
-            'Break': row[3],
-            'SuccessPer': row[4],
-            'StayPer': row[5],
-            'BreakPer': row[6]
-        }
-    return None
+    _load_stats_cache()
+    if level < 0 or level >= len(_has_row) or not (_has_row[level] or any(get_counts(level))):
+        return None
+    return _stats_dict(level)
 
 
 def get_all_stats():
-    """모든 레벨의 통계 조회
+    """모든 레벨의 통계 조회 (메모리 캐시, 기록 대기 중인 것 포함)
     
     Returns:
         list of dict
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    result = []
+    for level in range(get_max_level() + 1):
+        stats = get_stats(level)
+        if stats is not None:
+            result.append({'Level': level, **stats})
+    return result
+
+
+def get_hourly_stats(since=None, until=None, level=None):
+    """시간별 레벨 통계 조회 (attempts_hourly)
     
-    cursor.execute('''
-        SELECT Level, Try, Success, Stay, Break, SuccessPer, StayPer, BreakPer 
-        FROM enhance_stats ORDER BY Level
-    ''')
+    Args:
+        since, until: 유닉스 시각 범위 (None이면 제한 없음)
+        level: 특정 레벨만 조회 (None이면 전체)
     
-    rows = cursor.fetchall()
-    conn.close()
+    Returns:
+        list of dict: {hour, level, Try, Success, Stay, Break}
+    """
+    conditions = []
+    params = []
+    if since is not None:
+        conditions.append('hour >= ?')
+        params.append(int(since) // 3600 * 3600)
+    if until is not None:
+        conditions.append('hour < ?')
+        params.append(until)
+    if level is not None:
+        conditions.append('level = ?')
+        params.append(level)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
     
-    result = []
-    for row in rows:
-        result.append({
-            'Level': row[0],
-            'Try': row[1],
-            'Success': row[2],
-            'Stay': row[3],
-            'Break': row[4],
-            'SuccessPer': row[5],
-            'StayPer': row[6],
-            'BreakPer': row[7]
-        })
+    with _lock:
+        rows = get_connection().execute(f'''
+            SELECT hour, level, success + stay + break, success, stay, break
+            FROM attempts_hourly {where}
+            ORDER BY hour, level
+        ''', params).fetchall()
+    
+    return [
+        {'hour': row[0], 'level': row[1], 'Try': row[2], 'Success': row[3], 'Stay': row[4], 'Break': row[5]}
+        for row in rows
+    ]
+
+
+def get_attempts_per_hour(since=None, until=None):
+    """시간별 총 시도 횟수
+    
+    Returns:
+        list of tuple: (hour, 시도 횟수)
+    """
+    totals = {}
+    for row in get_hourly_stats(since, until):
+        totals[row['hour']] = totals.get(row['hour'], 0) + row['Try']
+    return sorted(totals.items())
+
+
+def get_gold_series(since=None, until=None, session=None):
+    """골드 시계열 조회 (오래된 구간은 분/시간 단위로 줄인 값의 마지막 값)
+    
+    Args:
+        since, until: 유닉스 시각 범위 (None이면 제한 없음)
+        session: 특정 세션만 조회 (None이면 전체)
+    
+    Returns:
+        list of tuple: (시각, 세션, 골드), 시각 오름차순 (줄인 구간은 구간 시작 시각)
+    """
+    conditions = []
+    params = []
+    if since is not None:
+        conditions.append('ts >= ?')
+        params.append(since)
+    if until is not None:
+        conditions.append('ts < ?')
+        params.append(until)
+    if session is not None:
+        conditions.append('session = ?')
+        params.append(session)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    
+    with _lock:
+        return get_connection().execute(f'''
+            SELECT ts, session, gold FROM (
+                SELECT bucket AS ts, session, last_gold AS gold FROM gold_hourly
+                UNION ALL SELECT bucket, session, last_gold FROM gold_minutely
+                UNION ALL SELECT ts, session, gold FROM gold_samples
+            ) {where}
+            ORDER BY ts
+        ''', params).fetchall()
+
+
+def get_gold_per_hour(since=None, until=None):
+    """시간별 골드 증감 (세션마다 직전 관측값과의 차이를 더함)
+    
+    Returns:
+        list of tuple: (hour, 골드 증감)
+    """
+    totals = {}
+    last = {}
+    for ts, session, gold in get_gold_series(since, until):
+        if session in last:
+            hour = int(ts) // 3600 * 3600
+            totals[hour] = totals.get(hour, 0) + gold - last[session]
+        last[session] = gold
+    return sorted(totals.items())
+
+
+def _classify_by_rules(item_name):
+    """접미사 규칙으로 분류 (가장 긴 접미사가 우선, 맞는 규칙이 없으면 특별 아이템)"""
+    for length in range(min(len(item_name), _max_suffix), 0, -1):
+        item_class = _item_rules.get(item_name[-length:])
+        if item_class is not None:
+            return item_class
+    return ITEM_CLASS_SPECIAL
+
+
+def load_item_catalog():
+    """items, item_rules를 캐시로 읽어 옴 (DB 경로가 바뀌었거나 무효화된 경우에만)
+    
+    읽기 전까지 classify_item은 INITIAL_ITEM_RULES로만 분류한다. 엔진이 시작할 때 호출.
+    """
+    global _items_path, _item_classes, _item_rules, _max_suffix
+    if _items_path == DB_PATH:
+        return
+    with _lock:
+        conn = get_connection()
+        rules = dict(conn.execute('SELECT suffix, item_class FROM item_rules').fetchall())
+        classes = dict(conn.execute('SELECT name, item_class FROM items').fetchall())
+        _item_rules = rules
+        _max_suffix = max(map(len, rules), default=0)
+        _item_classes = classes
+        _rule_classes.clear()
+        _items_path = DB_PATH
+
+
+def invalidate_item_catalog():
+    """다음 load_item_catalog 때 아이템 카탈로그를 다시 읽도록 캐시 무효화 (다른 곳에서 표를 고쳤을 때)"""
+    global _items_path
+    _items_path = None
+
+
+def classify_item(item_name):
+    """아이템 이름으로 분류 조회 (메모리만 봄, DB를 읽거나 쓰지 않음)
+    
+    카탈로그에 있으면 그 분류, 없으면 접미사 규칙으로 분류한다.
+    
+    Returns:
+        str: ITEM_CLASS_NORMAL / ITEM_CLASS_SPECIAL, 이름이 없으면 None
+    """
+    if not item_name:
+        return None
+    item_class = _item_classes.get(item_name)
+    if item_class is None:
+        item_class = _rule_classes.get(item_name)
+        if item_class is None:
+            item_class = _rule_classes[item_name] = _classify_by_rules(item_name)
+    return item_class
+
+
+def _reclassify_items(conn):
+    """규칙으로 분류한 아이템을 현재 규칙으로 다시 분류 (_lock 안에서 호출)"""
+    changed = []
+    for name, item_class in conn.execute("SELECT name, item_class FROM items WHERE source = 'rule'").fetchall():
+        new_class = _classify_by_rules(name)
+        if new_class != item_class:
+            changed.append((new_class, name))
+    conn.executemany('UPDATE items SET item_class = ? WHERE name = ?', changed)
+    return len(changed)
+
+
+def set_item_rule(suffix, item_class):
+    """이름 접미사 분류 규칙 추가/변경 (item_class가 None이면 삭제)
+    
+    규칙으로 분류했던 아이템은 바뀐 규칙으로 다시 분류한다 (직접 지정한 아이템은 그대로).
+    
+    Returns:
+        int: 분류가 바뀐 아이템 수
+    """
+    flush_buffer()  # 아직 기록되지 않은 새 아이템도 다시 분류되도록
+    with transaction() as conn:
+        if item_class is None:
+            conn.execute('DELETE FROM item_rules WHERE suffix = ?', (suffix,))
+        else:
+            conn.execute('''
+                INSERT INTO item_rules (suffix, item_class) VALUES (?, ?)
+                ON CONFLICT(suffix) DO UPDATE SET item_class = excluded.item_class
+            ''', (suffix, item_class))
+        invalidate_item_catalog()
+        load_item_catalog()
+        changed = _reclassify_items(conn)
+    invalidate_item_catalog()
+    load_item_catalog()
+    return changed
+
+
+def set_item_class(item_name, item_class):
+    """아이템 분류 직접 지정 (item_class가 None이면 지정 해제하고 규칙으로 분류)"""
+    load_item_catalog()
+    source = 'manual' if item_class is not None else 'rule'
+    if item_class is None:
+        item_class = _classify_by_rules(item_name)
+    with transaction() as conn:
+        conn.execute('''
+            INSERT INTO items (name, item_class, source, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET item_class = excluded.item_class, source = excluded.source
+        ''', (item_name, item_class, source, time.time(), time.time()))
+    _item_classes[item_name] = item_class
+
+
+def get_items():
+    """아이템 카탈로그 조회 (기록 대기 중인 것은 제외)
+    
+    Returns:
+        list of dict: name, item_class, source, first_seen, last_seen, seen, sold, prices ({레벨: 평균 판매 가격})
+    """
+    with _lock:
+        conn = get_connection()
+        items = conn.execute('''
+            SELECT name, item_class, source, first_seen, last_seen, seen, sold
+            FROM items ORDER BY seen DESC, name
+        ''').fetchall()
+        prices = conn.execute('SELECT name, level, total_price * 1.0 / samples FROM item_prices').fetchall()
+    by_name = {}
+    for name, level, price in prices:
+        by_name.setdefault(name, {})[level] = price
+    keys = ('name', 'item_class', 'source', 'first_seen', 'last_seen', 'seen', 'sold')
+    return [{**dict(zip(keys, row)), 'prices': by_name.get(row[0], {})} for row in items]
+
+
+def print_items():
+    """아이템 카탈로그 출력"""
+    items = get_items()
+    print("\n========== 아이템 카탈로그 ==========")
+    print(f"{'분류':<8} {'획득':>6} {'판매':>6}  이름")
+    print("-" * 50)
+    for item in items:
+        mark = '*' if item['source'] == 'manual' else ' '
+        print(f"{item['item_class']:<7}{mark} {item['seen']:>6} {item['sold']:>6}  {item['name']}")
+    print("=" * 50)
+
+
+def get_learned_deltas(kind, min_samples=DELTA_MIN_SAMPLES):
+    """골드 차이로 학습한 레벨별 값 (기록 대기 중인 것 제외)
+    
+    레벨마다 관측값의 가중 중앙값을 쓰므로 응답을 놓쳐서 두 번 치의 골드가 한꺼번에 바뀐 경우 같은
+    드문 이상값은 결과에 영향을 주지 않는다.
+    
+    Args:
+        kind: DELTA_ENHANCE_COST
+        min_samples: 이보다 적게 관측한 레벨은 제외
+    
+    Returns:
+        dict: {level: (중앙값, 관측 횟수, 중앙값과 같은 관측값 비율)}
+    """
+    with _lock:
+        rows = get_connection().execute('''
+            SELECT level, value, samples FROM gold_deltas WHERE kind = ? ORDER BY level, value
+        ''', (kind,)).fetchall()
+    
+    by_level = {}
+    for level, value, samples in rows:
+        by_level.setdefault(level, []).append((value, samples))
+    
+    result = {}
+    for level, values in by_level.items():
+        total = sum(samples for _, samples in values)
+        if total < min_samples:
+            continue
+        seen = 0
+        for value, samples in values:
+            seen += samples
+            if seen * 2 >= total:
+                result[level] = (value, total, samples / total)
+                break
     return result
 
 
+def get_enhance_costs(min_samples=DELTA_MIN_SAMPLES):
+    """학습한 레벨별 강화 비용 {level: 골드}"""
+    return {level: value for level, (value, _, _) in get_learned_deltas(DELTA_ENHANCE_COST, min_samples).items()}
+
+
+def get_sell_price_stats(min_samples=DELTA_MIN_SAMPLES, item_class=None):
+    """판매 응답의 획득 골드로 기록한 레벨별 판매 가격 (item_prices, 기록 대기 중인 것 제외)
+    
+    Args:
+        item_class: 이 분류의 아이템만 (None이면 아이템 구분 없이 합침)
+    
+    Returns:
+        dict: {level: (평균 가격, 판매 횟수, 최저 가격, 최고 가격)}
+    """
+    with _lock:
+        rows = get_connection().execute('''
+            SELECT p.level, SUM(p.total_price), SUM(p.samples), MIN(p.min_price), MAX(p.max_price)
+            FROM item_prices p LEFT JOIN items i ON i.name = p.name
+            WHERE ? IS NULL OR i.item_class = ?
+            GROUP BY p.level HAVING SUM(p.samples) >= ? ORDER BY p.level
+        ''', (item_class, item_class, min_samples)).fetchall()
+    return {level: (round(total / samples), samples, low, high) for level, total, samples, low, high in rows}
+
+
+def get_sell_prices(min_samples=DELTA_MIN_SAMPLES, item_class=None):
+    """기록한 레벨별 평균 판매 가격 {level: 골드} (item_class가 있으면 그 분류의 아이템만)"""
+    return {level: price for level, (price, _, _, _) in get_sell_price_stats(min_samples, item_class).items()}
+
+
+def print_learned_deltas():
+    """학습한 레벨별 강화 비용 (골드 차이)과 기록한 판매 가격 (획득 골드) 출력"""
+    costs = get_learned_deltas(DELTA_ENHANCE_COST)
+    prices = get_sell_price_stats()
+    print("\n========== 강화 비용 (골드 차이 학습) / 판매 가격 (획득 골드) ==========")
+    print(f"{'Level':>5} {'Cost':>12} {'n':>7} {'agree':>6} {'Price':>12} {'n':>7} {'min~max':>21}")
+    print("-" * 75)
+    for level in sorted(set(costs) | set(prices)):
+        cost = f"{costs[level][0]:>12,} {costs[level][1]:>7} {costs[level][2]:>5.0%}" if level in costs else f"{'-':>12} {'':>7} {'':>6}"
+        if level in prices:
+            price, samples, low, high = prices[level]
+            price = f"{price:>12,} {samples:>7} {f'{low:,}~{high:,}':>21}"
+        else:
+            price = f"{'-':>12}"
+        print(f"{level:>5} {cost} {price}")
+    print("=" * 75)
+
+
 def print_all_stats():
     """모든 통계 출력 (디버깅용)"""
     stats = get_all_stats()
@@ -269,17 +1358,11 @@ def print_all_stats():
 
 
 def get_buffer_count():
-    """현재 버퍼에 쌓인 횟수 반환"""
-    return _buffer_count
-
-
-# 프로그램 종료 시 버퍼 자동 저장
-atexit.register(flush_buffer)
-
-# 모듈 로드 시 자동 초기화
-init_db()
-
+    """아직 DB에 기록되지 않은 횟수 반환 (대기열 + 버퍼)"""
+    return _buffer_count + _queue.qsize()
 
 if __name__ == "__main__":
     # 테스트
     print_all_stats()
+    print_items()
+    print_learned_deltas()
@@ -0,0 +1,601 @@
+"""
+강화 매크로 공통 엔진
+
+money / upgrade 매크로가 같이 쓰는 강화 루프 (상태 기계)
+전송 → 응답 대기 → 파싱 → 기록 흐름은 EnhanceEngine 하나에만 있고,
+모드별 차이는 정책 객체로 끼워 넣는다.
+
+- 목표 레벨 정책: GoldTargetPolicy (골드 구간별), SolverTargetPolicy (enhance_solver 정책),
+                  ItemTypeTargetPolicy (일반/특별 아이템별)
+- 판매 정책: TargetSellPolicy (목표 도달 또는 enhance_solver 정책대로 판매, 일반 아이템은 다시 뽑음),
+             SpecialItemSellPolicy (특별 아이템만 정해진 레벨 또는 enhance_solver 정책대로 판매)
+- 종료 조건: MaxAttemptsStop, LevelReachedStop
+
+상태:
+    START   시작 아이템 확인 (또는 좋은 아이템이 나올 때까지 판매)
+    ENHANCE 강화 1회
+    SELL    현재 아이템 판매 후 새 아이템 확인
+    DONE    종료 조건 충족
+"""
+import enhance_db
+import enhance_metrics
+import enhance_solver
+import enhance_timing
+from enhance_common import (
+    parse_reply,
+    report_new_item,
+    classify_item,
+    get_current_item_level,
+    ITEM_CLASS_NORMAL,
+    ITEM_CLASS_SPECIAL,
+    get_target_level_by_gold,
+    get_latest_message,
+    wait_for_bot_response,
+    send_sell_command,
+    send_enhance_command,
+    AttemptRateMeter,
+    GoldRateMeter,
+)
+
+
+START = 'start'
+ENHANCE = 'enhance'
+SELL = 'sell'
+DONE = 'done'
+
+GOLD_REPORT_ATTEMPTS = 100  # 이 횟수마다 시간당 수익 출력 (판매할 때도 출력)
+
+
+class MacroState:
+    """매크로 실행 중 상태 (정책이 읽는 값)"""
+
+    def __init__(self):
+        self.current_level = 0
+        self.current_gold = None
+        self.item_name = None
+        self.is_sell_item = True  # 보유 아이템이 일반 아이템(검/몽둥이/망치/도끼)인지
+        self.target_level = None
+        self.attempts = 0
+        self.success = 0
+        self.maintain = 0
+        self.destroy = 0
+        self.cycles = 0           # 판매 정책으로 판매한 횟수
+        self.resumed_attempts = 0  # 체크포인트에서 이어받은 시도 횟수 (이번 실행의 시도 = attempts - resumed_attempts)
+
+
+# ============================================================
+# 목표 레벨 정책
+# ============================================================
+
+class GoldTargetPolicy:
+    """골드 구간에 따라 목표 레벨 결정 (get_target_level_by_gold)"""
+
+    def target_level(self, state):
+        return get_target_level_by_gold(state.current_gold)
+
+    def header(self, state):
+        line = f"[사이클 #{state.cycles + 1}] [시도 #{state.attempts}] 현재 레벨: +{state.current_level} | 목표: +{state.target_level}강"
+        if state.current_gold:
+            line += f" | 골드: {state.current_gold:,}G"
+        return line
+
+    def describe(self, state):
+        if state.current_gold:
+            return f"골드: {state.current_gold:,}G → 목표: +{state.target_level}강"
+        return f"골드 정보 없음 → 목표: +{state.target_level}강"
+
+
+class SolverTargetPolicy(GoldTargetPolicy):
+    """enhance_solver 정책이 처음 판매를 권하는 레벨을 목표로 (골드 구간 대신)"""
+
+    def target_level(self, state):
+        return enhance_solver.target_level()
+
+    def describe(self, state):
+        return f"판매 정책 → 목표: +{state.target_level}강"
+
+
+class ItemTypeTargetPolicy:
+    """아이템 종류에 따라 목표 레벨 결정 (일반 아이템 normal_target, 특별 아이템 special_target)
+
+    Args:
+        use_solver: True면 특별 아이템 목표는 enhance_solver 정책이 처음 판매를 권하는 레벨
+    """
+
+    def __init__(self, normal_target=17, special_target=13, use_solver=False):
+        self.normal_target = normal_target
+        self.special_target = special_target
+        self.use_solver = use_solver
+
+    def target_level(self, state):
+        if state.is_sell_item:
+            return self.normal_target
+        return enhance_solver.target_level() if self.use_solver else self.special_target
+
+    def header(self, state):
+        line = f"[시도 #{state.attempts}] 현재 레벨: +{state.current_level} | 목표: +{state.target_level}강 | 타입: {'일반' if state.is_sell_item else '특별'}"
+        if state.current_gold:
+            line += f" | 골드: {state.current_gold:,}G"
+        return line
+
+    def describe(self, state):
+        return f"타입: {'일반' if state.is_sell_item else '특별'} → {state.target_level}강 목표"
+
+
+# ============================================================
+# 판매 정책
+# ============================================================
+
+class TargetSellPolicy:
+    """목표 레벨에 도달하면 판매, 새 아이템이 일반 아이템이면 특별 아이템이 나올 때까지 판매
+
+    Args:
+        use_solver: True면 목표 레벨 대신 enhance_solver 정책이 판매를 권할 때 판매
+    """
+    reroll_on_start = True  # 시작할 때 보유 아이템부터 판매
+
+    def __init__(self, use_solver=False):
+        self.use_solver = use_solver
+
+    def sell_reason(self, state):
+        """강화 성공 후 판매할지 (판매하면 출력할 문구, 아니면 None)"""
+        if self.use_solver:
+            if enhance_solver.should_sell(state.current_level):
+                return f"🧮 판매 정책: +{state.current_level}강에서 판매가 유리! 판매 진행..."
+            return None
+        if state.current_level >= state.target_level:
+            return f"🎉 목표 +{state.target_level}강 달성! 판매 진행..."
+        return None
+
+    def keep_item(self, is_sell_item):
+        """새로 받은 아이템으로 강화할지 (False면 다시 판매)"""
+        return not is_sell_item
+
+
+class SpecialItemSellPolicy:
+    """일반 아이템은 판매하지 않고, 특별 아이템만 sell_level에서 판매
+
+    Args:
+        use_solver: True면 sell_level 대신 enhance_solver 정책이 판매를 권할 때 판매
+    """
+    reroll_on_start = False
+
+    def __init__(self, sell_level=13, use_solver=False):
+        self.sell_level = sell_level
+        self.use_solver = use_solver
+
+    def sell_reason(self, state):
+        if state.is_sell_item:
+            return None
+        if self.use_solver:
+            if enhance_solver.should_sell(state.current_level):
+                return f"🧮 판매 정책: 특별 아이템 +{state.current_level}강에서 판매가 유리! 판매 진행..."
+            return None
+        if state.current_level >= self.sell_level:
+            return f"🎉 특별 아이템 +{self.sell_level}강 달성! 판매 진행..."
+        return None
+
+    def keep_item(self, is_sell_item):
+        return True
+
+
+# ============================================================
+# 종료 조건
+# ============================================================
+
+class MaxAttemptsStop:
+    """이번 실행에서 강화 시도 max_attempts회 후 종료 (None이면 무한, 체크포인트에서 이어받은 횟수는 세지 않음)"""
+
+    def __init__(self, max_attempts=None):
+        self.max_attempts = max_attempts
+
+    def stop_reason(self, state):
+        if self.max_attempts is not None and state.attempts - state.resumed_attempts >= self.max_attempts:
+            return 'max_attempts'
+        return None
+
+
+class LevelReachedStop:
+    """level강 달성 시 종료"""
+
+    def __init__(self, level=17):
+        self.level = level
+
+    def stop_reason(self, state):
+        if state.current_level >= self.level:
+            return 'level_reached'
+        return None
+
+
+# ============================================================
+# 판매 반복
+# ============================================================
+
+def _observe_gold(gold):
+    """읽은 보유 골드를 골드 시계열에 기록하고 그대로 반환 (None이면 기록 안 함)"""
+    if gold is not None:
+        enhance_db.record_gold(gold)
+    return gold
+
+
+def _observe_items(event):
+    """판매한 아이템 가격과 새로 받은 아이템을 아이템 카탈로그에 기록하고 event를 그대로 반환"""
+    enhance_db.record_item_sale(event.sold_item_name, event.sold_level, event.sell_price)
+    if event.new_item_name is not None:
+        enhance_db.record_item(event.new_item_name)
+    elif event.result_type == "destroy":
+        enhance_db.record_item(event.item_name)
+    return event
+
+
+def _learn_from_gold(event, previous_gold):
+    """직전 응답의 골드와 이번 응답의 골드 차이로 레벨별 강화 비용 기록
+
+    판매 가격은 판매 응답의 획득 골드를 _observe_items가 그대로 기록한다.
+
+    Args:
+        previous_gold: 바로 앞 응답에서 읽은 골드 (모르면 None)
+
+    Returns:
+        int: 다음 차이 계산에 쓸 이번 응답 후 골드 (모르면 None)
+    """
+    gold = event.sell_gold if event.sell_gold is not None else event.gold
+    if previous_gold is None:
+        return gold
+    if event.result_type is not None and event.old_level is not None and event.gold is not None:
+        enhance_db.record_enhance_cost(event.old_level, previous_gold - event.gold)
+    if gold is None and event.result_type == "success" and event.new_level:
+        # 전설 강화 알림만 읽어서 남은 골드를 모르면 학습한 강화 비용으로 추정
+        cost = enhance_db.get_enhance_costs().get(event.new_level - 1)
+        if cost is not None:
+            return previous_gold - cost
+    return gold
+
+
+def sell_until_good_item(target_window_title, delay, current_gold=None, result_text=None):
+    """검 또는 몽둥이가 아닐 때까지 판매 반복
+
+    0강검은 판매 불가 → 강화 1회 후 판매 진행
+
+    Args:
+        result_text: 이미 읽은 마지막 응답 (None이면 봇 응답을 기다려서 읽음)
+
+    Returns:
+        tuple: (result_text, current_gold)
+    """
+    print("  🔄 좋은 아이템 나올 때까지 판매 중...")
+    if result_text is None:
+        result_text = wait_for_bot_response(target_window_title)
+        event = _observe_items(parse_reply(result_text))
+    else:
+        event = parse_reply(result_text)
+
+    sell_count = 0
+    last_gold = current_gold  # 골드 차이 학습 기준 (바로 앞 응답의 골드)
+    while result_text and event.is_sell_new_item:
+        # 0강검 판매 불가 또는 〖검 판매〗 메시지 감지 시 강화 1회 후 판매
+        if event.zero_unsellable or event.sword_sold:
+            if event.sword_sold:
+                last_gold = _learn_from_gold(event, last_gold)
+            if event.zero_unsellable:
+                print("    ⚠️ 0강검 판매 불가! 강화 1회 진행...")
+            else:
+                print("    🔨 검 판매 감지! 강화 1회 진행...")
+            send_enhance_command(target_window_title)
+            enhance_result = wait_for_bot_response(target_window_title, min_delay=delay)
+            enhance_event = parse_reply(enhance_result)
+            last_gold = _learn_from_gold(enhance_event, last_gold)
+            gold = _observe_gold(enhance_event.gold)
+            if gold is not None:
+                current_gold = gold
+            send_sell_command(target_window_title)
+            result_text = wait_for_bot_response(target_window_title, min_delay=delay)
+            event = _observe_items(parse_reply(result_text))
+            continue
+
+        # 판매 결과에서 골드 파싱
+        last_gold = _learn_from_gold(event, last_gold)
+        if _observe_gold(event.sell_gold) is not None:
+            current_gold = event.sell_gold
+
+        sell_count += 1
+        print(f"    판매 #{sell_count}")
+        send_sell_command(target_window_title)
+        result_text = wait_for_bot_response(target_window_title, min_delay=delay)
+        event = _observe_items(parse_reply(result_text))
+
+    # 마지막 결과에서도 골드 파싱 시도
+    _learn_from_gold(event, last_gold)
+    if _observe_gold(event.sell_gold) is not None:
+        current_gold = event.sell_gold
+
+    print(f"  ✅ 좋은 아이템 획득! (판매 {sell_count}회)")
+    return result_text, current_gold
+
+
+# ============================================================
+# 엔진
+# ============================================================
+
+class EnhanceEngine:
+    """정책 기반 강화 루프 (상태 기계)
+
+    Args:
+        target_window_title: 대상 창 제목
+        target_policy: 목표 레벨 정책
+        sell_policy: 판매 정책
+        stop_policies: 종료 조건 목록 (하나라도 충족하면 종료)
+        delay: 강화 후 결과 확인까지 최소 대기 시간 (초)
+        resume: True면 시작할 때 창의 마지막 체크포인트와 채팅 마지막 메시지로 보유 아이템을 복원해서 이어서 진행
+    """
+
+    def __init__(self, target_window_title, target_policy, sell_policy, stop_policies=(), delay=1.0, resume=False):
+        self.title = target_window_title
+        self.target = target_policy
+        self.sell = sell_policy
+        self.stops = list(stop_policies)
+        self.delay = delay
+        self.resume = resume
+        self.state = MacroState()
+        self.rate = AttemptRateMeter()
+        self.gold_rate = GoldRateMeter()
+        self.phase = START
+        self.stop_reason = None
+        self._sell_message = None
+        self._last_gold = None  # 골드 차이 학습 기준 (바로 앞 응답의 골드)
+        self._handlers = {START: self._start, ENHANCE: self._enhance, SELL: self._sell}
+        enhance_metrics.register_engine(self)
+
+    def run(self):
+        """DONE 상태가 될 때까지 실행
+
+        Returns:
+            dict: 시도/성공/유지/파괴 횟수, 골드, 종료 이유
+        """
+        try:
+            while self.phase != DONE:
+                self.step()
+        except KeyboardInterrupt:
+            # Ctrl+C도 정상 종료: 다음 실행은 아이템만 이어받고 횟수는 새로 셈
+            self.stop_reason = 'interrupted'
+            self.phase = DONE
+            self._checkpoint()
+            raise
+        return self.result()
+
+    def step(self):
+        """현재 상태 하나 실행 후 종료 조건 확인"""
+        self._handlers[self.phase]()
+        if self.phase != DONE:
+            self._check_stop()
+        self._checkpoint()
+
+    def result(self):
+        state = self.state
+        rates = self.gold_rate.per_hour()
+        return {
+            'attempts': state.attempts,
+            'success': state.success,
+            'maintain': state.maintain,
+            'destroy': state.destroy,
+            'gold': state.current_gold,
+            'gold_per_hour': rates[0] if rates else None,
+            'attempts_per_hour': rates[1] if rates else None,
+            'stopped': self.stop_reason,
+        }
+
+    def _check_stop(self):
+        for policy in self.stops:
+            reason = policy.stop_reason(self.state)
+            if reason is not None:
+                self.stop_reason = reason
+                self.phase = DONE
+                return
+
+    def _checkpoint(self):
+        """현재 상태를 체크포인트로 저장 (대기열에 넣기만 하므로 매 시도마다 호출해도 됨)"""
+        state = self.state
+        enhance_db.save_checkpoint(
+            self.title, state.current_level, state.item_name,
+            ITEM_CLASS_NORMAL if state.is_sell_item else ITEM_CLASS_SPECIAL,
+            state.current_gold, state.target_level,
+            state.attempts, state.success, state.maintain, state.destroy, state.cycles,
+            finished=self.phase == DONE,
+        )
+
+    def _resume(self, text):
+        """체크포인트와 채팅 마지막 메시지를 맞춰 보고 보유 아이템 상태 복원
+
+        채팅에 보유 아이템이 보이면 채팅 기준 (체크포인트 이후의 결과일 수 있음), 안 보이면 체크포인트 기준.
+        정상 종료 (Ctrl+C 포함) 후 저장한 체크포인트면 아이템과 골드만 가져오고 시도 횟수 등은 새로 센다.
+        비정상 종료 후라면 횟수를 이어서 세지만, 종료 조건(MaxAttemptsStop)은 이번 실행의 시도만 센다.
+        판매 정책이 새 아이템으로 받지 않을 아이템이라도 체크포인트에서 강화하던 그 아이템이면 이어서 강화한다.
+
+        Returns:
+            bool: 복원한 아이템으로 이어서 강화하는지 (False면 판매 정책대로 새로 시작)
+        """
+        state = self.state
+        checkpoint = enhance_db.load_checkpoint(self.title)
+        event = parse_reply(text) if text else None
+        level = get_current_item_level(text) if event is not None and event.item_name else None
+        if level is None and (checkpoint is None or checkpoint['level'] is None):
+            return False
+
+        name = event.item_name if level is not None else None
+        same_item = False
+        if checkpoint is not None:
+            if not checkpoint['finished']:
+                for field in ('attempts', 'success', 'maintain', 'destroy', 'cycles'):
+                    setattr(state, field, checkpoint[field])
+                state.resumed_attempts = checkpoint['attempts']
+            state.current_gold = checkpoint['gold']
+            if level is None:
+                level, name = checkpoint['level'], checkpoint['item_name']
+                print("  📌 채팅에서 보유 아이템 확인 불가, 체크포인트 기준")
+            elif (level, name) != (checkpoint['level'], checkpoint['item_name']):
+                print(f"  ⚠️ 체크포인트 (+{checkpoint['level']} {checkpoint['item_name']})와 채팅이 다름, 채팅 기준")
+            # 강화 1회 차이 (결과가 체크포인트 저장 전에 멈춤) 까지는 같은 아이템으로 봄
+            same_item = name == checkpoint['item_name'] and abs(level - checkpoint['level']) <= 1
+
+        if event is not None:
+            gold = event.sell_gold if event.sell_gold is not None else event.gold
+            if gold is not None:
+                state.current_gold = gold
+        state.current_level = level
+        state.item_name = name
+        item_class = classify_item(name) if name else checkpoint['item_class']
+        state.is_sell_item = item_class != ITEM_CLASS_SPECIAL
+        state.target_level = self.target.target_level(state)
+        return same_item or self.sell.keep_item(state.is_sell_item)
+
+    def _set_gold(self, gold, announce=False):
+        """골드 갱신 후 목표 레벨 다시 계산 (announce면 바뀐 경우 출력)"""
+        state = self.state
+        state.current_gold = gold
+        self.gold_rate.observe(gold, state.attempts)
+        new_target = self.target.target_level(state)
+        if announce and new_target != state.target_level:
+            print(f"  💰 골드 변동: {gold:,}G → 목표 레벨 변경: +{state.target_level}강 → +{new_target}강")
+        state.target_level = new_target
+
+    def _take_new_item(self, is_sell_item, result_text, item_name=None):
+        """새 아이템 (+0) 으로 바뀐 뒤 처리, 판매 정책상 필요하면 다시 뽑음"""
+        state = self.state
+        state.current_level = 0
+        state.item_name = item_name
+        state.is_sell_item = is_sell_item
+        if not self.sell.keep_item(is_sell_item):
+            result_text, gold = sell_until_good_item(self.title, self.delay, state.current_gold, result_text)
+            state.item_name = parse_reply(result_text).item_name if result_text else None
+            self._set_gold(gold)
+            self._last_gold = None  # 판매를 반복한 뒤의 골드는 마지막 응답 기준인지 알 수 없음
+            state.is_sell_item = False
+        state.target_level = self.target.target_level(state)
+
+    # --- 상태별 처리 ---
+
+    def _start(self):
+        state = self.state
+        enhance_db.load_item_catalog()
+        initial_text = None
+        if self.resume:
+            initial_text = get_latest_message(self.title)
+            if self._resume(initial_text):
+                print(f"  📌 이어서 시작: +{state.current_level} {state.item_name or ''} ({self.target.describe(state)})")
+                reason = self.sell.sell_reason(state) if state.current_level > 0 else None
+                if reason is not None:
+                    state.cycles += 1
+                    print(f"\n  {reason}")
+                    self.phase = SELL
+                else:
+                    self.phase = ENHANCE
+                return
+
+        if self.sell.reroll_on_start:
+            result_text, gold = sell_until_good_item(self.title, self.delay, state.current_gold, initial_text)
+            state.current_level = 0
+            state.item_name = parse_reply(result_text).item_name if result_text else None
+            self._set_gold(gold)
+            state.is_sell_item = False
+        else:
+            if initial_text is None:
+                initial_text = get_latest_message(self.title)
+            if initial_text:
+                event = parse_reply(initial_text)
+                state.item_name = event.item_name
+                state.is_sell_item = event.is_sell_item
+            else:
+                print("  📌 아이템 타입 확인 불가, 일반 아이템으로 가정")
+        state.target_level = self.target.target_level(state)
+        print(f"  📌 시작: {self.target.describe(state)}")
+        self.phase = ENHANCE
+
+    def _enhance(self):
+        state = self.state
+        state.attempts += 1
+        self.rate.tick()
+        print(f"\n{self.target.header(state)}{self.rate.format()}")
+        if state.attempts % GOLD_REPORT_ATTEMPTS == 0:
+            self._report_gold_rate()
+
+        # 1. 강화 명령 입력
+        if not send_enhance_command(self.title):
+            print("명령어 입력 실패. 재시도...")
+            return
+
+        # 2. 결과 텍스트 가져오기 (봇 응답 대기, 최소 delay초 후 첫 확인)
+        #    기다리는 동안 다음 강화 명령어를 미리 입력해 두면 다음 시도는 엔터만 누르면 됨
+        result_text = wait_for_bot_response(self.title, min_delay=self.delay, stage='/강화')
+
+        if result_text is None:
+            print("  결과를 읽을 수 없습니다. 재시도...")
+            return
+
+        # 3. 결과 분석
+        with enhance_timing.span('parse_reply'):
+            event = parse_reply(result_text)
+        _observe_items(event)
+
+        # 강화 결과에서 골드 파싱
+        self._last_gold = _learn_from_gold(event, self._last_gold)
+        if _observe_gold(event.gold) is not None:
+            self._set_gold(event.gold, announce=True)
+
+        if event.result_type == "success":
+            enhance_db.record_success(state.current_level, gold=state.current_gold, item_name=event.item_name)
+            state.current_level = event.new_level
+            state.item_name = event.item_name or state.item_name
+            state.success += 1
+            print(f"  ✨ 강화 성공! → +{state.current_level}")
+
+            # 목표 레벨 도달 (또는 판매 정책상 지금 판매가 유리) 시 판매 후 재시작
+            reason = self.sell.sell_reason(state)
+            if reason is not None:
+                state.cycles += 1
+                print(f"\n  {reason}")
+                print(f"  📊 누적 통계: 사이클 {state.cycles}회 완료")
+                self.phase = SELL
+                return
+
+        elif event.result_type == "maintain":
+            enhance_db.record_stay(state.current_level, gold=state.current_gold, item_name=event.item_name)
+            state.maintain += 1
+            print(f"  💦 강화 유지 (현재: +{state.current_level})")
+
+        elif event.result_type == "destroy":
+            enhance_db.record_break(state.current_level, gold=state.current_gold)
+            state.destroy += 1
+            print(f"  💥 강화 파괴! → +0")
+
+            # 파괴 시 새 아이템 타입 확인 (로그 메시지 출력 포함)
+            self._take_new_item(report_new_item(event), result_text, event.item_name)
+            print(f"  🔄 새 아이템! ({self.target.describe(state)})")
+
+        elif event.insufficient_gold:
+            print(f"  💸 골드 부족! 현재 아이템 판매 후 재시도...")
+            self.phase = SELL
+            return
+
+        else:
+            print(f"  ⚠️ 결과를 파악할 수 없습니다.")
+            print(f"  [디버그] 받은 텍스트: {result_text[:200] if result_text else 'None'}...")
+
+    def _sell(self):
+        send_sell_command(self.title)
+        sell_result = wait_for_bot_response(self.title, min_delay=self.delay)
+
+        sell_event = _observe_items(parse_reply(sell_result))
+        self._last_gold = _learn_from_gold(sell_event, self._last_gold)
+        if _observe_gold(sell_event.sell_gold) is not None:
+            self._set_gold(sell_event.sell_gold)
+
+        self._take_new_item(sell_event.is_sell_new_item, sell_result, sell_event.new_item_name)
+        self.phase = ENHANCE
+        print(f"  🔄 새 아이템으로 재시작! ({self.target.describe(self.state)})")
+        self._report_gold_rate()
+
+    def _report_gold_rate(self):
+        """최근 구간의 시간당 골드/시도 출력 (상태는 바꾸지 않음)"""
+        line = self.gold_rate.format()
+        if line:
+            print(f"  {line}")
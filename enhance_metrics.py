@@ -0,0 +1,220 @@
+"""
+매크로 상태 HTTP 엔드포인트 (Prometheus 텍스트 형식)
+
+몇 시간씩 돌리는 매크로를 콘솔 출력 대신 로컬 수집기(Prometheus)나 터미널 대시보드로 보기 위한 것
+
+- GET /metrics: 창별 시도/성공/유지/파괴 수, 현재/목표 레벨, 골드, 시간당 골드/시도,
+  이 프로세스가 기록한 레벨별 결과 수, 구간별 소요 시간 히스토그램 (봇 응답 대기, DB 기록 등),
+  DB 쓰기 대기열, 창 찾기 실패 횟수
+- 값은 요청이 올 때 별도 데몬 스레드에서 모음 (강화 루프는 아무것도 하지 않음)
+- 127.0.0.1에서만 받음
+- 켜기: 환경 변수 ENHANCE_METRICS_PORT=9108 또는 start_server(port)
+  (구간별 소요 시간 측정도 같이 켜짐)
+
+사용 예:
+    ENHANCE_METRICS_PORT=9108 python enhance_macro_money.py
+    curl http://127.0.0.1:9108/metrics
+"""
+import os
+import threading
+import weakref
+
+import enhance_common
+import enhance_db
+import enhance_timing
+
+
+PORT = int(os.environ.get('ENHANCE_METRICS_PORT', '0') or 0)
+HOST = '127.0.0.1'
+HISTOGRAM_BUCKET_STEP = 3  # enhance_timing 버킷 경계 중 이 간격마다 하나씩 내보냄 (약 2배 간격)
+
+_engines = {}  # 창 제목 → EnhanceEngine 약한 참조
+_engines_lock = threading.Lock()
+_server = None
+
+
+def register_engine(engine):
+    """EnhanceEngine을 수집 대상에 추가 (엔진이 사라지면 자동으로 빠짐)"""
+    with _engines_lock:
+        _engines[engine.title] = weakref.ref(engine)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class _Exposition:
+    """Prometheus 텍스트 형식 작성기"""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, kind, help_text):
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {kind}')
+
+    def sample(self, name, value, **labels):
+        if value is None:
+            return
+        self.lines.append(f'{name}{_labels(labels)} {value}')
+
+    def text(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def _collect_engines(out):
+    with _engines_lock:
+        engines = [(title, ref()) for title, ref in _engines.items()]
+    engines = [(title, engine) for title, engine in engines if engine is not None]
+
+    out.family('enhance_attempts_total', 'counter', '강화 시도 수')
+    for title, engine in engines:
+        out.sample('enhance_attempts_total', engine.state.attempts, window=title)
+    out.family('enhance_results_total', 'counter', '강화 결과 수')
+    for title, engine in engines:
+        state = engine.state
+        out.sample('enhance_results_total', state.success, window=title, result='success')
+        out.sample('enhance_results_total', state.maintain, window=title, result='maintain')
+        out.sample('enhance_results_total', state.destroy, window=title, result='destroy')
+    out.family('enhance_cycles_total', 'counter', '목표 도달 후 판매한 횟수')
+    for title, engine in engines:
+        out.sample('enhance_cycles_total', engine.state.cycles, window=title)
+
+    out.family('enhance_level', 'gauge', '현재 아이템 레벨')
+    for title, engine in engines:
+        out.sample('enhance_level', engine.state.current_level, window=title)
+    out.family('enhance_target_level', 'gauge', '목표 레벨')
+    for title, engine in engines:
+        out.sample('enhance_target_level', engine.state.target_level, window=title)
+    out.family('enhance_gold', 'gauge', '마지막으로 읽은 보유 골드')
+    for title, engine in engines:
+        out.sample('enhance_gold', engine.state.current_gold, window=title)
+
+    rates = [(title, engine.gold_rate.per_hour()) for title, engine in engines]
+    rates = [(title, rate) for title, rate in rates if rate is not None]
+    out.family('enhance_gold_per_hour', 'gauge', '최근 구간의 시간당 골드 증감')
+    for title, (gold_per_hour, _) in rates:
+        out.sample('enhance_gold_per_hour', f'{gold_per_hour:.1f}', window=title)
+    out.family('enhance_attempts_per_hour', 'gauge', '최근 구간의 시간당 강화 시도 수')
+    for title, (_, attempts_per_hour) in rates:
+        out.sample('enhance_attempts_per_hour', f'{attempts_per_hour:.1f}', window=title)
+
+
+def _collect_levels(out):
+    out.family('enhance_level_results_total', 'counter', '이 프로세스가 기록한 레벨별 강화 결과 수')
+    for level, success, stay, break_count in enhance_db.get_recorded_counts():
+        out.sample('enhance_level_results_total', success, level=level, result='success')
+        out.sample('enhance_level_results_total', stay, level=level, result='maintain')
+        out.sample('enhance_level_results_total', break_count, level=level, result='destroy')
+
+
+def _collect_db(out):
+    stats = enhance_db.get_writer_stats()
+    out.family('enhance_db_queue_depth', 'gauge', 'DB 쓰기 대기열 길이')
+    out.sample('enhance_db_queue_depth', stats['queue_depth'])
+    out.family('enhance_db_buffered', 'gauge', '버퍼에 있는 아직 기록되지 않은 시도 수')
+    out.sample('enhance_db_buffered', stats['buffered'])
+    out.family('enhance_db_flushes_total', 'counter', 'DB 기록 횟수')
+    out.sample('enhance_db_flushes_total', stats['flushes'])
+    out.family('enhance_db_flush_last_seconds', 'gauge', '마지막 DB 기록 소요 시간')
+    out.sample('enhance_db_flush_last_seconds', f"{stats['last_ms'] / 1000:.6f}")
+    out.family('enhance_db_flush_max_seconds', 'gauge', '가장 오래 걸린 DB 기록 소요 시간')
+    out.sample('enhance_db_flush_max_seconds', f"{stats['max_ms'] / 1000:.6f}")
+
+
+def _collect_window(out):
+    out.family('enhance_window_not_found_total', 'counter', '창 찾기 실패 횟수')
+    for title, count in list(enhance_common._window_not_found_totals.items()):
+        out.sample('enhance_window_not_found_total', count, window=title)
+    out.family('enhance_window_not_found_consecutive', 'gauge', '연속 창 찾기 실패 횟수 (MAX_WINDOW_NOT_FOUND에 닿으면 그 창의 매크로 종료)')
+    for title, count in list(enhance_common._window_not_found_counts.items()):
+        out.sample('enhance_window_not_found_consecutive', count, window=title)
+
+
+def _collect_spans(out):
+    bounds = enhance_timing.BUCKET_BOUNDS
+    emitted = range(HISTOGRAM_BUCKET_STEP - 1, len(bounds), HISTOGRAM_BUCKET_STEP)
+    out.family('enhance_span_seconds', 'histogram', '구간별 소요 시간 (wait.bot_latency: 봇 응답 대기, db.flush: DB 기록)')
+    for name, (counts, count, total) in enhance_timing.snapshot().items():
+        cumulative = 0
+        index = 0
+        for i in emitted:
+            while index <= i:
+                cumulative += counts[index]
+                index += 1
+            out.sample('enhance_span_seconds_bucket', cumulative, span=name, le=f'{bounds[i] / 1000:g}')
+        out.sample('enhance_span_seconds_bucket', count, span=name, le='+Inf')
+        out.sample('enhance_span_seconds_sum', f'{total / 1000:.6f}', span=name)
+        out.sample('enhance_span_seconds_count', count, span=name)
+
+
+def collect():
+    """현재 상태를 Prometheus 텍스트 형식으로 반환"""
+    out = _Exposition()
+    _collect_engines(out)
+    _collect_levels(out)
+    _collect_db(out)
+    _collect_window(out)
+    _collect_spans(out)
+    return out.text()
+
+
+def _handler_class():
+    """/metrics 요청 처리기 (http.server는 서버를 켤 때만 불러옴)"""
+    from http.server import BaseHTTPRequestHandler
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = collect().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # 요청마다 로그에 남기지 않음
+
+    return _Handler
+
+
+def start_server(port=None, host=HOST):
+    """상태 엔드포인트 시작 (이미 실행 중이면 그대로 반환)
+
+    Returns:
+        ThreadingHTTPServer: 실행 중인 서버 (포트를 열 수 없으면 None)
+    """
+    global _server
+    if _server is not None:
+        return _server
+    from http.server import ThreadingHTTPServer
+    port = PORT if port is None else port
+    try:
+        server = ThreadingHTTPServer((host, port), _handler_class())
+    except OSError as e:
+        print(f"⚠️ 상태 엔드포인트를 열 수 없음 ({host}:{port}): {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='enhance_metrics', daemon=True).start()
+    enhance_timing.enable()
+    _server = server
+    print(f"📡 상태 엔드포인트: http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def stop_server():
+    """상태 엔드포인트 종료"""
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
@@ -0,0 +1,220 @@
+"""
+몬테카를로 목표 레벨 계산기
+
+"+N강까지 강화 후 판매" 전략을 목표 레벨별로 NumPy 배열로 한꺼번에 시뮬레이션해서
+시도 1회당 골드 수익(gold per attempt)이 가장 높은 목표를 골드 구간별로 계산한다.
+
+사이클은 money 매크로가 실제로 하는 일을 그대로 센다:
+새 아이템이 일반 아이템이면 특별 아이템이 나올 때까지 판매 (0강은 판매 불가라 강화 1회 후 +1강으로 판매),
+파괴된 뒤 받은 새 아이템도 마찬가지. 시도 횟수는 이 강화까지 포함한 강화 명령 수.
+
+- 확률: enhance_data.db의 enhance_stats (레벨별 Success/Stay/Break)
+- 비용/판매가: enhance_sim의 기본 강화 비용과 enhance_db의 판매가 표
+  (목표 판매는 특별 아이템 가격, 다시 뽑기는 일반 아이템 가격),
+  --learned면 매크로가 기록한 값 (없는 레벨은 기본값)
+- 특별 아이템이 나올 확률: --special-rate (기본 enhance_sim.SPECIAL_ITEM_RATE)
+- 결과: target_levels.json (enhance_common.get_target_level_by_gold가 자동으로 사용)
+
+사용 예:
+    python enhance_montecarlo.py --runs 1000000
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+
+from enhance_common import TARGET_TABLE_PATH
+from enhance_db import COMMON_SALE_PRICES, HIDDEN_SALE_PRICES, ITEM_CLASS_NORMAL
+from enhance_sim import load_odds, load_enhance_costs, load_sell_prices, DEFAULT_ENHANCE_COSTS, SPECIAL_ITEM_RATE
+
+
+MIN_TARGET = 2
+MAX_TARGET = 15
+BANKROLL_QUANTILE = 0.99  # 한 사이클 비용이 이 분위수 이하면 감당 가능하다고 판단
+BATCHES = 20              # 신뢰구간 계산용 배치 수
+MAX_STEPS = 200000        # 목표에 도달하지 못하는 경우를 막기 위한 최대 강화 횟수
+
+
+def _pad(table, size):
+    """레벨 테이블을 size 길이로 맞춤 (부족하면 마지막 값 반복)"""
+    table = list(table)
+    return table[:size] + [table[-1]] * max(0, size - len(table))
+
+
+def simulate_target(target, runs, odds, enhance_costs, rng, chunk=1000000, special_rate=None,
+                    reroll_prices=COMMON_SALE_PRICES):
+    """0강에서 target강까지 강화하는 사이클을 runs번 시뮬레이션
+
+    파괴되면 새 0강 아이템으로 같은 사이클을 계속한다.
+    MAX_STEPS 안에 목표에 도달하지 못한 사이클은 finished가 False.
+    special_rate가 있으면 사이클 시작과 파괴 후마다 일반 아이템을 다시 뽑는 비용도 더한다
+    (일반 아이템 하나당 강화 1회 + 0강 강화 비용, +1강 판매가 reroll_prices[1]을 받음).
+
+    Returns:
+        tuple: (attempts, cost, finished, income) 각 사이클의 강화 횟수, 사용 골드, 목표 도달 여부,
+               다시 뽑기 판매로 받은 골드 배열
+    """
+    size = target + 1
+    p_success = np.array([o[0] for o in _pad(odds, size)])
+    p_keep = p_success + np.array([o[1] for o in _pad(odds, size)])
+    costs = np.array(_pad(enhance_costs, size), dtype=np.float64)
+
+    attempts_out = []
+    cost_out = []
+    finished_out = []
+    income_out = []
+    for start in range(0, runs, chunk):
+        n = min(chunk, runs - start)
+        level = np.zeros(n, dtype=np.int64)
+        attempts = np.zeros(n, dtype=np.int64)
+        cost = np.zeros(n, dtype=np.float64)
+        destroys = np.zeros(n, dtype=np.int64)
+        active = np.arange(n)
+
+        for _ in range(MAX_STEPS):
+            if active.size == 0:
+                break
+            lv = level[active]
+            attempts[active] += 1
+            cost[active] += costs[lv]
+
+            roll = rng.random(active.size)
+            success = roll < p_success[lv]
+            destroy = roll >= p_keep[lv]
+            lv = np.where(success, lv + 1, np.where(destroy, 0, lv))
+            level[active] = lv
+            destroys[active] += destroy
+            active = active[lv < target]
+
+        income = np.zeros(n, dtype=np.float64)
+        if special_rate is not None:
+            # 특별 아이템이 나오기 전까지 받은 일반 아이템 수 (시작 1번 + 파괴마다 1번)
+            rerolls = rng.negative_binomial(destroys + 1, special_rate)
+            attempts += rerolls
+            cost += rerolls * costs[0]
+            income = rerolls * float(reroll_prices[1])
+
+        attempts_out.append(attempts)
+        cost_out.append(cost)
+        finished_out.append(level >= target)
+        income_out.append(income)
+
+    return (np.concatenate(attempts_out), np.concatenate(cost_out), np.concatenate(finished_out),
+            np.concatenate(income_out))
+
+
+def summarize_target(target, attempts, cost, finished, income, sell_price, quantile=BANKROLL_QUANTILE, batches=BATCHES):
+    """사이클 결과를 목표 레벨 요약으로 변환 (배치 평균으로 95% 신뢰구간 계산)
+
+    목표에 도달하지 못한 사이클은 판매가 없이 쓴 골드만 손실로 친다.
+    """
+    profit = np.where(finished, sell_price, 0) + income - cost
+    gpa = profit.sum() / attempts.sum()
+
+    batch_gpa = np.array([
+        p.sum() / a.sum()
+        for p, a in zip(np.array_split(profit, batches), np.array_split(attempts, batches))
+    ])
+    half_width = 1.96 * batch_gpa.std(ddof=1) / np.sqrt(batches)
+
+    return {
+        'target': target,
+        'gold_per_attempt': float(gpa),
+        'ci_low': float(gpa - half_width),
+        'ci_high': float(gpa + half_width),
+        'attempts_mean': float(attempts.mean()),
+        'cost_mean': float(cost.mean()),
+        'profit_mean': float(profit.mean()),
+        'required_gold': int(np.quantile(cost, quantile)),
+        'unfinished': int(finished.size - finished.sum()),
+    }
+
+
+def build_threshold_table(summaries):
+    """목표별 요약에서 골드 → 목표 레벨 표 생성
+
+    필요 골드가 적은 목표부터 보면서, 시도당 수익이 지금까지보다 높아질 때만 구간을 추가한다.
+
+    Returns:
+        list: [[최소 골드, 목표 레벨], ...] (최소 골드 오름차순, 첫 구간은 0)
+    """
+    table = []
+    best = None
+    for s in sorted(summaries, key=lambda s: (s['required_gold'], s['target'])):
+        if best is not None and s['gold_per_attempt'] <= best['gold_per_attempt']:
+            continue
+        min_gold = 0 if not table else s['required_gold']
+        table.append([min_gold, s['target']])
+        best = s
+    return table
+
+
+def run(runs=1000000, seed=None, min_target=MIN_TARGET, max_target=MAX_TARGET,
+        enhance_costs=DEFAULT_ENHANCE_COSTS, sell_prices=HIDDEN_SALE_PRICES, quantile=BANKROLL_QUANTILE,
+        special_rate=SPECIAL_ITEM_RATE, reroll_prices=COMMON_SALE_PRICES):
+    """모든 목표 레벨을 시뮬레이션하고 결과 dict 반환
+
+    Args:
+        sell_prices: 목표 레벨에서 파는 특별 아이템 판매가
+        special_rate: 새 아이템이 특별 아이템일 확률
+        reroll_prices: 다시 뽑을 때 파는 일반 아이템 판매가
+    """
+    odds = load_odds()
+    rng = np.random.default_rng(seed)
+
+    summaries = []
+    for target in range(min_target, max_target + 1):
+        start = time.perf_counter()
+        attempts, cost, finished, income = simulate_target(target, runs, odds, enhance_costs, rng,
+                                                           special_rate=special_rate, reroll_prices=reroll_prices)
+        sell_price = _pad(sell_prices, target + 1)[target]
+        summary = summarize_target(target, attempts, cost, finished, income, sell_price, quantile)
+        summaries.append(summary)
+        print(f"  +{target:>2}강: {summary['gold_per_attempt']:>12,.1f} G/시도 "
+              f"[{summary['ci_low']:,.1f} ~ {summary['ci_high']:,.1f}] "
+              f"필요 골드 {summary['required_gold']:>12,}G ({time.perf_counter() - start:.1f}s)")
+        if summary['unfinished']:
+            print(f"    ⚠️ {summary['unfinished']:,}회는 {MAX_STEPS:,}번 안에 목표에 도달하지 못해 손실로 계산")
+
+    return {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'runs': runs,
+        'quantile': quantile,
+        'special_rate': special_rate,
+        'targets': summaries,
+        'table': build_threshold_table(summaries),
+    }
+
+
+def save_table(result, path=TARGET_TABLE_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="골드 구간별 최적 목표 레벨 계산 (몬테카를로)")
+    parser.add_argument('--runs', type=int, default=1000000, help="목표 레벨당 시뮬레이션 사이클 수")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--min-target', type=int, default=MIN_TARGET)
+    parser.add_argument('--max-target', type=int, default=MAX_TARGET)
+    parser.add_argument('--learned', action='store_true', help="강화 비용/판매 가격을 매크로가 학습한 값으로")
+    parser.add_argument('--quantile', type=float, default=BANKROLL_QUANTILE, help="필요 골드 계산 분위수")
+    parser.add_argument('--special-rate', type=float, default=SPECIAL_ITEM_RATE, help="새 아이템이 특별 아이템일 확률")
+    parser.add_argument('--output', default=TARGET_TABLE_PATH)
+    args = parser.parse_args()
+
+    print(f"🎲 목표 레벨별 {args.runs:,}회 시뮬레이션")
+    costs = load_enhance_costs() if args.learned else DEFAULT_ENHANCE_COSTS
+    prices = load_sell_prices() if args.learned else HIDDEN_SALE_PRICES
+    reroll_prices = load_sell_prices(ITEM_CLASS_NORMAL) if args.learned else COMMON_SALE_PRICES
+    result = run(args.runs, args.seed, args.min_target, args.max_target,
+                 enhance_costs=costs, sell_prices=prices, quantile=args.quantile,
+                 special_rate=args.special_rate, reroll_prices=reroll_prices)
+    save_table(result, args.output)
+
+    print("\n========== 골드 → 목표 레벨 ==========")
+    for min_gold, target in result['table']:
+        print(f"  골드 >= {min_gold:>12,}G: +{target}강")
+    print(f"💾 저장: {args.output}")
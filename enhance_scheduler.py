@@ -0,0 +1,265 @@
+"""
+여러 창 동시 실행 스케줄러
+
+pyautogui는 마우스/키보드가 하나뿐이라 매크로 프로세스를 여러 개 띄우면 창 포커스를 서로 빼앗는다.
+이 모듈은 한 프로세스 안에서 창마다 매크로 세션(스레드)을 하나씩 돌리고,
+입력 장치는 SchedulerTransport 하나가 소유해서 한 번에 한 세션만 쓰게 한다.
+
+- 명령어 입력/미리 입력/채팅 읽기는 입력 장치를 잡고 실행 (요청한 순서대로 차례가 돌아옴)
+- 봇 응답을 기다리는 sleep 동안에는 입력 장치를 놓으므로 그동안 다른 창의 세션이 입력함
+- 출력은 줄 앞에 "[창 제목] " 을 붙여 한 로그 파일에 기록 (enhance_backfill이 태그별로 구분)
+- DB 기록은 attempts.session 에 창 제목이 붙어 창별로 구분됨
+
+사용 예:
+    python enhance_scheduler.py money 메크로용1 메크로용2
+    python enhance_scheduler.py upgrade 메크로용1 메크로용2 --sim --attempts 200
+"""
+import argparse
+import collections
+import sys
+import threading
+import time
+
+import enhance_common
+import enhance_db
+
+
+REPORT_SECONDS = 10.0  # 전체 속도 출력 간격 (초)
+
+
+class _FifoLock:
+    """요청한 순서대로 얻는 잠금 (threading.Lock은 순서를 보장하지 않음)"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+
+    def __enter__(self):
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while ticket != self._serving:
+                self._cond.wait()
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._serving += 1
+            self._cond.notify_all()
+
+
+class SchedulerTransport:
+    """입력 장치를 소유하고 여러 세션이 차례로 쓰게 하는 전송 계층
+
+    실제 입력은 감싼 전송 계층(GuiTransport, SimTransport)이 하고,
+    입력하는 동안에만 잠금을 잡는다. sleep()은 잠금 없이 기다린다.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self._input = _FifoLock()
+        self._count_lock = threading.Lock()
+        self.commands = collections.Counter()  # 창 제목별 보낸 명령어 수
+
+    def send_command(self, target_window_title, command, not_found_delay=0):
+        with self._input:
+            ok = self.transport.send_command(target_window_title, command)
+        if ok:
+            with self._count_lock:
+                self.commands[target_window_title] += 1
+        elif not_found_delay:
+            self.transport.sleep(not_found_delay)
+        return ok
+
+    def stage_command(self, target_window_title, command):
+        with self._input:
+            return self.transport.stage_command(target_window_title, command)
+
+    def read_latest(self, target_window_title):
+        with self._input:
+            return self.transport.read_latest(target_window_title)
+
+    def latest_position(self, target_window_title):
+        return self.transport.latest_position(target_window_title)
+
+    def sleep(self, seconds):
+        self.transport.sleep(seconds)
+
+    def now(self):
+        return self.transport.now()
+
+    def total_commands(self):
+        with self._count_lock:
+            return sum(self.commands.values())
+
+
+class _SessionOutput:
+    """세션 스레드의 출력 줄 앞에 "[창 제목] " 을 붙이는 stdout
+
+    스레드마다 줄 단위로 모아서 내보내므로 여러 세션의 출력이 한 줄 안에서 섞이지 않는다.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def set_name(self, name):
+        self._local.name = name
+        self._local.partial = ''
+
+    def write(self, message):
+        name = getattr(self._local, 'name', None)
+        if name is None:
+            with self._lock:
+                return self.stream.write(message)
+
+        lines = (self._local.partial + message).split('\n')
+        self._local.partial = lines.pop()
+        if lines:
+            text = ''.join(f"[{name}] {line}\n" if line else '\n' for line in lines)
+            with self._lock:
+                self.stream.write(text)
+        return len(message)
+
+    def flush(self):
+        name = getattr(self._local, 'name', None)
+        if name is not None and self._local.partial:
+            partial, self._local.partial = self._local.partial, ''
+            with self._lock:
+                self.stream.write(f"[{name}] {partial}")
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class Session:
+    """스케줄러가 실행하는 매크로 하나 (창 하나)
+
+    Args:
+        title: 대상 창 제목
+        mode: 'money' (enhance_macro_money) 또는 'upgrade' (enhance_macro_upgrade)
+        **options: 매크로 함수에 넘길 인자 (delay, max_attempts, target_level 등)
+    """
+
+    def __init__(self, title, mode='money', **options):
+        if mode not in ('money', 'upgrade'):
+            raise ValueError(f"알 수 없는 모드: {mode}")
+        self.title = title
+        self.mode = mode
+        self.options = options
+        self.result = None
+        self.error = None
+        self.thread = None
+
+    def _run(self, output):
+        output.set_name(self.title)
+        enhance_db.set_thread_session(self.title)
+        try:
+            if self.mode == 'money':
+                from enhance_macro_money import run_enhance_macro
+                self.result = run_enhance_macro(self.title, **self.options)
+            else:
+                from enhance_macro_upgrade import run_enhance_upgrade_macro
+                self.result = run_enhance_upgrade_macro(self.title, **self.options)
+        except SystemExit as e:
+            # 업그레이드 매크로는 목표 레벨 달성 시 sys.exit(0)으로 종료함
+            if e.code in (None, 0):
+                self.result = {'finished': True}
+            else:
+                self.error = e
+                print(f"❌ 세션 비정상 종료 (코드 {e.code})")
+        except Exception as e:
+            # 창을 찾을 수 없으면 (enhance_common.WindowNotFound) 이 세션만 멈춤
+            self.error = e
+            print(f"❌ 세션 오류: {e}")
+        finally:
+            output.flush()
+
+    def start(self, output):
+        self.thread = threading.Thread(target=self._run, args=(output,), name=f'session-{self.title}', daemon=True)
+        self.thread.start()
+
+
+def run_sessions(sessions, transport=None, report_seconds=REPORT_SECONDS):
+    """여러 세션을 한 프로세스에서 동시에 실행
+
+    Args:
+        sessions: Session 목록 (창 제목은 서로 달라야 함)
+        transport: 실제 입력을 할 전송 계층 (None이면 현재 전송 계층)
+        report_seconds: 전체 분당 명령어 수 출력 간격 (None이면 출력 안 함)
+
+    Returns:
+        dict: {창 제목: 매크로 결과 (오류 시 None)}
+    """
+    titles = [session.title for session in sessions]
+    if len(set(titles)) != len(titles):
+        raise ValueError("창 제목이 중복되었습니다")
+
+    base = transport or enhance_common.get_transport()
+    scheduler = SchedulerTransport(base)
+    enhance_common.set_transport(scheduler)
+
+    original_stdout = sys.stdout
+    output = _SessionOutput(original_stdout)
+    sys.stdout = output
+
+    print(f"🗂️ 세션 {len(sessions)}개 시작: {', '.join(titles)}")
+    try:
+        for session in sessions:
+            session.start(output)
+
+        last_time, last_count = time.monotonic(), 0
+        while True:
+            running = [session for session in sessions if session.thread.is_alive()]
+            if not running:
+                break
+            running[0].thread.join(1.0)
+            if report_seconds and time.monotonic() - last_time >= report_seconds:
+                now, count = time.monotonic(), scheduler.total_commands()
+                per_minute = (count - last_count) * 60.0 / (now - last_time)
+                print(f"📊 전체 속도: {per_minute:.0f}명령/분 (세션 {len(sessions)}개, 누적 {count:,}개)")
+                last_time, last_count = now, count
+    finally:
+        sys.stdout = original_stdout
+        enhance_common.set_transport(base)
+
+    return {session.title: session.result for session in sessions}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="여러 창에서 강화 매크로 동시 실행")
+    parser.add_argument('mode', choices=['money', 'upgrade'])
+    parser.add_argument('titles', nargs='+', help="대상 창 제목 (창마다 세션 하나)")
+    parser.add_argument('--delay', type=float, default=0.1, help="강화 후 결과 확인까지 최소 대기 시간 (초)")
+    parser.add_argument('--attempts', type=int, default=None, help="세션별 최대 강화 시도 횟수")
+    parser.add_argument('--sim', action='store_true', help="실제 창 대신 강화 봇 시뮬레이터 사용 (실시간)")
+    parser.add_argument('--latency', type=float, default=0.15, help="--sim: 봇 응답 시간 (초)")
+    args = parser.parse_args()
+
+    transport = None
+    if args.sim:
+        import enhance_sim
+        odds = enhance_sim.load_odds()
+        enhance_db.DB_PATH = enhance_sim.SIM_DB_PATH
+        enhance_db.init_db()
+        transport = enhance_sim.SimTransport(lambda: enhance_sim.SimulatedBot(odds=odds),
+                                             latency=args.latency, realtime=True)
+    else:
+        enhance_common.setup_logger("enhance_data" if args.mode == 'money' else "enhance_upgrade")
+
+    sessions = [Session(title, args.mode, delay=args.delay, max_attempts=args.attempts) for title in args.titles]
+    start = time.perf_counter()
+    results = run_sessions(sessions, transport)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n========== 세션 결과 ({elapsed:.1f}초) ==========")
+    total = 0
+    for title, result in results.items():
+        print(f"{title}: {result}")
+        if result and result.get('attempts'):
+            total += result['attempts']
+    if total:
+        print(f"전체 시도: {total:,}회 ({total * 60 / elapsed:,.0f}회/분)")
@@ -0,0 +1,365 @@
+"""
+강화 봇 시뮬레이터
+
+실제 채팅 창 없이 매크로를 실행하기 위한 가상 강화 봇과 전송 계층
+- SimulatedBot: 강화/판매 명령에 실제 봇과 같은 형식의 응답 생성
+- SimTransport: enhance_common 전송 계층 대체 (가상 시계 사용, sleep은 시간만 진행)
+- 강화 확률은 enhance_db의 enhance_stats 테이블에서 가져옴
+- 판매 가격은 enhance_db의 Data.xlsx 표 (일반 아이템 COMMON_SALE_PRICES, 특별 아이템 HIDDEN_SALE_PRICES)
+- --learned: 강화 비용/판매 가격을 매크로가 기록한 값으로 (강화 비용은 골드 차이, 판매 가격은 획득 골드, 없는 레벨은 기본값)
+
+사용 예:
+    python enhance_sim.py money --attempts 10000
+    python enhance_sim.py upgrade --attempts 5000 --seed 1
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import time
+
+import enhance_common
+import enhance_db
+
+
+# ============================================================
+# 시뮬레이션 기본값
+# ============================================================
+
+SIM_DB_PATH = os.path.join(os.path.dirname(__file__), 'enhance_sim.db')
+
+# 레벨별 강화 비용 (실제 로그의 골드 변화에서 확인한 값)
+DEFAULT_ENHANCE_COSTS = [
+    10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000,
+    20000, 30000, 40000, 50000, 70000, 100000, 150000, 200000, 300000, 500000,
+]
+
+NORMAL_ITEMS = ['낡은 검', '낡은 몽둥이', '낡은 망치', '낡은 도끼']
+SPECIAL_ITEMS = ['빛이 흐릿한 장난감 광선검', '녹아내린 끈적한 하드', '사방을 베고 찌르는 병기 우산']
+SPECIAL_ITEM_RATE = 0.05
+
+LEGEND_LEVEL = 10  # 이 레벨 이상 성공 시 전설 강화 알림이 추가로 올라옴
+
+USER_NAME = '이종현'
+
+
+# ============================================================
+# 봇 응답 형식
+# ============================================================
+
+SUCCESS_REPLY = (
+    "@사용자 〖✨강화 성공✨ +{old} → +{new}〗\n"
+    "『[+{new}] {name}』\n"
+    "💸 사용 골드: -{cost:,}G\n"
+    "💰 남은 골드: {gold:,}G"
+)
+LEGEND_REPLY = "@사용자님이 전설의 『[+{new}] {name}』 강화에 성공하셨습니다."
+MAINTAIN_REPLY = (
+    "@사용자 〖💦강화 유지💦〗\n"
+    "『[+{level}] {name}』의 레벨이 유지되었습니다.\n"
+    "💸 사용 골드: -{cost:,}G\n"
+    "💰 남은 골드: {gold:,}G"
+)
+DESTROY_REPLY = (
+    "@사용자 〖💥강화 파괴💥〗\n"
+    "『[+{level}] {name}』 산산조각 나버렸습니다.\n"
+    "💸 사용 골드: -{cost:,}G\n"
+    "💰 남은 골드: {gold:,}G\n"
+    "『[+0] {new_name}』 지급 완료"
+)
+SELL_REPLY = (
+    "@사용자 〖검 판매〗\n"
+    "『[+{level}] {name}』 판매 완료\n"
+    "💶 획득 골드: +{price:,}G\n"
+    "💰 현재 보유 골드: {gold:,}G\n"
+    "⚔️새로운 검 획득: [+0] {new_name}"
+)
+ZERO_SELL_REPLY = '@사용자 💬 대장장이: "0강검은 가치가 없어서 판매할 수 없다네."'
+NO_GOLD_REPLY = '@사용자 💬 대장장이: "골드가 부족해. 강화 비용은 {cost:,}G 라네."'
+ITEM_REPLY = "@사용자 보유 중인 검: 『[+{level}] {name}』"  # 시작 시 채팅창에 보이는 마지막 메시지
+
+
+def load_odds():
+    """enhance_stats에서 레벨별 (성공, 유지, 파괴) 확률 로드
+
+    Returns:
+        list: 인덱스가 레벨인 (p_success, p_stay, p_break) 목록
+    """
+    return [enhance_db.get_odds(level) for level in range(enhance_db.get_max_level() + 1)]
+
+
+def _merge_learned(defaults, learned):
+    size = max(len(defaults), max(learned, default=-1) + 1)
+    table = [defaults[min(level, len(defaults) - 1)] for level in range(size)]
+    for level, value in learned.items():
+        table[level] = value
+    return table
+
+
+def load_enhance_costs():
+    """레벨별 강화 비용 (매크로가 골드 차이로 학습한 값, 없는 레벨은 DEFAULT_ENHANCE_COSTS)"""
+    return _merge_learned(DEFAULT_ENHANCE_COSTS, enhance_db.get_enhance_costs())
+
+
+def load_sell_prices(item_class=enhance_db.ITEM_CLASS_SPECIAL):
+    """레벨별 판매 가격 (판매 응답의 획득 골드로 기록한 평균, 없는 레벨은 enhance_db.SALE_PRICES)
+
+    기본값은 특별 아이템 가격 (money 매크로가 목표 레벨에서 판매하는 아이템)
+    """
+    return _merge_learned(enhance_db.SALE_PRICES[item_class], enhance_db.get_sell_prices(item_class=item_class))
+
+
+class SimulatedBot:
+    """강화 봇 시뮬레이터 (채팅 창 하나에 해당)"""
+
+    def __init__(self, odds=None, gold=1000000, seed=None,
+                 enhance_costs=DEFAULT_ENHANCE_COSTS, sale_prices=enhance_db.SALE_PRICES,
+                 special_rate=SPECIAL_ITEM_RATE):
+        self.odds = odds if odds is not None else load_odds()
+        self.gold = gold
+        self.rng = random.Random(seed)
+        self.enhance_costs = enhance_costs
+        self.sale_prices = sale_prices  # 아이템 분류 → 레벨별 판매 가격
+        self.special_rate = special_rate
+        self.level = 0
+        self.item_name = self._new_item()
+
+    def _new_item(self):
+        if self.rng.random() < self.special_rate:
+            return self.rng.choice(SPECIAL_ITEMS)
+        return self.rng.choice(NORMAL_ITEMS)
+
+    @staticmethod
+    def _lookup(table, level):
+        return table[min(level, len(table) - 1)]
+
+    def handle(self, command):
+        """명령어 처리
+
+        Returns:
+            list: 봇이 올리는 메시지 목록 (보통 1개, 전설 강화 성공 시 2개)
+        """
+        command = command.strip()
+        if command == '/강화':
+            return self._enhance()
+        if command == '/판매':
+            return self._sell()
+        return []
+
+    def _enhance(self):
+        cost = self._lookup(self.enhance_costs, self.level)
+        if self.gold < cost:
+            return [NO_GOLD_REPLY.format(cost=cost)]
+
+        self.gold -= cost
+        p_success, p_stay, _ = self._lookup(self.odds, self.level)
+        roll = self.rng.random()
+
+        if roll < p_success:
+            old = self.level
+            self.level += 1
+            messages = [SUCCESS_REPLY.format(old=old, new=self.level, name=self.item_name, cost=cost, gold=self.gold)]
+            if self.level >= LEGEND_LEVEL:
+                messages.append(LEGEND_REPLY.format(new=self.level, name=self.item_name))
+            return messages
+
+        if roll < p_success + p_stay:
+            return [MAINTAIN_REPLY.format(level=self.level, name=self.item_name, cost=cost, gold=self.gold)]
+
+        old_level, old_name = self.level, self.item_name
+        self.level = 0
+        self.item_name = self._new_item()
+        return [DESTROY_REPLY.format(level=old_level, name=old_name, cost=cost, gold=self.gold, new_name=self.item_name)]
+
+    def _sell(self):
+        if self.level == 0:
+            return [ZERO_SELL_REPLY]
+
+        item_class = enhance_db.ITEM_CLASS_SPECIAL if self.item_name in SPECIAL_ITEMS else enhance_db.ITEM_CLASS_NORMAL
+        price = self._lookup(self.sale_prices[item_class], self.level)
+        self.gold += price
+        old_level, old_name = self.level, self.item_name
+        self.level = 0
+        self.item_name = self._new_item()
+        return [SELL_REPLY.format(level=old_level, name=old_name, price=price, gold=self.gold, new_name=self.item_name)]
+
+
+class SimTransport:
+    """SimulatedBot을 사용하는 전송 계층 (가상 시계)
+
+    sleep()은 실제로 기다리지 않고 가상 시간만 진행한다.
+    봇 응답은 latency초 뒤에 보이므로 대기 로직도 실제와 같은 순서로 동작한다.
+    realtime=True면 실제 시계를 사용한다 (여러 스레드가 함께 쓰는 enhance_scheduler용).
+    drop_rate 확률로 명령어 입력이 사라진다 (키 입력 유실 재현).
+    """
+
+    def __init__(self, bot_factory=None, latency=0.15, realtime=False, drop_rate=0.0, seed=None):
+        self.bot_factory = bot_factory or SimulatedBot
+        self.latency = latency
+        self.realtime = realtime
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self.clock = 0.0
+        self._started = time.monotonic()
+        self.bots = {}
+        self._latest = {}    # 창 제목별 가장 최근 메시지
+        self._pending = {}   # 창 제목별 [(표시 시각, 메시지), ...]
+        self._positions = {}  # 창 제목별 지금까지 올라온 메시지 수 (가장 최근 메시지의 위치)
+        self.sent = 0
+        self.dropped = 0
+        self.staged = 0
+
+    def get_bot(self, target_window_title):
+        bot = self.bots.get(target_window_title)
+        if bot is None:
+            bot = self.bot_factory()
+            self.bots[target_window_title] = bot
+            self._latest[target_window_title] = ITEM_REPLY.format(level=bot.level, name=bot.item_name)
+            self._pending[target_window_title] = []
+            self._positions[target_window_title] = 0
+        return bot
+
+    def _deliver(self, target_window_title):
+        pending = self._pending[target_window_title]
+        now = self.now()
+        while pending and pending[0][0] <= now:
+            self._latest[target_window_title] = pending.pop(0)[1]
+            self._positions[target_window_title] += 1
+
+    def send_command(self, target_window_title, command, not_found_delay=0):
+        bot = self.get_bot(target_window_title)
+        self._deliver(target_window_title)
+        self.sent += 1
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            self.dropped += 1
+            return True  # 입력한 줄 알지만 채팅에는 아무것도 올라가지 않음
+
+        # 사용자 입력은 마지막 메시지 뒤에 이어 붙는다 (봇 응답 전까지 명령어로 끝남)
+        latest = self._latest[target_window_title] or ''
+        self._latest[target_window_title] = f"{latest}\n{USER_NAME}\n{command} "
+
+        due = self.now() + self.latency
+        for message in bot.handle(command):
+            self._pending[target_window_title].append((due, message))
+        return True
+
+    def stage_command(self, target_window_title, command):
+        # 입력창은 채팅 기록에 나타나지 않으므로 미리 입력은 할 일이 없음
+        self.staged += 1
+        return True
+
+    def read_latest(self, target_window_title):
+        self.get_bot(target_window_title)
+        self._deliver(target_window_title)
+        return self._latest[target_window_title]
+
+    def latest_position(self, target_window_title):
+        self.get_bot(target_window_title)
+        return self._positions[target_window_title]
+
+    def sleep(self, seconds):
+        if self.realtime:
+            time.sleep(seconds)
+        else:
+            self.clock += seconds
+
+    def now(self):
+        if self.realtime:
+            return time.monotonic() - self._started
+        return self.clock
+
+
+# ============================================================
+# 실행
+# ============================================================
+
+def run_simulation(mode, attempts, seed=None, gold=1000000, latency=0.15, db_path=SIM_DB_PATH, quiet=True, use_solver=False,
+                   drop_rate=0.0, learned=False):
+    """매크로를 시뮬레이터에 연결해 실행
+
+    통계는 db_path (기본: enhance_sim.db)에 기록되어 실제 DB와 섞이지 않는다.
+    learned면 강화 비용/판매 가격도 실제 DB에서 학습한 값을 쓴다.
+
+    Returns:
+        dict: 매크로 실행 결과와 실행 시간
+    """
+    odds = load_odds()
+    enhance_costs = load_enhance_costs() if learned else DEFAULT_ENHANCE_COSTS
+    sale_prices = ({item_class: load_sell_prices(item_class) for item_class in enhance_db.SALE_PRICES}
+                   if learned else enhance_db.SALE_PRICES)
+    old_path = enhance_db.DB_PATH
+    old_transport = enhance_common._transport
+    enhance_db.DB_PATH = db_path
+    try:
+        enhance_db.init_db()
+
+        rng = random.Random(seed)
+        transport = SimTransport(lambda: SimulatedBot(odds=odds, gold=gold, seed=rng.random(),
+                                                      enhance_costs=enhance_costs, sale_prices=sale_prices),
+                                 latency=latency,
+                                 drop_rate=drop_rate, seed=rng.random() if drop_rate else None)
+        enhance_common.set_transport(transport)
+
+        output = io.StringIO() if quiet else None
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            try:
+                if mode == 'money':
+                    from enhance_macro_money import run_enhance_macro
+                    result = run_enhance_macro('시뮬레이션', delay=0.0, max_attempts=attempts, use_solver=use_solver,
+                                               resume=False)
+                else:
+                    from enhance_macro_upgrade import run_enhance_upgrade_macro
+                    result = run_enhance_upgrade_macro('시뮬레이션', delay=0.0, max_attempts=attempts, resume=False,
+                                                       use_solver=use_solver)
+            except SystemExit:
+                result = {'attempts': None, 'finished': True}
+            enhance_db.flush_buffer()
+        elapsed = time.perf_counter() - start
+    finally:
+        # 시뮬레이션 DB와 가상 전송을 원래대로 (호출한 쪽이 되돌릴 필요 없도록)
+        enhance_db.flush_buffer()  # 중간에 실패해도 남은 기록이 원래 DB로 가지 않도록
+        enhance_db.close_connection()
+        enhance_db.DB_PATH = old_path
+        enhance_common.set_transport(old_transport)
+
+    result = dict(result)
+    result['elapsed'] = elapsed
+    result['virtual_time'] = transport.now()
+    result['commands'] = transport.sent
+    if drop_rate:
+        result['dropped'] = transport.dropped
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="강화 봇 시뮬레이터로 매크로 실행")
+    parser.add_argument('mode', choices=['money', 'upgrade'])
+    parser.add_argument('--attempts', type=int, default=1000, help="강화 시도 횟수")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--gold', type=int, default=1000000, help="시작 골드")
+    parser.add_argument('--latency', type=float, default=0.15, help="가상 봇 응답 시간 (초)")
+    parser.add_argument('--db', default=SIM_DB_PATH, help="통계 기록용 DB 경로")
+    parser.add_argument('--solver', action='store_true', help="enhance_solver 판매 정책 사용")
+    parser.add_argument('--verbose', action='store_true', help="매크로 출력 표시")
+    parser.add_argument('--timing', action='store_true', help="구간별 소요 시간 측정 후 출력")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="명령어 입력이 사라질 확률 (0~1)")
+    parser.add_argument('--learned', action='store_true', help="강화 비용/판매 가격을 학습한 값으로")
+    args = parser.parse_args()
+
+    if args.timing:
+        import enhance_timing
+        enhance_timing.enable()
+
+    result = run_simulation(args.mode, args.attempts, seed=args.seed, gold=args.gold,
+                            latency=args.latency, db_path=args.db, quiet=not args.verbose,
+                            use_solver=args.solver, drop_rate=args.drop_rate, learned=args.learned)
+
+    print(f"\n========== 시뮬레이션 결과 ({args.mode}) ==========")
+    for key, value in result.items():
+        print(f"{key:>12}: {value}")
+    if result.get('attempts'):
+        print(f"{'attempts/s':>12}: {result['attempts'] / result['elapsed']:,.0f}")
+    if args.timing:
+        enhance_timing.print_summary()
@@ -0,0 +1,247 @@
+"""
+강화 판매 결정 계산기 (마르코프 결정 과정)
+
++0 ~ +19강 강화는 레벨마다 성공(+1) / 유지 / 파괴(+0, 새 아이템) 로 이동하는 작은 MDP다.
+레벨마다 "지금 판매" 와 "계속 강화" 중 시도 1회당 골드 수익이 최대가 되는 쪽을
+동적 계획법(가치 반복 + 수익률 이분 탐색)으로 정확히 계산해서 표로 저장한다.
+
+- 확률: enhance_stats (enhance_db)
+- 비용/판매가: 매크로가 기록한 값 (비용은 골드 차이, 판매가는 특별 아이템의 획득 골드,
+  없는 레벨은 enhance_sim의 기본 비용과 enhance_db의 HIDDEN_SALE_PRICES)
+- 결과: enhance_solver.json (확률이 크게 바뀌었을 때만 다시 계산)
+- 실행 중 조회: should_sell(level), target_level() — 표 조회만 하므로 O(1)
+  (POLICY_CHECK_INTERVAL초마다 확률/비용/판매가가 바뀌었는지 확인해서 필요하면 다시 계산)
+
+사용 예:
+    python enhance_solver.py          # 필요하면 다시 계산 후 표 출력
+    python enhance_solver.py --force  # 무조건 다시 계산
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from enhance_db import HIDDEN_SALE_PRICES
+from enhance_sim import load_odds, load_enhance_costs, load_sell_prices, DEFAULT_ENHANCE_COSTS
+
+
+SOLVER_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'enhance_solver.json')
+
+ODDS_TOLERANCE = 0.005   # 레벨별 확률이 이만큼(0.5%p) 넘게 바뀌면 다시 계산
+VALUE_ITERATIONS = 2000  # +0 가치 고정점 반복 횟수 상한
+RATE_ITERATIONS = 100    # 수익률 이분 탐색 횟수
+EPSILON = 1e-9
+POLICY_CHECK_INTERVAL = 300.0  # 실행 중 이 간격(초)마다 정책이 오래됐는지 확인 (enhance_stats는 계속 바뀜)
+
+_policy = None         # 레벨별 판매 여부 (인덱스가 레벨)
+_sell_level = None     # +1강부터 올라갈 때 처음 판매하는 레벨
+_loaded = None         # (캐시 경로, load_policy 결과) - 다시 확인할 때 파일을 또 읽지 않도록
+_checked_at = None     # 마지막으로 확인한 시각 (time.monotonic)
+_policy_lock = threading.Lock()
+
+
+def _pad(table, size):
+    table = list(table)
+    return table[:size] + [table[-1]] * max(0, size - len(table))
+
+
+def _solve_values(rate, odds, costs, prices):
+    """시도당 비용 rate를 뺀 상태 가치 계산
+
+    V(L) = max(판매가[L], (-비용[L] - rate + p성공·V(L+1) + p파괴·V(0)) / (1 - p유지))
+    +0은 판매 불가, 최고 레벨은 판매만 가능
+
+    Returns:
+        tuple: (가치 목록, 계속 강화 가치 목록)
+    """
+    top = len(odds) - 1
+    v0 = 0.0
+    values = [0.0] * len(odds)
+    cont = [None] * len(odds)
+    for _ in range(VALUE_ITERATIONS):
+        values[top] = prices[top]
+        cont[top] = None
+        for level in range(top - 1, -1, -1):
+            p_success, p_stay, p_break = odds[level]
+            keep = 1.0 - p_stay
+            if keep <= EPSILON:
+                cont[level] = float('-inf')
+            else:
+                cont[level] = (-costs[level] - rate + p_success * values[level + 1] + p_break * v0) / keep
+            values[level] = cont[level] if level == 0 else max(prices[level], cont[level])
+        if abs(values[0] - v0) < 1e-7:
+            break
+        v0 = values[0]
+    return values, cont
+
+
+def _expected_until_sale(actions, odds, per_attempt):
+    """정책을 따를 때 각 레벨에서 판매까지 기대 누적값 (횟수 또는 비용)"""
+    top = len(odds) - 1
+    result = [0.0] * len(odds)
+    r0 = 0.0
+    for _ in range(VALUE_ITERATIONS):
+        for level in range(top, -1, -1):
+            if actions[level] == 'sell':
+                result[level] = 0.0
+                continue
+            p_success, p_stay, p_break = odds[level]
+            nxt = result[level + 1] if level < top else 0.0
+            result[level] = (per_attempt[level] + p_success * nxt + p_break * r0) / max(1.0 - p_stay, EPSILON)
+        if abs(result[0] - r0) < 1e-9:
+            break
+        r0 = result[0]
+    return result
+
+
+def solve(odds=None, enhance_costs=DEFAULT_ENHANCE_COSTS, sell_prices=HIDDEN_SALE_PRICES):
+    """최적 판매 정책 계산
+
+    시도당 수익률 rate에 대해 +0 가치가 0이 되는 지점을 이분 탐색으로 찾는다
+    (그 rate가 장기 평균 시도당 골드 수익이고, 그때의 max 선택이 최적 정책).
+
+    Returns:
+        dict: rate(시도당 골드), levels(레벨별 결정 표), odds
+    """
+    if odds is None:
+        odds = load_odds()
+    size = len(odds)
+    costs = _pad(enhance_costs, size)
+    prices = _pad(sell_prices, size)
+
+    low, high = -max(costs), max(prices)
+    for _ in range(RATE_ITERATIONS):
+        rate = (low + high) / 2
+        values, _ = _solve_values(rate, odds, costs, prices)
+        if values[0] > 0:
+            low = rate
+        else:
+            high = rate
+    rate = low
+    values, cont = _solve_values(rate, odds, costs, prices)
+
+    actions = []
+    for level in range(size):
+        if level == 0:
+            actions.append('continue')
+        elif cont[level] is None or prices[level] >= cont[level]:
+            actions.append('sell')
+        else:
+            actions.append('continue')
+
+    attempts = _expected_until_sale(actions, odds, [1.0] * size)
+    gold_cost = _expected_until_sale(actions, odds, costs)
+
+    levels = []
+    for level in range(size):
+        levels.append({
+            'level': level,
+            'action': actions[level],
+            'value_stop': prices[level] if level > 0 else None,
+            'value_continue': cont[level],
+            'expected_attempts': attempts[level],
+            'expected_cost': gold_cost[level],
+        })
+
+    return {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'rate': rate,
+        'odds': [list(o) for o in odds],
+        'enhance_costs': costs,
+        'sell_prices': prices,
+        'levels': levels,
+    }
+
+
+def _is_stale(cached, odds, enhance_costs, sell_prices):
+    """캐시가 현재 확률/비용과 크게 다른지 확인"""
+    cached_odds = cached.get('odds') or []
+    if len(cached_odds) != len(odds):
+        return True
+    size = len(odds)
+    if cached.get('enhance_costs') != _pad(enhance_costs, size) or cached.get('sell_prices') != _pad(sell_prices, size):
+        return True
+    for old, new in zip(cached_odds, odds):
+        if any(abs(a - b) > ODDS_TOLERANCE for a, b in zip(old, new)):
+            return True
+    return False
+
+
+def load_policy(path=SOLVER_CACHE_PATH, force=False, enhance_costs=None, sell_prices=None):
+    """캐시된 정책 로드 (확률/비용/판매가가 바뀌었거나 force면 다시 계산 후 저장)
+
+    enhance_costs, sell_prices가 None이면 학습한 값 (load_enhance_costs, load_sell_prices)
+    """
+    global _policy, _sell_level, _loaded, _checked_at
+    odds = load_odds()
+    if enhance_costs is None:
+        enhance_costs = load_enhance_costs()
+    if sell_prices is None:
+        sell_prices = load_sell_prices()
+    cached = None
+    if not force and _loaded is not None and _loaded[0] == path:
+        cached = _loaded[1]
+    elif not force and os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 판매 정책 캐시를 읽을 수 없음: {e}")
+
+    if cached is None or _is_stale(cached, odds, enhance_costs, sell_prices):
+        cached = solve(odds, enhance_costs, sell_prices)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(cached, f, ensure_ascii=False, indent=2)
+        print(f"🧮 판매 정책 재계산 완료 (시도당 {cached['rate']:,.1f}G)")
+
+    policy = [entry['action'] == 'sell' for entry in cached['levels']]
+    _sell_level = next((level for level in range(1, len(policy)) if policy[level]), len(policy))
+    _policy = policy
+    _loaded = (path, cached)
+    _checked_at = time.monotonic()
+    return cached
+
+
+def _current_policy():
+    """지금 쓸 정책 (처음이거나 POLICY_CHECK_INTERVAL이 지났으면 load_policy로 확인)"""
+    if _checked_at is None or time.monotonic() - _checked_at >= POLICY_CHECK_INTERVAL:
+        with _policy_lock:
+            if _checked_at is None or time.monotonic() - _checked_at >= POLICY_CHECK_INTERVAL:
+                load_policy()
+    return _policy
+
+
+def should_sell(level):
+    """해당 레벨에서 바로 판매하는 것이 최적인지 (표 조회)"""
+    policy = _current_policy()
+    if level >= len(policy):
+        return True
+    return policy[level]
+
+
+def target_level():
+    """새 아이템을 강화할 때 처음 판매하게 되는 레벨 (목표 레벨 대신 사용)"""
+    _current_policy()
+    return _sell_level
+
+
+def print_policy(result):
+    print(f"\n========== 판매 정책 (시도당 {result['rate']:,.1f}G) ==========")
+    print(f"{'Level':>5} {'Action':>9} {'Stop':>12} {'Continue':>14} {'Attempts':>10} {'Cost':>14}")
+    print("-" * 70)
+    for entry in result['levels']:
+        stop = f"{entry['value_stop']:,}" if entry['value_stop'] is not None else '-'
+        cont = f"{entry['value_continue']:,.0f}" if entry['value_continue'] is not None else '-'
+        print(f"{entry['level']:>5} {entry['action']:>9} {stop:>12} {cont:>14} "
+              f"{entry['expected_attempts']:>10.1f} {entry['expected_cost']:>14,.0f}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="레벨별 판매/계속 강화 최적 정책 계산")
+    parser.add_argument('--force', action='store_true', help="캐시를 무시하고 다시 계산")
+    args = parser.parse_args()
+
+    print_policy(load_policy(force=args.force))
@@ -0,0 +1,289 @@
+"""
+구간별 소요 시간 측정
+
+강화 1회에 걸리는 시간이 창 찾기, 활성화, 클릭, 복사/붙여넣기, 파싱, DB 기록, 봇 응답 중
+어디에 쓰이는지 보기 위한 가벼운 측정 도구
+
+- span(name): with 문으로 감싼 구간의 시간을 구간 이름별 히스토그램에 기록
+- 히스토그램은 고정된 로그 간격 버킷 (0.01ms ~ 2분) 이라 메모리와 기록 비용이 일정함
+- export_csv / export_sqlite: p50/p95/p99 등을 CSV 또는 SQLite로 내보냄
+- start_periodic_export: 일정 간격으로 자동 내보내기
+- 꺼져 있으면 (기본값) span()은 미리 만든 빈 컨텍스트를 돌려주므로 측정 비용이 없음
+  켜기: 환경 변수 ENHANCE_TIMING=1 또는 enable()
+
+사용 예:
+    ENHANCE_TIMING=1 python enhance_macro_money.py
+    python enhance_timing.py                 # enhance_data.db에 기록된 마지막 결과 출력
+"""
+import argparse
+import atexit
+import bisect
+import contextlib
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+ENABLED = os.environ.get('ENHANCE_TIMING', '') not in ('', '0')
+
+# 버킷 경계 (ms): 0.01ms부터 1.25배씩, 2분까지
+BUCKET_BOUNDS = []
+_bound = 0.01
+while _bound < 120000:
+    BUCKET_BOUNDS.append(round(_bound, 4))
+    _bound *= 1.25
+del _bound
+
+EXPORT_DB_PATH = os.path.join(os.path.dirname(__file__), 'enhance_data.db')
+EXPORT_INTERVAL = 60.0  # 자동 내보내기 간격 (초)
+
+_histograms = {}
+_lock = threading.Lock()
+_NULL_SPAN = contextlib.nullcontext()
+_exporter = None
+_exporter_stop = threading.Event()
+
+
+class Histogram:
+    """고정 버킷 히스토그램 (ms 단위)"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)  # 마지막 칸은 최대 경계 초과
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p):
+        """p (0~1) 분위수 근사값 (해당 버킷 안에서 선형 보간, 최댓값을 넘지 않음)"""
+        if not self.count:
+            return 0.0
+        rank = p * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKET_BOUNDS[i - 1] if i > 0 else 0.0
+                upper = BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self.max,
+        }
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, (time.perf_counter() - self.start) * 1000)
+
+
+def enable(enabled=True):
+    """측정 켜기/끄기"""
+    global ENABLED
+    ENABLED = enabled
+
+
+def span(name):
+    """구간 측정용 컨텍스트 (꺼져 있으면 아무것도 하지 않음)
+
+    예:
+        with enhance_timing.span('read.paste'):
+            text = pyperclip.paste()
+    """
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def record(name, ms):
+    """측정값 하나 기록 (ms)"""
+    if not ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(ms)
+
+
+def reset():
+    """지금까지의 측정값 삭제"""
+    with _lock:
+        _histograms.clear()
+
+
+def get_summary():
+    """구간별 요약
+
+    Returns:
+        dict: {구간 이름: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}
+    """
+    with _lock:
+        return {name: h.summary() for name, h in sorted(_histograms.items())}
+
+
+def snapshot():
+    """구간별 히스토그램 복사본
+
+    Returns:
+        dict: {구간 이름: (버킷별 횟수 목록, 횟수, 합계 ms)} (버킷 경계는 BUCKET_BOUNDS)
+    """
+    with _lock:
+        return {name: (list(h.counts), h.count, h.total) for name, h in sorted(_histograms.items())}
+
+
+def print_summary(summary=None):
+    """구간별 요약 출력"""
+    if summary is None:
+        summary = get_summary()
+    print("\n========== 구간별 소요 시간 (ms) ==========")
+    print(f"{'구간':<26} {'횟수':>8} {'평균':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'최대':>9}")
+    print("-" * 86)
+    for name, s in summary.items():
+        print(f"{name:<26} {s['count']:>8} {s['mean_ms']:>9.2f} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f} {s['max_ms']:>9.2f}")
+    print("=" * 86)
+
+
+def export_csv(path):
+    """구간별 요약을 CSV로 저장 (파일이 있으면 뒤에 추가)"""
+    summary = get_summary()
+    new_file = not os.path.exists(path)
+    ts = time.time()
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(['ts', 'name', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'])
+        for name, s in summary.items():
+            writer.writerow([f"{ts:.0f}", name, s['count'], f"{s['mean_ms']:.3f}", f"{s['p50_ms']:.3f}",
+                             f"{s['p95_ms']:.3f}", f"{s['p99_ms']:.3f}", f"{s['max_ms']:.3f}"])
+
+
+def export_sqlite(path=None):
+    """구간별 요약과 버킷 값을 SQLite timing_histograms 테이블에 추가 (기본: enhance_data.db)"""
+    with _lock:
+        rows = [(name, h.summary(), json.dumps(h.counts)) for name, h in sorted(_histograms.items())]
+    ts = time.time()
+    conn = sqlite3.connect(path or EXPORT_DB_PATH)
+    try:
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS timing_histograms (
+                    ts REAL NOT NULL,
+                    pid INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    count INTEGER,
+                    mean_ms REAL,
+                    p50_ms REAL,
+                    p95_ms REAL,
+                    p99_ms REAL,
+                    max_ms REAL,
+                    buckets TEXT
+                )
+            ''')
+            conn.executemany('''
+                INSERT INTO timing_histograms (ts, pid, name, count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms, buckets)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(ts, os.getpid(), name, s['count'], s['mean_ms'], s['p50_ms'], s['p95_ms'], s['p99_ms'], s['max_ms'], buckets)
+                  for name, s, buckets in rows])
+    finally:
+        conn.close()
+
+
+def _export(db_path, csv_path):
+    try:
+        if db_path is not False:
+            export_sqlite(db_path)
+        if csv_path:
+            export_csv(csv_path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️ 구간 측정 내보내기 실패: {e}")
+
+
+def _exporter_loop(interval, db_path, csv_path):
+    while not _exporter_stop.wait(interval):
+        _export(db_path, csv_path)
+
+
+def start_periodic_export(interval=EXPORT_INTERVAL, db_path=None, csv_path=None):
+    """interval초마다 자동 내보내기 (db_path=False면 SQLite 생략), 종료 시 마지막으로 한 번 더"""
+    global _exporter
+    if _exporter is not None and _exporter.is_alive():
+        return
+    _exporter_stop.clear()
+    _exporter = threading.Thread(target=_exporter_loop, args=(interval, db_path, csv_path),
+                                 name='enhance_timing-export', daemon=True)
+    _exporter.start()
+    atexit.register(stop_periodic_export, db_path, csv_path)
+
+
+def stop_periodic_export(db_path=None, csv_path=None):
+    """자동 내보내기를 멈추고 마지막 값을 내보냄"""
+    global _exporter
+    if _exporter is None:
+        return
+    _exporter_stop.set()
+    _exporter.join(2.0)
+    _exporter = None
+    _export(db_path, csv_path)
+
+
+def load_latest(path=None):
+    """SQLite에 마지막으로 내보낸 요약 읽기
+
+    Returns:
+        dict: get_summary()와 같은 형식 (기록이 없으면 빈 dict)
+    """
+    conn = sqlite3.connect(path or EXPORT_DB_PATH)
+    try:
+        row = conn.execute('SELECT MAX(ts) FROM timing_histograms').fetchone()
+        if row is None or row[0] is None:
+            return {}
+        rows = conn.execute('''
+            SELECT name, count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms
+            FROM timing_histograms WHERE ts = ? ORDER BY name
+        ''', (row[0],)).fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+    return {
+        name: {'count': count, 'mean_ms': mean, 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': max_ms}
+        for name, count, mean, p50, p95, p99, max_ms in rows
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="마지막으로 내보낸 구간별 소요 시간 출력")
+    parser.add_argument('--db', default=EXPORT_DB_PATH, help="SQLite 경로 (기본: enhance_data.db)")
+    args = parser.parse_args()
+
+    summary = load_latest(args.db)
+    if summary:
+        print_summary(summary)
+    else:
+        print("기록된 측정값이 없습니다. ENHANCE_TIMING=1 로 매크로를 실행하세요.")
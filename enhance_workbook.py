@@ -0,0 +1,519 @@
+"""
+강화 통계 엑셀 내보내기
+
+print_all_stats() 결과를 손으로 옮겨 적던 두 통합 문서를 enhance_stats에서 바로 만든다.
+
+- Data.xlsx: 레벨별 시도/성공/유지/파괴 횟수와 확률, 강화 비용, 판매가
+- 강화 비용/판매가는 매크로가 학습한 값 (enhance_sim.load_enhance_costs / load_sell_prices,
+  없는 레벨은 기본 표, 표보다 높은 레벨은 원래 Data.xlsx처럼 마지막 값)
+- enhancement_model_with_sim.xlsx: Inputs / StageCalc / Cumulative 시트
+  (목표 레벨까지의 기대 강화 횟수/비용/시간은 수식, 몬테카를로 P90/P95/P99는 값)
+- 행을 만드는 대로 zip 안의 시트 XML에 바로 쓰므로 표가 커져도 메모리 사용량이 일정함
+  (openpyxl 없이 표준 라이브러리만 사용, 수식의 계산 결과도 같이 저장)
+- 몬테카를로 결과는 확률이 크게 바뀌었을 때만 다시 계산
+- 자동 갱신: 환경 변수 ENHANCE_WORKBOOK=1 이면 매크로가 DB에 기록한 뒤
+  (최대 AUTO_EXPORT_INTERVAL초에 한 번) 다시 만듦
+
+사용 예:
+    python enhance_workbook.py
+    python enhance_workbook.py --runs 20000 --seconds 1.2
+"""
+import argparse
+import atexit
+import os
+import threading
+import time
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import enhance_db
+from enhance_db import ITEM_CLASS_NORMAL, ITEM_CLASS_SPECIAL
+from enhance_sim import load_enhance_costs, load_sell_prices
+
+
+ENABLED = os.environ.get('ENHANCE_WORKBOOK', '') not in ('', '0')
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), 'Data.xlsx')
+MODEL_PATH = os.path.join(os.path.dirname(__file__), 'enhancement_model_with_sim.xlsx')
+
+SECONDS_PER_ATTEMPT = 5      # 기대 시간 계산용 시도 1회 시간 (초)
+SIM_RUNS = 5000              # 목표 레벨별 몬테카를로 사이클 수
+SIM_SEED = 42
+SIM_QUANTILES = (0.90, 0.95, 0.99)
+SIM_ODDS_TOLERANCE = 0.005   # 레벨별 확률이 이만큼(0.5%p) 넘게 바뀌면 몬테카를로 다시 계산
+AUTO_EXPORT_INTERVAL = 60.0  # 자동 갱신 최소 간격 (초)
+
+# 셀 서식 (styles.xml의 cellXfs 순서)
+STYLE_DEFAULT = 0
+STYLE_HEADER = 1
+STYLE_PERCENT = 2
+STYLE_NUMBER = 3
+STYLE_DECIMAL = 4
+
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+_STYLES_XML = f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="{_MAIN_NS}">
+<fonts count="2"><font><sz val="11"/><name val="맑은 고딕"/><family val="3"/></font><font><b/><sz val="11"/><name val="맑은 고딕"/><family val="3"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="5">
+<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>
+<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>
+<xf numFmtId="10" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="3" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>
+</cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>'''
+
+_sim_cache = None  # {'key': (runs, seed, costs), 'odds': [...], 'rows': [...]}
+_dirty = threading.Event()
+_stop = threading.Event()
+_exporter = None
+_export_lock = threading.Lock()
+
+
+class Formula:
+    """수식 셀 (value: 같이 저장할 계산 결과, 엑셀은 열 때 다시 계산함)"""
+
+    __slots__ = ('text', 'value')
+
+    def __init__(self, text, value=None):
+        self.text = text
+        self.value = value
+
+
+def _column_letter(index):
+    """0부터 시작하는 열 번호 → 'A', 'B', ..., 'AA'"""
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _number(value):
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if value != value or value in (float('inf'), float('-inf')):
+        return None
+    return repr(value)
+
+
+def _cell(ref, value, style):
+    s = f' s="{style}"' if style else ''
+    if isinstance(value, Formula):
+        f = escape(value.text)
+        if value.value is None:
+            return f'<c r="{ref}"{s}><f>{f}</f></c>'
+        if isinstance(value.value, str):
+            return f'<c r="{ref}"{s} t="str"><f>{f}</f><v>{escape(value.value)}</v></c>'
+        v = _number(value.value)
+        return f'<c r="{ref}"{s}><f>{f}</f><v>{v}</v></c>' if v is not None else f'<c r="{ref}"{s}><f>{f}</f></c>'
+    if isinstance(value, str):
+        return f'<c r="{ref}"{s} t="inlineStr"><is><t xml:space="preserve">{escape(value)}</t></is></c>'
+    v = _number(value)
+    return f'<c r="{ref}"{s}><v>{v}</v></c>' if v is not None else ''
+
+
+class StreamingWorkbook:
+    """행 단위로 바로 쓰는 최소한의 xlsx 작성기
+
+    시트는 하나씩 차례로 쓰고, 쓴 행은 메모리에 남기지 않는다.
+    임시 파일에 쓴 뒤 close()에서 바꿔치기하므로 중간에 실패해도 기존 파일은 그대로다.
+
+    예:
+        with StreamingWorkbook('out.xlsx') as book:
+            book.add_sheet('Sheet1', widths=[8, 12])
+            book.write_row(['Level', 'Try'], STYLE_HEADER)
+            book.write_row([0, Formula('1+1', 2)])
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp_path = f"{path}.tmp"
+        self._zip = zipfile.ZipFile(self._tmp_path, 'w', zipfile.ZIP_DEFLATED)
+        self._sheets = []
+        self._stream = None
+        self._row = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write(self, text):
+        self._stream.write(text.encode('utf-8'))
+
+    def add_sheet(self, name, widths=()):
+        """새 시트 시작 (이전 시트는 닫힘)"""
+        self._end_sheet()
+        self._sheets.append(name)
+        self._stream = self._zip.open(f'xl/worksheets/sheet{len(self._sheets)}.xml', 'w')
+        self._row = 0
+        cols = ''.join(f'<col min="{i}" max="{i}" width="{w}" customWidth="1"/>'
+                       for i, w in enumerate(widths, 1) if w)
+        self._write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    f'<worksheet xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+                    f'{f"<cols>{cols}</cols>" if cols else ""}<sheetData>')
+
+    def write_row(self, values, style=STYLE_DEFAULT):
+        """한 행 쓰기 (None은 빈 칸, style은 전체 또는 칸별 서식 목록)"""
+        self._row += 1
+        styles = style if isinstance(style, (list, tuple)) else None
+        cells = []
+        for col, value in enumerate(values):
+            if value is None:
+                continue
+            cell_style = (styles[col] if col < len(styles) else STYLE_DEFAULT) if styles is not None else style
+            cells.append(_cell(f'{_column_letter(col)}{self._row}', value, cell_style))
+        self._write(f'<row r="{self._row}">{"".join(cells)}</row>')
+
+    def skip_rows(self, count=1):
+        """빈 행 건너뛰기"""
+        self._row += count
+
+    @property
+    def row(self):
+        """마지막으로 쓴 행 번호 (1부터)"""
+        return self._row
+
+    def _end_sheet(self):
+        if self._stream is not None:
+            self._write('</sheetData></worksheet>')
+            self._stream.close()
+            self._stream = None
+
+    def close(self):
+        """나머지 파일을 쓰고 원래 경로로 바꿔치기"""
+        self._end_sheet()
+        sheets = ''.join(f'<sheet name="{escape(name)}" sheetId="{i}" r:id="rId{i}"/>'
+                         for i, name in enumerate(self._sheets, 1))
+        self._zip.writestr('xl/workbook.xml',
+                           f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                           f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><sheets>{sheets}</sheets>'
+                           f'<calcPr calcId="191029" fullCalcOnLoad="1"/></workbook>')
+        rels = ''.join(f'<Relationship Id="rId{i}" Type="{_REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                       for i in range(1, len(self._sheets) + 1))
+        rels += f'<Relationship Id="rId{len(self._sheets) + 1}" Type="{_REL_NS}/styles" Target="styles.xml"/>'
+        self._zip.writestr('xl/_rels/workbook.xml.rels',
+                           f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                           f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{rels}</Relationships>')
+        self._zip.writestr('xl/styles.xml', _STYLES_XML)
+        self._zip.writestr('_rels/.rels',
+                           '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                           '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                           f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+                           '</Relationships>')
+        overrides = ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                            for i in range(1, len(self._sheets) + 1))
+        self._zip.writestr('[Content_Types].xml',
+                           '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                           '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                           '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                           '<Default Extension="xml" ContentType="application/xml"/>'
+                           '<Override PartName="/xl/workbook.xml" '
+                           'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                           '<Override PartName="/xl/styles.xml" '
+                           'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                           f'{overrides}</Types>')
+        self._zip.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """임시 파일을 지우고 기존 파일은 그대로 둠"""
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self._zip.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def _lookup(table, level):
+    """레벨 표 조회 (표보다 높은 레벨은 마지막 값)"""
+    return table[min(level, len(table) - 1)]
+
+
+def _div(a, b):
+    if a is None or b is None or b == 0:
+        return None
+    return a / b
+
+
+def write_data_workbook(path=DATA_PATH, enhance_costs=None, common_prices=None, hidden_prices=None):
+    """Data.xlsx 생성 (레벨별 통계 + 강화 비용 + 판매가)
+
+    enhance_costs, common_prices, hidden_prices가 None이면 학습한 값 (load_enhance_costs, load_sell_prices)
+    """
+    if enhance_costs is None:
+        enhance_costs = load_enhance_costs()
+    if common_prices is None:
+        common_prices = load_sell_prices(ITEM_CLASS_NORMAL)
+    if hidden_prices is None:
+        hidden_prices = load_sell_prices(ITEM_CLASS_SPECIAL)
+    with StreamingWorkbook(path) as book:
+        book.add_sheet('Sheet1', widths=[8, 10, 10, 10, 10, 12, 12, 12, 13, 17, 16])
+        book.write_row(['Level', 'Try', 'Success', 'Stay', 'Break', 'SuccessPer', 'StayPer', 'BreakPer',
+                        'UpgradeCost', 'CommonSalePrice', 'HiddenSalePrice'], STYLE_HEADER)
+        styles = [STYLE_DEFAULT] * 5 + [STYLE_PERCENT] * 3 + [STYLE_NUMBER] * 3
+        for level in range(enhance_db.get_max_level() + 1):
+            stats = enhance_db.get_stats(level)
+            if stats is None:
+                continue
+            r = book.row + 1
+            try_count = stats['Try']
+            book.write_row([
+                level, try_count, stats['Success'], stats['Stay'], stats['Break'],
+                Formula(f'IF(B{r}=0,0,C{r}/B{r})', stats['Success'] / try_count if try_count else 0),
+                Formula(f'IF(B{r}=0,0,D{r}/B{r})', stats['Stay'] / try_count if try_count else 0),
+                Formula(f'IF(B{r}=0,0,E{r}/B{r})', stats['Break'] / try_count if try_count else 0),
+                _lookup(enhance_costs, level), _lookup(common_prices, level), _lookup(hidden_prices, level),
+            ], styles)
+
+
+def _sim_is_stale(cached, key, odds):
+    if cached is None or cached['key'] != key or len(cached['odds']) != len(odds):
+        return True
+    return any(abs(a - b) > SIM_ODDS_TOLERANCE
+               for old, new in zip(cached['odds'], odds) for a, b in zip(old, new))
+
+
+def simulate_targets(odds, enhance_costs, runs=SIM_RUNS, seed=SIM_SEED, resimulate=True):
+    """목표 레벨 1 ~ len(odds)까지 몬테카를로로 강화 횟수/비용 분위수 계산 (확률이 비슷하면 이전 결과 재사용)
+
+    Args:
+        odds: 인덱스가 레벨인 (p_success, p_stay, p_break) 목록
+        enhance_costs: 레벨별 강화 비용
+        resimulate: False면 확률이 바뀌었어도 이전 결과가 있으면 그대로 사용
+
+    Returns:
+        list: 인덱스가 목표 레벨인 (횟수 P90, P95, P99, 비용 P90, P95, P99)
+    """
+    global _sim_cache
+    costs = [_lookup(enhance_costs, level) for level in range(len(odds))]
+    key = (runs, seed, tuple(costs))
+    if _sim_cache is not None and (not resimulate or not _sim_is_stale(_sim_cache, key, odds)):
+        return _sim_cache['rows']
+
+    import numpy as np
+    from enhance_montecarlo import simulate_target
+
+    rng = np.random.default_rng(seed)
+    rows = [(0,) * (len(SIM_QUANTILES) * 2)]
+    for target in range(1, len(odds) + 1):
+        attempts, cost, _, _ = simulate_target(target, runs, odds, costs, rng)
+        rows.append(tuple(float(v) for v in np.quantile(attempts, SIM_QUANTILES))
+                    + tuple(float(v) for v in np.quantile(cost, SIM_QUANTILES)))
+    _sim_cache = {'key': key, 'odds': [tuple(o) for o in odds], 'rows': rows}
+    return rows
+
+
+def write_model_workbook(path=MODEL_PATH, seconds_per_attempt=SECONDS_PER_ATTEMPT, runs=SIM_RUNS, seed=SIM_SEED,
+                         sale_prices=None, enhance_costs=None, resimulate=True):
+    """enhancement_model_with_sim.xlsx 생성
+
+    Inputs의 +n 행은 (n-1 → n) 강화 한 번의 비용과 확률, +n 판매가.
+    StageCalc는 유지를 접은 단계별 기대값, Cumulative는 +0에서 +n까지의 누적 기대값과 몬테카를로 분위수.
+    sale_prices, enhance_costs가 None이면 학습한 값 (판매가는 특별 아이템)
+    """
+    if sale_prices is None:
+        sale_prices = load_sell_prices(ITEM_CLASS_SPECIAL)
+    if enhance_costs is None:
+        enhance_costs = load_enhance_costs()
+    top = enhance_db.get_max_level() + 1
+    odds = [enhance_db.get_odds(level) for level in range(top)]
+    sim = simulate_targets(odds, enhance_costs, runs, seed, resimulate)
+    secs = seconds_per_attempt
+
+    with StreamingWorkbook(path) as book:
+        # Inputs: 가정값과 레벨별 입력 (+n 행 = 6 + n)
+        book.add_sheet('Inputs', widths=[20, 18, 16, 12, 12, 12])
+        book.write_row(['Assumptions'], STYLE_HEADER)
+        book.write_row(['Seconds per attempt', secs, None, 'Note',
+                        f"Probabilities from enhance_stats ({datetime.now().strftime('%Y-%m-%d %H:%M')})"])
+        book.write_row(['Display rule', 'Sale price 0 => not available'])
+        book.write_row(['Simulation runs (N)', runs, None, 'Simulation seed', seed, 'P90/P95/P99'])
+        book.write_row(['Level (+n)', 'Attempt cost (원)', 'Sale price (원)', 'Success %', 'Keep %', 'Destroy %'],
+                       STYLE_HEADER)
+        book.write_row([0, 0, 0])
+        input_styles = [STYLE_DEFAULT, STYLE_NUMBER, STYLE_NUMBER, STYLE_PERCENT, STYLE_PERCENT, STYLE_PERCENT]
+        for n in range(1, top + 1):
+            book.write_row([n, _lookup(enhance_costs, n - 1), _lookup(sale_prices, n), *odds[n - 1]], input_styles)
+
+        # StageCalc: +n 행 = 4 + n
+        book.add_sheet('StageCalc', widths=[12, 10, 14, 12, 14, 14, 12, 18, 20, 20])
+        book.write_row(['Per-stage calculations (transition n-1 -> n with keep loops collapsed)'])
+        book.write_row(['Uses normalized probabilities so Success+Keep+Destroy=100%.'])
+        book.skip_rows()
+        book.write_row(['Level (+n)', 'Raw total', 'Success (norm)', 'Keep (norm)', 'Destroy (norm)', 'Denom = S + D',
+                        'q = S/(S+D)', 'Exp attempts @stage', 'Exp cost @stage (원)', 'Exp time @stage (sec)'],
+                       STYLE_HEADER)
+        stages = [None]  # 인덱스가 레벨인 (q, 기대 횟수, 기대 비용)
+        stage_styles = [STYLE_DEFAULT, STYLE_DECIMAL, STYLE_PERCENT, STYLE_PERCENT, STYLE_PERCENT, STYLE_PERCENT,
+                        STYLE_PERCENT, STYLE_DECIMAL, STYLE_NUMBER, STYLE_DECIMAL]
+        for n in range(1, top + 1):
+            r, ir = 4 + n, 6 + n
+            success, keep, destroy = odds[n - 1]
+            total = success + keep + destroy
+            s, k, d = (success / total, keep / total, destroy / total) if total else (0, 0, 0)
+            q = s / (s + d) if s + d else 0
+            attempts = 1 / (s + d) if s + d else 0
+            stage_cost = _lookup(enhance_costs, n - 1) * attempts
+            stages.append((q, attempts, stage_cost))
+            book.write_row([
+                n,
+                Formula(f'Inputs!D{ir}+Inputs!E{ir}+Inputs!F{ir}', total),
+                Formula(f'IF(B{r}=0,0,Inputs!D{ir}/B{r})', s),
+                Formula(f'IF(B{r}=0,0,Inputs!E{ir}/B{r})', k),
+                Formula(f'IF(B{r}=0,0,Inputs!F{ir}/B{r})', d),
+                Formula(f'C{r}+E{r}', s + d),
+                Formula(f'IF(F{r}=0,0,C{r}/F{r})', q),
+                Formula(f'IF(F{r}=0,0,1/F{r})', attempts),
+                Formula(f'Inputs!B{ir}*H{r}', stage_cost),
+                Formula(f'H{r}*Inputs!$B$2', attempts * secs),
+            ], stage_styles)
+
+        # Cumulative: +n 행 = 5 + n
+        book.add_sheet('Cumulative', widths=[16, 20, 22, 14, 14, 16, 22, 16, 22, 24] + [14] * 9)
+        book.write_row(['From +0 to +n (destroy resets to +0). Expected values are computed via recursion.',
+                        *[None] * 9, 'Simulation (Monte Carlo)'])
+        book.write_row(['E[n] = (E[n-1] + stage_value[n]) / q[n], where q[n]=S/(S+D) from StageCalc.',
+                        *[None] * 9, f'N={runs}, seed={seed}; percentiles P90/P95/P99 (approx.)'])
+        book.skip_rows()
+        book.write_row(['Target level (+n)', 'Exp clicks to reach +n', 'Exp cost to reach +n (원)', 'Exp time (sec)',
+                        'Exp time (min)', 'Exp time (hours)', 'Exp breaks (destroy events)', 'Sale price (원)',
+                        'Exp profit if sell (원)', 'Profit per hour (원/hour)',
+                        'Sim clicks P90', 'Sim clicks P95', 'Sim clicks P99',
+                        'Sim cost (원) P90', 'Sim cost (원) P95', 'Sim cost (원) P99',
+                        'Sim time (hours) P90', 'Sim time (hours) P95', 'Sim time (hours) P99'], STYLE_HEADER)
+        cumulative_styles = [STYLE_DEFAULT, STYLE_DECIMAL, STYLE_NUMBER, STYLE_DECIMAL, STYLE_DECIMAL, STYLE_DECIMAL,
+                             STYLE_DECIMAL, STYLE_NUMBER, STYLE_NUMBER, STYLE_NUMBER] + [STYLE_NUMBER] * 6 + [STYLE_DECIMAL] * 3
+        clicks = cost = breaks = 0
+        for n in range(0, top + 1):
+            r, ir, sr, p = 5 + n, 6 + n, 4 + n, 4 + n
+            sale = _lookup(sale_prices, n)
+            if n == 0:
+                values = [0, 0, 0, 0, 0, 0, 0]
+            else:
+                q, stage_attempts, stage_cost = stages[n]
+                clicks = _div(None if clicks is None else clicks + stage_attempts, q)
+                cost = _div(None if cost is None else cost + stage_cost, q)
+                breaks = _div(None if breaks is None else breaks + (1 - q), q)
+                seconds = None if clicks is None else clicks * secs
+                values = [
+                    n,
+                    Formula(f'(B{p}+StageCalc!H{sr})/StageCalc!G{sr}', clicks),
+                    Formula(f'(C{p}+StageCalc!I{sr})/StageCalc!G{sr}', cost),
+                    Formula(f'B{r}*Inputs!$B$2', seconds),
+                    Formula(f'D{r}/60', None if seconds is None else seconds / 60),
+                    Formula(f'D{r}/3600', None if seconds is None else seconds / 3600),
+                    Formula(f'(G{p}+(1-StageCalc!G{sr}))/StageCalc!G{sr}', breaks),
+                ]
+            hours = 0 if n == 0 else (None if clicks is None else clicks * secs / 3600)
+            profit = '' if sale == 0 else (None if cost is None else sale - cost)
+            per_hour = '' if profit == '' or hours == 0 else _div(profit, hours)
+            sim_row = sim[n]
+            values += [
+                Formula(f'Inputs!C{ir}', sale),
+                Formula(f'IF(H{r}=0,"",H{r}-C{r})', profit),
+                Formula(f'IF(I{r}="","",IF(F{r}=0,"",I{r}/F{r}))', per_hour),
+                *sim_row,
+                Formula(f'K{r}*Inputs!$B$2/3600', sim_row[0] * secs / 3600),
+                Formula(f'L{r}*Inputs!$B$2/3600', sim_row[1] * secs / 3600),
+                Formula(f'M{r}*Inputs!$B$2/3600', sim_row[2] * secs / 3600),
+            ]
+            book.write_row(values, cumulative_styles)
+
+
+def export_workbooks(data_path=DATA_PATH, model_path=MODEL_PATH, resimulate=True, **model_options):
+    """두 통합 문서를 다시 만듦 (엑셀에서 열려 있어 쓸 수 없으면 경고만 출력)
+
+    Returns:
+        bool: 성공 여부
+    """
+    with _export_lock:
+        start = time.perf_counter()
+        try:
+            if data_path:
+                write_data_workbook(data_path)
+            if model_path:
+                write_model_workbook(model_path, resimulate=resimulate, **model_options)
+        except OSError as e:
+            print(f"⚠️ 엑셀 갱신 실패 (파일이 열려 있으면 닫아 주세요): {e}")
+            return False
+        names = ', '.join(os.path.basename(path) for path in (data_path, model_path) if path)
+        print(f"📊 엑셀 갱신 완료 ({names}, {(time.perf_counter() - start) * 1000:.0f}ms)")
+        return True
+
+
+def _on_flush(rows):
+    _dirty.set()
+
+
+def _auto_export_loop(interval, options):
+    while True:
+        _dirty.wait()
+        if _stop.is_set():
+            return
+        _dirty.clear()
+        export_workbooks(**options)
+        if _stop.wait(interval):
+            return
+
+
+def start_auto_export(interval=AUTO_EXPORT_INTERVAL, **options):
+    """DB에 기록할 때마다 (최대 interval초에 한 번) 통합 문서 다시 만들기, 종료 시 마지막으로 한 번 더"""
+    global _exporter
+    if _exporter is not None and _exporter.is_alive():
+        return
+    _stop.clear()
+    enhance_db.add_flush_listener(_on_flush)
+    _exporter = threading.Thread(target=_auto_export_loop, args=(interval, options),
+                                 name='enhance_workbook-export', daemon=True)
+    _exporter.start()
+    atexit.register(stop_auto_export, **options)
+
+
+def stop_auto_export(**options):
+    """자동 갱신을 멈추고, 마지막 갱신 이후 기록이 있었으면 한 번 더 만듦 (몬테카를로는 이전 결과 재사용)"""
+    global _exporter
+    if _exporter is None:
+        return
+    enhance_db.remove_flush_listener(_on_flush)
+    pending = _dirty.is_set() or enhance_db.get_buffer_count() > 0  # 통계 캐시는 기록 대기 중인 것도 포함
+    _stop.set()
+    _dirty.set()
+    _exporter.join(30.0)
+    _exporter = None
+    _dirty.clear()
+    if pending:
+        export_workbooks(resimulate=False, **options)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="enhance_stats로 Data.xlsx / enhancement_model_with_sim.xlsx 생성")
+    parser.add_argument('--db', default=enhance_db.DB_PATH, help="통계 DB 경로")
+    parser.add_argument('--data', default=DATA_PATH, help="Data.xlsx 경로 (빈 문자열이면 생략)")
+    parser.add_argument('--model', default=MODEL_PATH, help="enhancement_model_with_sim.xlsx 경로 (빈 문자열이면 생략)")
+    parser.add_argument('--seconds', type=float, default=SECONDS_PER_ATTEMPT, help="시도 1회 시간 (초)")
+    parser.add_argument('--runs', type=int, default=SIM_RUNS, help="목표 레벨별 몬테카를로 사이클 수")
+    parser.add_argument('--seed', type=int, default=SIM_SEED)
+    parser.add_argument('--sale-price', choices=['common', 'hidden'], default='hidden',
+                        help="모델 시트에 쓸 판매가 (common: 일반 아이템, hidden: 특별 아이템)")
+    args = parser.parse_args()
+
+    enhance_db.DB_PATH = args.db
+    export_workbooks(args.data, args.model, seconds_per_attempt=args.seconds, runs=args.runs, seed=args.seed,
+                     sale_prices=load_sell_prices(ITEM_CLASS_NORMAL if args.sale_price == 'common' else ITEM_CLASS_SPECIAL))
@@ -0,0 +1,191 @@
+"""
+parse_reply / ReplyEvent / ChatTail 회귀 테스트
+
+봇 응답 형식은 실제 채팅 (logs/ 의 디버그 출력과 아이템 이름) 그대로 쓴다.
+parse_reply가 예전 파서들 (check_enhancement_result, parse_gold_from_*, should_sell_item 등)과
+같은 답을 내는지, 그리고 DB에 손대지 않는지 확인한다.
+
+실행:
+    python -m pytest -q
+"""
+import glob
+import os
+import re
+
+import pytest
+
+import enhance_common
+import enhance_db
+from enhance_common import ITEM_CLASS_NORMAL, ITEM_CLASS_SPECIAL, parse_reply
+
+
+LOG_DIR = os.path.join(os.path.dirname(__file__), 'logs')
+
+# logs/ 에 남은 실제 응답
+LEGEND_REPLY = "@사용자님이 전설의 『[+10] 사방을 베고 찌르는 병기 우산』 강화에 성공하셨습니다."
+LEGEND_REPLY_COLON = "@사용자님이 전설의 『[+11] 제우스의 번개를 막던 우산: 신들의 방패』 강화에 성공하셨습니다."
+BUSY_REPLY = '@사용자 💬 대장장이: "강화 중이니 잠깐 기다리도록."'
+MOURN_REPLY = "@사용자의 위대한 도전을 기리며 잠시 묵념하는 시간을 갖겠습니다..."
+
+SUCCESS_REPLY = (
+    "@사용자 〖✨강화 성공✨ +9 → +10〗\n"
+    "『[+10] 사방을 베고 찌르는 병기 우산』\n"
+    "💸 사용 골드: -20,000G\n"
+    "💰 남은 골드: 1,596,717G"
+)
+MAINTAIN_REPLY = (
+    "@사용자 〖💦강화 유지💦〗\n"
+    "『[+6] 낡은 몽둥이』의 레벨이 유지되었습니다.\n"
+    "💸 사용 골드: -5,000G\n"
+    "💰 남은 골드: 15,914,483G"
+)
+DESTROY_REPLY = (
+    "@사용자 〖💥강화 파괴💥〗\n"
+    "『[+7] 낡은 검』 산산조각 나버렸습니다.\n"
+    "💸 사용 골드: -10,000G\n"
+    "💰 남은 골드: 4,950,291G\n"
+    "『[+0] 녹아내린 끈적한 하드』 지급 완료"
+)
+SELL_REPLY = (
+    "@사용자 〖검 판매〗\n"
+    "『[+12] 낡은 망치』 판매 완료\n"
+    "💶 획득 골드: +591,000G\n"
+    "💰 현재 보유 골드: 2,187,692G\n"
+    "⚔️새로운 검 획득: [+0] 낡은 몽둥이"
+)
+NO_GOLD_REPLY = '@사용자 💬 대장장이: "골드가 부족해. 강화 비용은 20,000G 라네."'
+ZERO_SELL_REPLY = '@사용자 💬 대장장이: "0강검은 가치가 없어서 판매할 수 없다네."'
+
+
+def _log_replies():
+    """logs/ 의 "[디버그] 받은 텍스트: ..." 응답 목록"""
+    pattern = re.compile(r"\[디버그\] 받은 텍스트: (.+?)(?:\.\.\.)?$")
+    replies = set()
+    for path in glob.glob(os.path.join(LOG_DIR, 'enhance_*.txt')):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                match = pattern.search(line.rstrip('\n'))
+                if match:
+                    replies.add(match.group(1))
+    return sorted(replies)
+
+
+ALL_REPLIES = [
+    LEGEND_REPLY, LEGEND_REPLY_COLON, BUSY_REPLY, MOURN_REPLY,
+    SUCCESS_REPLY, SUCCESS_REPLY + "\n" + LEGEND_REPLY, MAINTAIN_REPLY, DESTROY_REPLY, SELL_REPLY,
+    NO_GOLD_REPLY, ZERO_SELL_REPLY,
+] + _log_replies()
+
+
+def test_success_takes_priority_over_legend():
+    event = parse_reply(SUCCESS_REPLY + "\n" + LEGEND_REPLY)
+    assert event.result_type == "success"
+    assert (event.old_level, event.new_level) == (9, 10)
+    assert event.gold == 1596717
+    assert event.item_name == "사방을 베고 찌르는 병기 우산"
+
+
+def test_legend_success():
+    event = parse_reply(LEGEND_REPLY)
+    assert event.result_type == "success"
+    assert (event.old_level, event.new_level) == (None, 10)
+    assert event.item_name == "사방을 베고 찌르는 병기 우산"
+    assert event.item_class == ITEM_CLASS_SPECIAL
+    assert event.gold is None
+
+    event = parse_reply(LEGEND_REPLY_COLON)
+    assert event.new_level == 11
+    assert event.item_name == "제우스의 번개를 막던 우산: 신들의 방패"
+
+
+def test_maintain_reads_level_from_item():
+    event = parse_reply(MAINTAIN_REPLY)
+    assert event.result_type == "maintain"
+    assert (event.old_level, event.new_level) == (6, None)
+    assert event.gold == 15914483
+    assert event.item_name == "낡은 몽둥이"
+    assert event.is_sell_item
+
+
+def test_destroy_reports_new_item():
+    event = parse_reply(DESTROY_REPLY)
+    assert event.result_type == "destroy"
+    assert (event.old_level, event.new_level) == (7, 0)
+    assert event.gold == 4950291
+    assert event.item_name == "녹아내린 끈적한 하드"
+    assert event.item_class == ITEM_CLASS_SPECIAL
+    assert not event.is_sell_item
+    assert event.new_item_name is None
+
+
+def test_sell_reply():
+    event = parse_reply(SELL_REPLY)
+    assert event.result_type is None
+    assert event.sword_sold
+    assert event.sell_price == 591000
+    assert event.sell_gold == 2187692
+    assert event.gold is None
+    assert (event.sold_item_name, event.sold_level) == ("낡은 망치", 12)
+    assert event.new_item_name == "낡은 몽둥이"
+    assert event.new_item_class == ITEM_CLASS_NORMAL
+    assert event.item_name == "낡은 몽둥이"
+    assert event.is_sell_new_item
+
+
+@pytest.mark.parametrize('text, flag', [
+    (NO_GOLD_REPLY, 'insufficient_gold'),
+    (ZERO_SELL_REPLY, 'zero_unsellable'),
+])
+def test_bot_refusal_flags(text, flag):
+    event = parse_reply(text)
+    assert event.result_type is None
+    for name in ('insufficient_gold', 'zero_unsellable', 'sword_sold'):
+        assert getattr(event, name) == (name == flag)
+
+
+@pytest.mark.parametrize('text', [None, "", BUSY_REPLY, MOURN_REPLY])
+def test_no_result(text):
+    event = parse_reply(text)
+    for name in event.FIELDS:
+        assert getattr(event, name) == getattr(enhance_common.ReplyEvent, name)
+
+
+@pytest.mark.parametrize('text', ALL_REPLIES)
+def test_matches_legacy_parsers(text):
+    event = parse_reply(text)
+    result_type, level = enhance_common.check_enhancement_result(text)
+    assert event.result_type == result_type
+    if result_type != "maintain":
+        assert event.new_level == level
+    assert event.gold == enhance_common.parse_gold_from_enhance(text)
+    assert event.sell_gold == enhance_common.parse_gold_from_sell(text)
+    assert event.is_sell_new_item == enhance_common.should_sell_item(text)
+    assert event.is_sell_item == enhance_common.get_item_type_from_current_text(text)
+
+
+def test_parsing_does_not_touch_db():
+    for text in ALL_REPLIES:
+        parse_reply(text)
+    assert enhance_db._conn is None
+    assert enhance_db._writer is None
+    assert enhance_db._queue.empty()
+
+
+def test_chat_tail_serial_counts_only_new_messages():
+    tail = enhance_common.ChatTail()
+    chat = "이종현\n" + MAINTAIN_REPLY
+    tail.feed(chat)
+    serial = tail.serial
+
+    chat += "\n이종현\n/강화 "  # 입력한 명령어는 마지막 메시지 뒤에 붙음
+    tail.feed(chat)
+    assert tail.serial == serial
+    assert enhance_common.is_waiting_for_bot(tail.latest)
+
+    chat += "\n" + SUCCESS_REPLY
+    tail.feed(chat)
+    assert tail.serial == serial + 1
+    assert parse_reply(tail.latest).result_type == "success"
+
+    tail.feed(chat[len("이종현\n"):])  # 앞부분이 잘려서 전체를 다시 읽어도 마지막 메시지가 같으면 그대로
+    assert tail.serial == serial + 1